@@ -1,77 +1,53 @@
+import time
+IMPORTS_STARTED = time.perf_counter()  # cold start benchmark (--bench-startup)
 import tkinter as tk
 from tkinter import ttk, messagebox
 import serial
-import serial.tools.list_ports
+import os
+import sys
 import threading
-import time
-import math
-from collections import deque
 import numpy as np
+from monitor_core import main as headless_main
+from devices import DeviceManager
+from widgets import TimeGraph, Gauge
+from history import HistoryReader
+from latency import LatencyHistogram, export_latency
+from ports import PortCache, choose_port, scan_ports
+
+# Not needed to bring the window up, so imported where first used: tkinter.filedialog,
+# serial.tools.list_ports (port scan thread), export.py (EXPORT) and api_server.py (START API)
 
 class SensorMonitorApp:
     def __init__(self, root):
         self.root = root
+        # Cold start: (phase, seconds) in order; see mark_startup() and benchmark_startup()
+        self.startup_phases = []
+        self.startup_mark = time.perf_counter()
         self.root.title("GasHealth Monitor")
         self.root.geometry("1000x800")
         self.root.configure(bg='#2c3e50')
         
-        # --- Serial communication and Threading ---
-        self.serial_port_obj = None
-        self.serial_thread = None
-        self.running = False
-        
-        # --- Sensor data storage with timestamps and filtering ---
-        self.sensor_data = {
-            'gas': {
-                'value': 0, 
-                'raw_value': 0,
-                'history': deque(maxlen=80),
-                'timestamps': deque(maxlen=80),
-                'filtered_history': deque(maxlen=80),
-                'filter_buffer': deque(maxlen=5),
-                'initial_samples': 0,
-                'initial_values': [],
-                'calibration_phase': True,
-                'calibration_samples': []
-            },
-            'ldr': {
-                'value': 0, 
-                'raw_value': 0,
-                'history': deque(maxlen=80),
-                'timestamps': deque(maxlen=80),
-                'filtered_history': deque(maxlen=80),
-                'filter_buffer': deque(maxlen=5),
-                'initial_samples': 0,
-                'initial_values': [],
-                'calibration_phase': True,
-                'calibration_samples': [],
-                'led_state': False
-            },
-            'voltage': {
-                'value': 0, 
-                'raw_value': 0,
-                'history': deque(maxlen=80),
-                'timestamps': deque(maxlen=80),
-                'filtered_history': deque(maxlen=80),
-                'filter_buffer': deque(maxlen=5),
-                'initial_samples': 0,
-                'initial_values': [],
-                'calibration_phase': True,
-                'calibration_samples': []
-            }
-        }
-        
-        # --- LED Control States for Manual Mode ---
-        self.led_states = {
-            'LED1': False,
-            'LED2': False,
-            'LED3': False
-        }
-
-        # Optimized filter parameters
-        self.filter_alpha = 0.6
-        self.initial_filter_alpha = 0.3
-        self.calibration_samples_count = 15
+        # --- Ingest/filter/record/alert pipelines, one MonitorCore per device ---
+        # The dashboard is one consumer; the three sensor panels show the active
+        # device (self.core), the Overview tab shows all of them
+        self.devices = DeviceManager()
+        self.core = None
+        self.device_led_states = {}
+        self.overview_tiles = {}
+        self.overview_painted = {}
+        self.captures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'captures')
+        self.replay_speeds = {'1x': 1.0, '10x': 10.0, '100x': 100.0, 'Max': None}
+        self.warnings_dirty = True
+        
+        # History browser: span in seconds (None = live), window end (None = now)
+        self.history_spans = {'Live': None, '10 min': 600, '1 hour': 3600,
+                              '1 day': 86400, '1 week': 7 * 86400}
+        self.history_span = None
+        self.history_end = None
+        self.history_view = 0
+        
+        # Graphs show the newest graph_window samples of each sensor's history
+        self.graph_window = 20 * 60  # one minute; graphs decimate to the canvas width
         
         # Visualization types
         self.viz_types = {
@@ -86,48 +62,79 @@ class SensorMonitorApp:
             'voltage': 'Graph with Time'
         }
         
-        self.start_time = time.time()
-        
-        # Skip counters for initial noise
-        self.skip_counter = {
-            'gas': 0,
-            'ldr': 0, 
-            'voltage': 0
-        }
-        self.max_skip = 10
-        
+        # --- Render scheduling ---
+        # Panels repaint only when their history generation moved; the tick
+        # slows down while no data is arriving or the window is minimized
+        self.painted_generation = {'gas': -1, 'ldr': -1, 'voltage': -1}
+        self.fast_tick_ms = 100
+        self.idle_tick_ms = 500
+        self.hidden_tick_ms = 1000
+        self.idle_after_s = 1.0
+        self.last_data_time = 0.0
+        
+        # Latency diagnostics panel (hidden by default), refreshed at most this often
+        self.diagnostics_visible = False
+        self.diagnostics_interval_s = 1.0
+        self.diagnostics_refreshed = 0.0
+        
+        # HTTP/WebSocket API for other machines (api_server.py), off until started
+        self.api_server = None
+        # Duration of each paint pass, scraped as gashealth_render_seconds (metrics.py)
+        self.render_histogram = LatencyHistogram()
+        
+        # Background session export: (records done, total) while running, then stats or error
+        self.export_thread = None
+        self.export_progress = (0, 0)
+        self.export_result = None
+        
+        # Serial port scan on a background thread (comports() can take seconds on Windows,
+        # and unknown ports are probed for over.ino); the update loop picks up the result.
+        # Ports already identified are remembered in ports.json (ports.py)
+        self.port_cache = PortCache()
+        self.port_results = []
+        self.ports_thread = None
+        self.ports_result = None
+        self.ports_scan_choice = None
+        self.ports_seconds = None
+        
+        # The Manual Mode tab's controls are built the first time it is opened
+        self.manual_ui_built = False
+        
+        self.activate_device(self.new_device())
         self.initialize_dummy_data()
+        self.mark_startup('core')
         self.setup_ui()
         
         # Start continuous update loop for graphs
         self.update_visualizations_loop()
+        self.mark_startup('first paint')
+        
+    def mark_startup(self, phase):
+        """Close a cold start phase: the time since the previous mark."""
+        now = time.perf_counter()
+        self.startup_phases.append((phase, now - self.startup_mark))
+        self.startup_mark = now
         
     def initialize_dummy_data(self):
         """Initialize with some dummy data so graphs show something at startup"""
-        current_time = time.time() - self.start_time
+        current_time = time.time() - self.core.start_time
         
         for i in range(5):
             time_val = current_time - (4 - i) * 0.5 
             
             # Gas sensor 
             gas_val = 100 + i * 20
-            self.sensor_data['gas']['history'].append(gas_val)
-            self.sensor_data['gas']['filtered_history'].append(gas_val)
-            self.sensor_data['gas']['timestamps'].append(time_val)
+            self.sensor_data['gas']['series'].append(time_val, gas_val, gas_val)
             self.sensor_data['gas']['value'] = gas_val
             
             # LDR sensor 
             ldr_val = 1000 + i * 200
-            self.sensor_data['ldr']['history'].append(ldr_val)
-            self.sensor_data['ldr']['filtered_history'].append(ldr_val)
-            self.sensor_data['ldr']['timestamps'].append(time_val)
+            self.sensor_data['ldr']['series'].append(time_val, ldr_val, ldr_val)
             self.sensor_data['ldr']['value'] = ldr_val
             
             # Voltage sensor 
             voltage_val = 1.5 + i * 0.1
-            self.sensor_data['voltage']['history'].append(voltage_val)
-            self.sensor_data['voltage']['filtered_history'].append(voltage_val)
-            self.sensor_data['voltage']['timestamps'].append(time_val)
+            self.sensor_data['voltage']['series'].append(time_val, voltage_val, voltage_val)
             self.sensor_data['voltage']['value'] = voltage_val
             
     def setup_ui(self):
@@ -149,8 +156,8 @@ class SensorMonitorApp:
                  fg='#ecf0f1', bg='#34495e').grid(row=0, column=0, padx=5, pady=10, sticky='w')
         
         self.port_var = tk.StringVar()
-        self.port_combo = ttk.Combobox(conn_frame, textvariable=self.port_var, 
-                                       width=15, state='readonly')
+        # Editable so ports that aren't enumerated (e.g. the esp32_sim.py pty) can be typed in
+        self.port_combo = ttk.Combobox(conn_frame, textvariable=self.port_var, width=15)
         self.port_combo.grid(row=0, column=1, padx=5, pady=10)
         
         # Baudrate selection
@@ -174,101 +181,110 @@ class SensorMonitorApp:
                                command=self.refresh_ports)
         refresh_btn.grid(row=0, column=5, padx=5, pady=10)
         
+        # Raw capture recording and replay
+        self.capture_btn = tk.Button(conn_frame, text="CAPTURE", font=('Arial', 10, 'bold'),
+                                     bg='#8e44ad', fg='white', relief=tk.RAISED, bd=3,
+                                     command=self.toggle_capture, width=8)
+        self.capture_btn.grid(row=0, column=6, padx=5, pady=10)
+        
+        replay_btn = tk.Button(conn_frame, text="REPLAY", font=('Arial', 10, 'bold'),
+                               bg='#8e44ad', fg='white', relief=tk.RAISED, bd=3,
+                               command=self.start_replay)
+        replay_btn.grid(row=0, column=7, padx=5, pady=10)
+        
+        self.replay_speed_var = tk.StringVar(value="1x")
+        ttk.Combobox(conn_frame, textvariable=self.replay_speed_var, values=list(self.replay_speeds),
+                     width=5, state='readonly').grid(row=0, column=8, padx=5, pady=10)
+        
         # Status label
         self.status_label = tk.Label(conn_frame, text="Disconnected", font=('Arial', 10, 'bold'),
                                      fg='#e74c3c', bg='#34495e')
-        self.status_label.grid(row=0, column=6, padx=10, pady=10, sticky='e')
+        self.status_label.grid(row=0, column=9, padx=10, pady=10, sticky='e')
         
         # Data display for debugging
         self.data_debug = tk.Label(conn_frame, text="", font=('Arial', 8), 
                                   fg='#bdc3c7', bg='#34495e')
-        self.data_debug.grid(row=1, column=0, columnspan=7, padx=5, pady=2)
-        
-        # --- Main Content: Use ttk.Notebook for Auto/Manual Modes ---
+        self.data_debug.grid(row=1, column=0, columnspan=10, padx=5, pady=2)
+        
+        # Ingestion throughput (bytes/s and frames/s)
+        self.throughput_label = tk.Label(conn_frame, text="", font=('Arial', 8), 
+                                         fg='#bdc3c7', bg='#34495e')
+        self.throughput_label.grid(row=2, column=0, columnspan=10, padx=5, pady=(0, 2))
+        
+        # Device selection: the connection bar and sensor panels act on this device
+        device_frame = tk.Frame(self.root, bg='#34495e', relief=tk.RAISED, bd=2)
+        device_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        
+        tk.Label(device_frame, text="Device:", font=('Arial', 10, 'bold'),
+                 fg='#ecf0f1', bg='#34495e').pack(side=tk.LEFT, padx=5, pady=5)
+        self.device_var = tk.StringVar(value=self.core.device_id)
+        self.device_combo = ttk.Combobox(device_frame, textvariable=self.device_var,
+                                         values=list(self.devices.devices), width=12, state='readonly')
+        self.device_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        self.device_combo.bind("<<ComboboxSelected>>",
+                               lambda event: self.select_device(self.device_var.get()))
+        
+        tk.Button(device_frame, text="ADD DEVICE", font=('Arial', 9, 'bold'), bg='#3498db', fg='white',
+                  command=self.add_device).pack(side=tk.LEFT, padx=5, pady=5)
+        tk.Button(device_frame, text="REMOVE", font=('Arial', 9, 'bold'), bg='#7f8c8d', fg='white',
+                  command=self.remove_device).pack(side=tk.LEFT, padx=5, pady=5)
+        self.devices_label = tk.Label(device_frame, text="", font=('Arial', 9),
+                                      fg='#bdc3c7', bg='#34495e')
+        self.devices_label.pack(side=tk.LEFT, padx=10, pady=5)
+        
+        self.api_btn = tk.Button(device_frame, text="START API", font=('Arial', 9, 'bold'),
+                                 bg='#16a085', fg='white', command=self.toggle_api)
+        self.api_btn.pack(side=tk.RIGHT, padx=5, pady=5)
+        self.api_address_var = tk.StringVar(value="127.0.0.1:8765")
+        tk.Entry(device_frame, textvariable=self.api_address_var, width=16).pack(side=tk.RIGHT, pady=5)
+        tk.Label(device_frame, text="API:", font=('Arial', 9, 'bold'),
+                 fg='#ecf0f1', bg='#34495e').pack(side=tk.RIGHT, padx=(10, 2), pady=5)
+        
+        self.diagnostics_btn = tk.Button(device_frame, text="DIAGNOSTICS", font=('Arial', 9, 'bold'),
+                                         bg='#7f8c8d', fg='white', command=self.toggle_diagnostics)
+        self.diagnostics_btn.pack(side=tk.RIGHT, padx=5, pady=5)
+        
+        # Per-stage latency (serial read to paint) of the active device; packed when shown
+        self.diagnostics_frame = tk.Frame(self.root, bg='#34495e', relief=tk.RAISED, bd=2)
+        self.diagnostics_label = tk.Label(self.diagnostics_frame, text="", font=('Courier', 9),
+                                          fg='#ecf0f1', bg='#34495e', justify=tk.LEFT, anchor='w')
+        self.diagnostics_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10, pady=5)
+        tk.Button(self.diagnostics_frame, text="EXPORT", font=('Arial', 9, 'bold'), bg='#3498db', fg='white',
+                  command=self.export_diagnostics).pack(side=tk.TOP, padx=5, pady=5)
+        tk.Button(self.diagnostics_frame, text="RESET", font=('Arial', 9, 'bold'), bg='#7f8c8d', fg='white',
+                  command=self.reset_diagnostics).pack(side=tk.TOP, padx=5, pady=(0, 5))
+        self.mark_startup('ui: controls')
+        
+        # --- Main Content: Use ttk.Notebook for Overview/Auto/Manual Modes ---
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # Overview of every device; click a tile to drill down into its sensor panels
+        self.overview_frame = tk.Frame(self.notebook, bg='#2c3e50')
+        self.notebook.add(self.overview_frame, text="🗂 Overview")
+        
         # Auto Mode Frame (Monitoring)
         self.auto_mode_frame = tk.Frame(self.notebook, bg='#2c3e50')
         self.notebook.add(self.auto_mode_frame, text="📈 Auto Mode (Monitor)")
         self.setup_auto_mode_ui(self.auto_mode_frame)
+        self.mark_startup('ui: monitor tab')
         
-        # Manual Mode Frame (Control)
+        # Manual Mode Frame (Control), filled in by on_tab_changed when first opened
         self.manual_mode_frame = tk.Frame(self.notebook, bg='#2c3e50')
         self.notebook.add(self.manual_mode_frame, text="⚙️ Manual Mode (Control)")
-        self.setup_manual_mode_ui(self.manual_mode_frame)
         
-        # Refresh ports on start
+        # Scan ports in the background; the combobox fills in when the scan is done
         self.refresh_ports()
         
         # Bind tab change event for mode switching
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
-    def apply_adaptive_low_pass_filter(self, sensor_type, raw_value):
-        """Apply adaptive low-pass filter with improved initial noise handling"""
-        # Store calibration samples
-        if self.sensor_data[sensor_type]['calibration_phase']:
-            self.sensor_data[sensor_type]['calibration_samples'].append(raw_value)
-            
-            # Check if we have enough calibration samples
-            if len(self.sensor_data[sensor_type]['calibration_samples']) >= self.calibration_samples_count:
-                # Calculate baseline from calibration samples (median to ignore outliers)
-                calibration_data = self.sensor_data[sensor_type]['calibration_samples']
-                baseline = np.median(calibration_data)
-                
-                # End calibration phase
-                self.sensor_data[sensor_type]['calibration_phase'] = False
-                self.sensor_data[sensor_type]['initial_samples'] = self.calibration_samples_count
-                
-                # Initialize filter buffer with baseline
-                for _ in range(3):
-                    self.sensor_data[sensor_type]['filter_buffer'].append(baseline)
-                
-                return baseline
-            else:
-                # During calibration, return the current raw value (will be smoothed later)
-                return raw_value
-        
-        # Add new value to buffer
-        self.sensor_data[sensor_type]['filter_buffer'].append(raw_value)
-        
-        # Track initial samples for adaptive filtering
-        self.sensor_data[sensor_type]['initial_samples'] += 1
-        
-        # If we don't have enough data, return raw value
-        if len(self.sensor_data[sensor_type]['filter_buffer']) < 3:
-            return raw_value
-        
-        buffer = list(self.sensor_data[sensor_type]['filter_buffer'])
+        # Open on the active device's monitor tab, as with a single device
+        self.notebook.select(self.auto_mode_frame)
+        self.rebuild_overview()
+        self.show_device_status()
+        self.mark_startup('ui: overview')
         
-        # For the first samples after calibration, use more aggressive filtering
-        if self.sensor_data[sensor_type]['initial_samples'] <= self.calibration_samples_count + 10:
-            # Use median filter for initial samples to remove outliers
-            sorted_buffer = sorted(buffer)
-            median_value = sorted_buffer[len(sorted_buffer) // 2]
-            
-            # Apply exponential smoothing with low alpha
-            if len(self.sensor_data[sensor_type]['filtered_history']) > 0:
-                last_filtered = self.sensor_data[sensor_type]['filtered_history'][-1]
-                filtered_value = self.initial_filter_alpha * median_value + (1 - self.initial_filter_alpha) * last_filtered
-            else:
-                filtered_value = median_value
-                
-            return filtered_value
-        
-        # After stabilization, use faster responding filter
-        # Simple moving average for speed
-        avg_value = sum(buffer) / len(buffer)
-        
-        # Final exponential smoothing with higher alpha for faster response
-        if len(self.sensor_data[sensor_type]['filtered_history']) > 0:
-            last_filtered = self.sensor_data[sensor_type]['filtered_history'][-1]
-            final_value = self.filter_alpha * avg_value + (1 - self.filter_alpha) * last_filtered
-        else:
-            final_value = avg_value
-            
-        return final_value
-
     def setup_auto_mode_ui(self, parent_frame):
         """Sets up the sensor monitoring (Auto Mode) UI."""
         
@@ -291,6 +307,31 @@ class SensorMonitorApp:
         self.setup_gas_visualization()
         self.setup_ldr_visualization()
         self.setup_voltage_visualization()
+        
+        # History browser for the time graphs (recorded data)
+        history_frame = tk.Frame(parent_frame, bg='#34495e')
+        history_frame.grid(row=1, column=0, columnspan=3, sticky='ew', padx=5, pady=(0, 5))
+        
+        tk.Label(history_frame, text="History:", font=('Arial', 9, 'bold'),
+                 fg='#ecf0f1', bg='#34495e').pack(side=tk.LEFT, padx=(10, 5), pady=5)
+        
+        self.history_var = tk.StringVar(value='Live')
+        history_combo = ttk.Combobox(history_frame, textvariable=self.history_var,
+                                     values=list(self.history_spans), state='readonly', width=10)
+        history_combo.pack(side=tk.LEFT, pady=5)
+        history_combo.bind('<<ComboboxSelected>>', lambda e: self.change_history_span())
+        
+        tk.Button(history_frame, text="◀ Back", font=('Arial', 9, 'bold'), bg='#3498db', fg='white',
+                  command=lambda: self.scroll_history(-1)).pack(side=tk.LEFT, padx=5, pady=5)
+        tk.Button(history_frame, text="Forward ▶", font=('Arial', 9, 'bold'), bg='#3498db', fg='white',
+                  command=lambda: self.scroll_history(1)).pack(side=tk.LEFT, pady=5)
+        
+        # Bulk export of the recording (the span shown, or everything when live)
+        tk.Button(history_frame, text="EXPORT", font=('Arial', 9, 'bold'), bg='#8e44ad', fg='white',
+                  command=self.export_recording).pack(side=tk.LEFT, padx=(20, 5), pady=5)
+        self.export_label = tk.Label(history_frame, text="", font=('Arial', 8),
+                                     fg='#bdc3c7', bg='#34495e')
+        self.export_label.pack(side=tk.LEFT, padx=5, pady=5)
 
     def setup_manual_mode_ui(self, parent_frame):
         """Sets up the LED control panel (Manual Mode) UI."""
@@ -334,6 +375,7 @@ class SensorMonitorApp:
         self.manual_status_label = tk.Label(control_panel, text="Serial Disconnected", font=('Arial', 10, 'bold'),
                                             fg='#e74c3c', bg='#34495e')
         self.manual_status_label.grid(row=4, column=1, padx=10, pady=(20, 0), sticky='w')
+        self.manual_ui_built = True
 
     def update_led_button_text(self, led_id, button):
         """Updates the LED button text and color based on its state."""
@@ -344,42 +386,28 @@ class SensorMonitorApp:
 
     def toggle_led(self, led_id, button):
         """Toggles the LED state and sends command via serial."""
-        if not self.running or not self.serial_port_obj or not self.serial_port_obj.is_open:
+        if not self.core.connected:
             messagebox.showerror("Connection Error", "Please connect to a serial port first.")
             return
 
-        # Toggle state
+        # Toggle state now; on_command reverts it if the board rejects the command
         self.led_states[led_id] = not self.led_states[led_id]
         new_state = self.led_states[led_id]
-        
-        # Send command
-        command = f"{led_id}_{'ON' if new_state else 'OFF'}\n"
-        
-        try:
-            self.serial_port_obj.write(command.encode('utf-8'))
-            print(f"Sent command: {command.strip()}")
-            
-            # Update button appearance
-            self.update_led_button_text(led_id, button)
-            
-        except Exception as e:
-            messagebox.showerror("Serial Write Error", f"Failed to send command: {e}")
-            # Revert state on error
-            self.led_states[led_id] = not new_state
-            self.update_led_button_text(led_id, button)
+        self.update_led_button_text(led_id, button)
+
+        # Queue command (sent and acknowledged on the transport's loop)
+        command = f"{led_id}_{'ON' if new_state else 'OFF'}"
+        self.core.send_command(command)
+        print(f"Queued command: {command}")
 
     def change_mode(self, mode):
         """Change between auto and manual mode"""
-        if not self.running or not self.serial_port_obj or not self.serial_port_obj.is_open:
+        if not self.core.connected:
             messagebox.showerror("Connection Error", "Please connect to a serial port first.")
             return
             
-        command = f"MODE_{mode}\n"
-        try:
-            self.serial_port_obj.write(command.encode('utf-8'))
-            self.log_message(f"Switching to {mode} mode")
-        except Exception as e:
-            messagebox.showerror("Serial Write Error", f"Failed to send mode command: {e}")
+        self.core.send_command(f"MODE_{mode}")
+        self.core.log_message(f"Switching to {mode} mode")
 
     def reset_manual_leds(self):
         """Reset all LED states to OFF and update buttons when switching to Manual mode"""
@@ -392,19 +420,16 @@ class SensorMonitorApp:
         self.update_led_button_text('LED2', self.led2_btn)
         self.update_led_button_text('LED3', self.led3_btn)
         
-        # Send OFF commands to all LEDs
-        if self.running and self.serial_port_obj and self.serial_port_obj.is_open:
-            for led_id in ['LED1', 'LED2', 'LED3']:
-                command = f"{led_id}_OFF\n"
-                try:
-                    self.serial_port_obj.write(command.encode('utf-8'))
-                    print(f"Sent command: {command.strip()}")
-                except Exception as e:
-                    print(f"Error sending {command}: {e}")
+        # Send OFF commands to all LEDs (the transport coalesces them into ALL_OFF)
+        if self.core.connected:
+            self.core.send_commands(['LED1_OFF', 'LED2_OFF', 'LED3_OFF'])
 
     def on_tab_changed(self, event):
         """Handle tab changes to switch between auto and manual modes"""
-        if not self.running or not self.serial_port_obj:
+        if not self.manual_ui_built and self.notebook.select() == str(self.manual_mode_frame):
+            self.setup_manual_mode_ui(self.manual_mode_frame)
+            self.show_device_status()
+        if not self.core.connected:
             return
             
         current_tab = self.notebook.tab(self.notebook.select(), "text")
@@ -416,58 +441,227 @@ class SensorMonitorApp:
             self.reset_manual_leds()
 
     def update_visualizations_loop(self):
-        """The main loop to update all active visualizations with faster refresh."""
+        """The main loop: apply new frames and repaint only panels whose data changed."""
+        delay = self.fast_tick_ms
         try:
-            self.update_warnings()
-
-            # Update value displays
-            self.gas_raw_label_text.set(f"Value: {self.sensor_data['gas']['value']:.0f} PPM")
-            self.ldr_raw_label_text.set(f"Value: {self.sensor_data['ldr']['value']:.0f}")
-            self.voltage_raw_label_text.set(f"Value: {self.sensor_data['voltage']['value']:.2f}V")
-
-            # Update visualizations based on current view type
-            if self.current_viz['gas'] == 'Graph with Time':
-                self.update_gas_time_graph()
-            elif self.current_viz['gas'] == 'Speed Meter':
-                self.update_gas_speed_meter()
-            elif self.current_viz['gas'] == 'Digital Version':
-                self.update_gas_digital_version()
-
-            if self.current_viz['ldr'] == 'Graph with Time':
-                self.update_ldr_time_graph()
-            elif self.current_viz['ldr'] == 'Speed Meter':
-                self.update_ldr_speed_meter()
-            elif self.current_viz['ldr'] == 'Digital Version':
-                self.update_ldr_digital_version()
-
-            if self.current_viz['voltage'] == 'Graph with Time':
-                self.update_voltage_time_graph()
-            elif self.current_viz['voltage'] == 'Speed Meter':
-                self.update_voltage_speed_meter()
-            elif self.current_viz['voltage'] == 'Digital Version':
-                self.update_voltage_digital_version()
-            
-            # Re-schedule the update with faster refresh rate
-            self.root.after(100, self.update_visualizations_loop)
+            if self.drain_frame_queue():
+                self.last_data_time = time.time()
+            self.update_throughput_display()
+            self.update_export_status()
+            self.update_port_list()
             
+            if self.root.state() == 'iconic':
+                # Minimized: keep draining so the queue never overflows, but paint nothing
+                delay = self.hidden_tick_ms
+                self.trace_paint(())
+            else:
+                paint_start = time.perf_counter()
+                painted = set(self.paint_overview())
+                if self.paint_dirty_panels():
+                    painted.add(self.core.device_id)
+                if painted:
+                    self.render_histogram.record(time.perf_counter() - paint_start)
+                self.trace_paint(painted)
+                self.update_diagnostics()
+                # Back off while disconnected or when every device has gone quiet
+                running = any(core.running for core in self.devices.devices.values())
+                data_flowing = running and time.time() - self.last_data_time < self.idle_after_s
+                delay = self.fast_tick_ms if data_flowing else self.idle_tick_ms
+                
         except Exception as e:
             print(f"Error in update loop: {e}")
-            # Still reschedule even if there's an error
-            self.root.after(100, self.update_visualizations_loop)
+            
+        # Still reschedule even if there's an error
+        self.root.after(delay, self.update_visualizations_loop)
+
+    def paint_dirty_panels(self):
+        """Repaint visible sensor panels whose history generation moved since the last paint;
+        returns how many were repainted."""
+        if self.notebook.select() != str(self.auto_mode_frame):
+            return 0
+        
+        painted = 0
+        for sensor in ['gas', 'ldr', 'voltage']:
+            generation = self.sensor_data[sensor]['series'].generation
+            if self.history_span and self.current_viz[sensor] == 'Graph with Time':
+                # Recorded view: repaint when the window moves, and every few seconds
+                # while it ends at "now" so newly flushed data shows up
+                generation = ('history', self.history_view, int(time.time() // 5))
+            if generation == self.painted_generation[sensor]:
+                continue
+            self.painted_generation[sensor] = generation
+            self.paint_panel(sensor)
+            painted += 1
+            
+        if self.warnings_dirty:
+            self.update_warnings()
+        return painted
+
+    def change_history_span(self):
+        """Switch the time graphs between live data and a recorded time span."""
+        self.history_span = self.history_spans[self.history_var.get()]
+        self.history_end = None
+        self.history_view += 1
+
+    def scroll_history(self, direction):
+        """Move the recorded view back (-1) or forward (1) by one span."""
+        if not self.history_span:
+            return
+        now = time.time()
+        end = (self.history_end or now) + direction * self.history_span
+        self.history_end = None if end >= now else end
+        self.history_view += 1
+
+    def update_history_graph(self, sensor):
+        """Show recorded min/max envelope for the selected span on a time graph."""
+        graph = getattr(self, f'{sensor}_time_graph')
+        end = self.history_end or time.time()
+        start = end - self.history_span
+        times, lows, highs, means, resolution = self.history_reader.query(
+            sensor, start, end, max_points=max(graph.width - 80, 100))
+        
+        # Interleave min and max so each bucket draws as a vertical stroke
+        values = np.column_stack((lows, highs)).ravel()
+        if sensor == 'voltage':
+            values = np.minimum(values * 100, 300)
+        
+        step = {0: 'raw', 1: '1 s', 60: '1 min', 3600: '1 h'}[resolution]
+        until = "now" if self.history_end is None else time.strftime('%m-%d %H:%M', time.localtime(end))
+        # Placed by time so connection outages show up as shaded gaps
+        graph.update(values, ('history', start, end, len(times)),
+                     caption=f"{self.history_var.get()} to {until} ({step})",
+                     times=np.repeat(times, 2), span=(start, end),
+                     gaps=self.history_reader.outages(start, end))
+
+    def export_recording(self):
+        """Export the active device's recording, or the history span on screen, in the background."""
+        if self.export_thread is not None:
+            messagebox.showerror("Export", "An export is already running.")
+            return
+        if not self.history_reader.store.segments():
+            messagebox.showerror("Export", f"Nothing recorded for {self.core.device_id} yet.")
+            return
+        from tkinter import filedialog
+        from export import FORMATS, available_formats, export_session, format_for_path
+        
+        formats = available_formats()
+        path = filedialog.asksaveasfilename(
+            title="Export recorded session", defaultextension='.' + FORMATS[formats[0]],
+            initialfile=time.strftime(f'{self.core.device_id}-%Y%m%d-%H%M%S'),
+            filetypes=[(fmt, '*.' + FORMATS[fmt]) for fmt in formats])
+        if not path:
+            return
+        fmt = format_for_path(path) or formats[0]
+        t0 = t1 = None
+        if self.history_span:
+            t1 = self.history_end or time.time()
+            t0 = t1 - self.history_span
+        directory = self.core.recordings_dir
+        
+        def progress(done, total):
+            self.export_progress = (done, total)
+        
+        def run():
+            try:
+                self.export_result = export_session(directory, path, fmt, t0, t1, on_progress=progress)
+            except (OSError, ValueError) as e:
+                self.export_result = e
+        
+        self.export_progress = (0, 0)
+        self.export_result = None
+        self.export_thread = threading.Thread(target=run, daemon=True)
+        self.export_thread.start()
+        self.update_export_status()
+
+    def update_export_status(self):
+        """Show a running export's progress, then its throughput or error."""
+        if self.export_thread is None:
+            return
+        if self.export_thread.is_alive():
+            done, total = self.export_progress
+            text = f"Exporting... {done * 100 // total}%" if total else "Exporting..."
+        else:
+            self.export_thread = None
+            result = self.export_result
+            if isinstance(result, Exception):
+                text = f"Export failed: {result}"
+            else:
+                from export import format_stats
+                text = format_stats(result)
+            self.core.log_message(text)
+        self.export_label.config(text=text)
+
+    def paint_panel(self, sensor):
+        """Update one sensor's value label and its current visualization."""
+        value = self.sensor_data[sensor]['value']
+        if sensor == 'gas':
+            self.gas_raw_label_text.set(f"Value: {value:.0f} PPM")
+        elif sensor == 'ldr':
+            self.ldr_raw_label_text.set(f"Value: {value:.0f}")
+        else:
+            self.voltage_raw_label_text.set(f"Value: {value:.2f}V")
+        
+        # Update visualization based on current view type
+        viz = self.current_viz[sensor]
+        if viz == 'Graph with Time':
+            getattr(self, f'update_{sensor}_time_graph')()
+        elif viz == 'Speed Meter':
+            getattr(self, f'update_{sensor}_speed_meter')()
+        elif viz == 'Digital Version':
+            getattr(self, f'update_{sensor}_digital_version')()
 
     # --- SERIAL COMMUNICATION METHODS ---
 
     def refresh_ports(self):
-        """Finds and updates the list of available serial ports."""
-        ports = serial.tools.list_ports.comports()
-        port_list = [port.device for port in ports]
-        self.port_combo['values'] = port_list
-        if port_list:
-            self.port_var.set(port_list[-1])
+        """Scan for serial ports and identify cookers in the background; update_port_list()
+        shows the result."""
+        if self.ports_thread is not None:
+            return
+        # Open ports can't be probed
+        busy = set(self.devices.connected_ports())
+        
+        def run():
+            started = time.perf_counter()
+            try:
+                self.ports_result = scan_ports(self.port_cache, skip=busy)
+            except OSError as e:
+                self.ports_result = e
+            self.ports_seconds = time.perf_counter() - started
+        
+        self.ports_result = None
+        self.ports_scan_choice = self.port_var.get()
+        self.ports_thread = threading.Thread(target=run, daemon=True, name='port-scan')
+        self.ports_thread.start()
+    
+    def update_port_list(self):
+        """Fill the port combobox (cookers first) once a scan has finished and select the
+        active device's port, unless a port was picked or typed while the scan ran."""
+        if self.ports_thread is None or self.ports_thread.is_alive():
+            return
+        self.ports_thread = None
+        results = self.ports_result
+        if isinstance(results, Exception):
+            self.core.log_message(f"Port scan failed: {results}")
+            return
+        self.port_results = results
+        self.port_combo['values'] = [result['device'] for result in results]
+        if self.port_var.get() == self.ports_scan_choice:
+            self.select_port()
+        cookers = [f"{result['device']} ({result['source']})" for result in results if result['cooker']]
+        self.core.log_message(f"{len(results)} serial ports, cookers: {', '.join(cookers) or 'none found'}")
+    
+    def select_port(self):
+        """Pre-select the port the active device should use: the cooker it used last, else a
+        free cooker (see ports.choose_port); leaves the selection alone if nothing fits."""
+        if self.core.running:
+            return
+        port = choose_port(self.port_results, self.core.device_id, taken=self.devices.connected_ports())
+        if port:
+            self.port_var.set(port)
 
     def toggle_connection(self):
         """Connects or disconnects the serial port."""
-        if self.running:
+        if self.core.running:
             self.stop_serial()
         else:
             self.start_serial()
@@ -480,169 +674,358 @@ class SensorMonitorApp:
         if not port:
             messagebox.showerror("Connection Error", "Please select a serial port.")
             return
+        owner = self.devices.connected_ports().get(port)
+        if owner is not None:
+            messagebox.showerror("Connection Error", f"{port} is already connected as {owner}.")
+            return
 
+        # The scan already identified the port; connect() needn't enumerate ports again
+        result = next((result for result in self.port_results if result['device'] == port), None)
         try:
-            self.serial_port_obj = serial.Serial(port, int(baudrate), timeout=0.05)
-            self.running = True
-            
-            # Reset filter states and enable calibration when starting new connection
-            for sensor in ['gas', 'ldr', 'voltage']:
-                self.sensor_data[sensor]['filter_buffer'].clear()
-                self.sensor_data[sensor]['initial_samples'] = 0
-                self.sensor_data[sensor]['initial_values'] = []
-                self.sensor_data[sensor]['calibration_phase'] = True
-                self.sensor_data[sensor]['calibration_samples'] = []
-            
-            # Reset skip counters when starting new connection
-            self.skip_counter = {'gas': 0, 'ldr': 0, 'voltage': 0}
-            
-            self.serial_thread = threading.Thread(target=self.read_serial_data, daemon=True)
-            self.serial_thread.start()
-            
-            self.connect_btn.config(text="DISCONNECT", bg='#e74c3c')
-            self.status_label.config(text=f"Connected to {port}", fg='#2ecc71')
-            self.manual_status_label.config(text=f"Connected to {port}", fg='#2ecc71')
+            self.core.connect(port, baudrate, result['fingerprint'] if result else None)
+            self.show_device_status()
+            if result:
+                self.remember_port(self.core, result)
             
             messagebox.showinfo("Connection Status", f"Successfully connected to {port} at {baudrate} bps.")
 
         except serial.SerialException as e:
-            self.running = False
-            self.serial_port_obj = None
+            self.core.disconnect()
             messagebox.showerror("Connection Error", f"Failed to connect to {port}: {e}")
-            self.connect_btn.config(text="CONNECT", bg='#27ae60')
-            self.status_label.config(text="Disconnected", fg='#e74c3c')
-            self.manual_status_label.config(text="Serial Disconnected", fg='#e74c3c')
+            self.show_device_status()
+    
+    def remember_port(self, core, result):
+        """Record in the port cache that a device uses this port's hardware, once the first
+        frames from it have been applied: a port that merely opened may be any adapter."""
+        device_id = core.device_id
+        port_obj = core.serial_port_obj
+
+        def on_applied(count):
+            core.unsubscribe('applied', on_applied)
+            if core.serial_port_obj is not port_obj:
+                # Disconnected (or reconnected elsewhere) before anything arrived
+                return
+            result.update(cooker=True, device_id=device_id)
+            self.port_cache.assign(result['fingerprint'], device_id)
+            try:
+                self.port_cache.save()
+            except OSError as e:
+                core.log_message(f"Could not save port cache: {e}")
+
+        core.subscribe('applied', on_applied)
     
     def stop_serial(self):
         """Stops the serial reading thread and closes the port."""
-        self.running = False
-        if self.serial_thread and self.serial_thread.is_alive():
-            pass 
-        
-        if self.serial_port_obj and self.serial_port_obj.is_open:
-            self.serial_port_obj.close()
-            self.serial_port_obj = None
-            
-        self.connect_btn.config(text="CONNECT", bg='#27ae60')
-        self.status_label.config(text="Disconnected", fg='#e74c3c')
-        self.manual_status_label.config(text="Serial Disconnected", fg='#e74c3c')
+        self.core.disconnect()
+        self.show_device_status()
         messagebox.showinfo("Connection Status", "Disconnected successfully.")
 
-    def read_serial_data(self):
-        """Target function for the serial thread to continuously read and process data."""
-        buffer = ""
-        while self.running:
-            try:
-                if self.serial_port_obj and self.serial_port_obj.in_waiting > 0:
-                    # Read all available data at once for better performance
-                    data = self.serial_port_obj.read(self.serial_port_obj.in_waiting).decode('utf-8', errors='ignore')
-                    buffer += data
-                    
-                    lines = buffer.split('\n')
-                    buffer = lines[-1]  # Keep incomplete line in buffer
-                    
-                    # Process all complete lines
-                    for line in lines[:-1]:
-                        if line.strip():
-                            self.parse_sensor_data(line.strip())
-                            
-                time.sleep(0.005)  # Reduced sleep for faster response
-            except Exception as e:
-                print(f"Serial Read Error: {e}")
-                time.sleep(0.05)
-
-    def parse_sensor_data(self, line):
-        """Parse sensor data in the new format"""
+    def toggle_capture(self):
+        """Start or stop recording the raw serial stream to a capture file."""
+        if self.core.capture:
+            path = self.core.capture.path
+            self.core.stop_capture()
+            self.show_device_status()
+            self.core.log_message(f"Capture saved to {path}")
+        else:
+            name = time.strftime(f'capture-{self.core.device_id}-%Y%m%d-%H%M%S.ovcap')
+            path = os.path.join(self.captures_dir, name)
+            self.core.start_capture(path)
+            self.show_device_status()
+            self.core.log_message(f"Capturing raw serial data to {path}")
+
+    def start_replay(self):
+        """Replay a capture through the live pipeline at the selected speed."""
+        if self.core.running:
+            messagebox.showerror("Replay", "Disconnect before starting a replay.")
+            return
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(title="Replay capture", initialdir=self.captures_dir,
+                                          filetypes=[("Captures", "*.ovcap"), ("All files", "*")])
+        if not path:
+            return
+        self.core.start_replay(path, self.replay_speeds[self.replay_speed_var.get()])
+        self.show_device_status()
+
+    def update_throughput_display(self):
+        """Show the ingest engine's bytes/s and frames/s, GUI queue health and graph redraw time."""
+        parts = []
+        replayer = self.core.replayer
+        if replayer and replayer.finished:
+            stats = replayer.get_stats()
+            parts.append(f"Replay done: {stats['lines']} lines at {stats['lines_per_sec']:.0f} lines/s")
+        elif self.core.ingest_engine:
+            bytes_per_sec, frames_per_sec = self.core.ingest_engine.update_rates()
+            queue_stats = self.core.frame_queue.get_stats()
+            parts.append(f"Rx: {bytes_per_sec:.0f} B/s | {frames_per_sec:.0f} frames/s | "
+                         f"Queue: {queue_stats['depth']} (dropped {queue_stats['dropped']})")
+            latency = self.core.transport.latency_percentiles() if self.core.transport else None
+            if latency:
+                parts.append(f"Cmd RTT p50 {latency[0]:.1f} / p99 {latency[1]:.1f} ms")
+        parts.append(f"Redraw: {self.visible_redraw_ms():.2f} ms/frame")
+        text = " | ".join(parts)
+        if text != self.throughput_label.cget('text'):
+            self.throughput_label.config(text=text)
+
+    def visible_redraw_ms(self):
+        """Total average redraw time of the visible graphs and gauges."""
+        widget_names = {'Graph with Time': 'time_graph', 'Speed Meter': 'gauge'}
+        total = 0.0
+        for sensor in ['gas', 'ldr', 'voltage']:
+            name = widget_names.get(self.current_viz[sensor])
+            widget = getattr(self, f'{sensor}_{name}', None) if name else None
+            if widget is not None:
+                total += widget.redraw_ms
+        return total
+
+    def trace_paint(self, painted):
+        """Close the latency traces of applied frames for the devices repainted this tick.
+
+        The stamp runs as a Tk idle callback queued after the canvas redraws
+        this tick scheduled, so it marks when the pixels were actually drawn.
+        """
+        for device_id, core in self.devices.devices.items():
+            if device_id in painted:
+                self.root.after_idle(core.tracer.painted)
+            else:
+                core.tracer.skip_paint()
+
+    def toggle_diagnostics(self):
+        """Show or hide the latency diagnostics panel."""
+        self.diagnostics_visible = not self.diagnostics_visible
+        if self.diagnostics_visible:
+            self.diagnostics_frame.pack(fill=tk.X, padx=10, pady=(0, 5), before=self.notebook)
+            self.diagnostics_refreshed = 0.0
+            self.update_diagnostics()
+        else:
+            self.diagnostics_frame.pack_forget()
+        self.diagnostics_btn.config(bg='#2980b9' if self.diagnostics_visible else '#7f8c8d')
+
+    def update_diagnostics(self):
+        """Refresh the active device's p50/p99 per stage while the panel is shown."""
+        now = time.time()
+        if not self.diagnostics_visible or now - self.diagnostics_refreshed < self.diagnostics_interval_s:
+            return
+        self.diagnostics_refreshed = now
+        table = self.core.tracer.format_table()
+        if '\n' not in table:
+            table += "\n(no frames traced yet)"
+        text = f"Latency, {self.core.device_id}: serial read -> paint\n{table}"
+        if text != self.diagnostics_label.cget('text'):
+            self.diagnostics_label.config(text=text)
+
+    def export_diagnostics(self):
+        """Save every device's latency histograms to a JSON file."""
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(title="Export latency histograms", defaultextension=".json",
+                                            initialfile=time.strftime('latency-%Y%m%d-%H%M%S.json'),
+                                            filetypes=[("JSON", "*.json"), ("All files", "*")])
+        if not path:
+            return
+        tracers = {device_id: core.tracer for device_id, core in self.devices.devices.items()}
+        try:
+            export_latency(tracers, path)
+        except OSError as e:
+            messagebox.showerror("Export", f"Could not write {path}: {e}")
+            return
+        self.core.log_message(f"Latency histograms exported to {path}")
+
+    def reset_diagnostics(self):
+        for core in self.devices.devices.values():
+            core.tracer.reset()
+        self.render_histogram.reset()
+        self.diagnostics_refreshed = 0.0
+        self.update_diagnostics()
+
+    def drain_frame_queue(self):
+        """Let every device's core apply its queued frames on the Tk thread; returns how many."""
+        count = self.devices.drain_all()
+        if count and self.core.last_line is not None:
+            self.data_debug.config(text=f"Last: {self.core.last_line}")
+        return count
+
+    def on_alert(self, device_id, name, active, value):
+        """Core listener: a warning condition started or cleared on one device."""
+        if self.core is not None and device_id == self.core.device_id:
+            self.warnings_dirty = True
+
+    def on_command(self, device_id, command, ok, reply, latency_ms):
+        """Core listener: a queued command was acknowledged, rejected or timed out."""
+        if ok:
+            return
+        print(f"Command {command} failed on {device_id}: {reply}")
+        led_id, _, state = command.partition('_')
+        led_states = self.device_led_states.get(device_id)
+        if led_states is None or led_id not in led_states:
+            return
+        # The board kept its previous state
+        led_states[led_id] = state != 'ON'
+        if device_id == self.core.device_id and self.manual_ui_built:
+            self.update_led_button_text(led_id, getattr(self, f'led{led_id[3]}_btn'))
+            self.manual_status_label.config(text=f"{command} failed: {reply}", fg='#f39c12')
+
+    def on_link(self, device_id, state, detail):
+        """Core listener: a device's port died ('lost') or came back ('restored')."""
+        if self.core is not None and device_id == self.core.device_id:
+            self.show_device_status()
+
+    # --- HTTP/WebSocket API ---
+
+    def toggle_api(self):
+        """Start or stop serving every device over HTTP/WebSocket."""
+        if self.api_server:
+            self.api_server.stop()
+            self.api_server = None
+            self.api_btn.config(text="START API", bg='#16a085')
+            self.core.log_message("API stopped")
+            return
+        from api_server import ApiServer, parse_address
+        
         try:
-            current_time = time.time() - self.start_time
-            self.data_debug.config(text=f"Last: {line}")
+            host, port = parse_address(self.api_address_var.get())
+            server = ApiServer(self.devices.devices, host, port, render_histogram=self.render_histogram)
+            server.start()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("API", f"Could not start the API: {e}")
+            return
+        self.api_server = server
+        for device_id, core in self.devices.devices.items():
+            server.attach(device_id, core)
+        self.api_btn.config(text="STOP API", bg='#e74c3c')
+        self.core.log_message(f"API at http://{host}:{server.port}/")
+
+    # --- Devices ---
+
+    def new_device(self):
+        """Create a device slot with its own core and subscribe to its alerts and command results."""
+        device_id = self.devices.add_device()
+        core = self.devices.devices[device_id]
+        core.subscribe('alert', lambda *args: self.on_alert(device_id, *args))
+        core.subscribe('command', lambda *args: self.on_command(device_id, *args))
+        core.subscribe('link', lambda *args: self.on_link(device_id, *args))
+        self.device_led_states[device_id] = {'LED1': False, 'LED2': False, 'LED3': False}
+        if self.api_server:
+            self.api_server.attach(device_id, core)
+        return device_id
+
+    def activate_device(self, device_id):
+        """Point the sensor panels, history browser and controls at one device."""
+        self.core = self.devices.devices[device_id]
+        self.sensor_data = self.core.sensor_data
+        self.led_states = self.device_led_states[device_id]
+        self.history_reader = HistoryReader(self.core.recordings_dir)
+        self.painted_generation = {sensor: -1 for sensor in self.painted_generation}
+        self.warnings_dirty = True
+
+    def select_device(self, device_id):
+        """Drill down: show this device in the sensor panels and manual controls."""
+        self.activate_device(device_id)
+        self.device_var.set(device_id)
+        self.data_debug.config(text=f"Last: {self.core.last_line}" if self.core.last_line else "")
+        if self.manual_ui_built:
+            for led_id in ['LED1', 'LED2', 'LED3']:
+                self.update_led_button_text(led_id, getattr(self, f'{led_id.lower()}_btn'))
+        self.select_port()
+        self.show_device_status()
+
+    def add_device(self):
+        """Add an unconnected device slot and make it active so a port can be chosen."""
+        device_id = self.new_device()
+        self.device_combo['values'] = list(self.devices.devices)
+        self.rebuild_overview()
+        self.select_device(device_id)
+
+    def remove_device(self):
+        """Disconnect and remove the active device (the last one is always kept)."""
+        if len(self.devices.devices) == 1:
+            messagebox.showerror("Devices", "At least one device is needed.")
+            return
+        device_id = self.core.device_id
+        if self.api_server:
+            self.api_server.detach(device_id)
+        self.devices.remove_device(device_id)
+        del self.device_led_states[device_id]
+        self.device_combo['values'] = list(self.devices.devices)
+        self.rebuild_overview()
+        self.select_device(next(iter(self.devices.devices)))
+
+    def show_device_status(self):
+        """Sync the connection bar and manual tab status with the active device."""
+        core = self.core
+        if core.connected:
+            text, color = f"Connected to {core.serial_port_obj.port}", '#2ecc71'
+            self.connect_btn.config(text="DISCONNECT", bg='#e74c3c')
+        elif core.reconnecting:
+            text, color = f"Connection lost - reconnecting to {core.supervisor.port}", '#f39c12'
+            self.connect_btn.config(text="DISCONNECT", bg='#e74c3c')
+        elif core.replayer:
+            text, color = f"Replaying {os.path.basename(core.replayer.path)}", '#f1c40f'
+            self.connect_btn.config(text="STOP", bg='#e74c3c')
+        else:
+            text, color = "Disconnected", '#e74c3c'
+            self.connect_btn.config(text="CONNECT", bg='#27ae60')
+        self.status_label.config(text=text, fg=color)
+        if self.manual_ui_built:
+            self.manual_status_label.config(text=text if core.running else "Serial Disconnected", fg=color)
+        self.capture_btn.config(text="STOP CAP" if core.capture else "CAPTURE",
+                                bg='#e74c3c' if core.capture else '#8e44ad')
+        connected = sum(1 for device in self.devices.devices.values() if device.running)
+        self.devices_label.config(text=f"{len(self.devices.devices)} devices, {connected} connected")
+
+    def rebuild_overview(self):
+        """Lay out one tile per device in the Overview tab."""
+        for tile in self.overview_tiles.values():
+            tile['frame'].destroy()
+        self.overview_tiles = {}
+        self.overview_painted = {}
+        columns = 8
+        for column in range(columns):
+            self.overview_frame.columnconfigure(column, weight=1, uniform='tile')
+        for position, device_id in enumerate(self.devices.devices):
+            frame = tk.Frame(self.overview_frame, bg='#34495e', relief=tk.RAISED, bd=2, cursor='hand2')
+            frame.grid(row=position // columns, column=position % columns, sticky='nsew', padx=3, pady=3)
+            title = tk.Label(frame, text=device_id, font=('Arial', 10, 'bold'), fg='#ecf0f1', bg='#34495e')
+            title.pack(fill=tk.X)
+            body = tk.Label(frame, text="", font=('Arial', 9), fg='#ecf0f1', bg='#34495e', justify=tk.LEFT)
+            body.pack(fill=tk.BOTH, expand=True, padx=4, pady=2)
+            for widget in (frame, title, body):
+                widget.bind('<Button-1>', lambda event, device_id=device_id: self.drill_down(device_id))
+            self.overview_tiles[device_id] = {'frame': frame, 'title': title, 'body': body}
+
+    def drill_down(self, device_id):
+        self.select_device(device_id)
+        self.notebook.select(self.auto_mode_frame)
+
+    def paint_overview(self):
+        """Refresh device tiles whose readings, alerts or connection changed (Overview tab only);
+        returns the ids of the devices repainted."""
+        if self.notebook.select() != str(self.overview_frame):
+            return []
+        painted = []
+        for device_id, tile in self.overview_tiles.items():
+            core = self.devices.devices[device_id]
+            alerting = any(core.alerts.values())
+            key = (tuple(core.sensor_data[sensor]['series'].generation for sensor in ('gas', 'ldr', 'voltage')),
+                   alerting, core.running, core.reconnecting)
+            if key == self.overview_painted.get(device_id):
+                continue
+            self.overview_painted[device_id] = key
+            painted.append(device_id)
             
-            if line.startswith('GAS:'):
-                # Format: "GAS:value,dangerLevel"
-                parts = line[4:].split(',')
-                if len(parts) == 2:
-                    raw_gas_value = float(parts[0])
-                    
-                    # Skip first few values for this sensor
-                    if self.skip_counter['gas'] < self.max_skip:
-                        self.skip_counter['gas'] += 1
-                        return  # Skip this data point
-                    
-                    # Apply adaptive filter with calibration
-                    filtered_gas_value = self.apply_adaptive_low_pass_filter('gas', raw_gas_value)
-                    
-                    # Update gas sensor data
-                    self.sensor_data['gas']['raw_value'] = raw_gas_value
-                    self.sensor_data['gas']['value'] = filtered_gas_value
-                    self.sensor_data['gas']['history'].append(raw_gas_value)
-                    self.sensor_data['gas']['filtered_history'].append(filtered_gas_value)
-                    self.sensor_data['gas']['timestamps'].append(current_time)
-                    
-            elif line.startswith('LDR:'):
-                # Format: "LDR:time,value"  
-                parts = line[4:].split(',')
-                if len(parts) == 2:
-                    raw_ldr_value = float(parts[1])
-                    
-                    # Skip first few values for this sensor
-                    if self.skip_counter['ldr'] < self.max_skip:
-                        self.skip_counter['ldr'] += 1
-                        return  # Skip this data point
-                    
-                    # Apply adaptive filter with calibration
-                    filtered_ldr_value = self.apply_adaptive_low_pass_filter('ldr', raw_ldr_value)
-                    
-                    # Update LDR sensor data
-                    self.sensor_data['ldr']['raw_value'] = raw_ldr_value
-                    self.sensor_data['ldr']['value'] = filtered_ldr_value
-                    self.sensor_data['ldr']['history'].append(raw_ldr_value)
-                    self.sensor_data['ldr']['filtered_history'].append(filtered_ldr_value)
-                    self.sensor_data['ldr']['timestamps'].append(current_time)
-                    
-                    # Update LDR LED state
-                    self.update_ldr_led_state(filtered_ldr_value)
-                    
-            elif line.startswith('VOLT:'):
-                # Format: "VOLT:min,value,max"
-                parts = line[5:].split(',')
-                if len(parts) == 3:
-                    raw_volt_value = float(parts[1])
-                    
-                    # Skip first few values for this sensor
-                    if self.skip_counter['voltage'] < self.max_skip:
-                        self.skip_counter['voltage'] += 1
-                        return  # Skip this data point
-                    
-                    # Apply adaptive filter with calibration
-                    filtered_volt_value = self.apply_adaptive_low_pass_filter('voltage', raw_volt_value)
-                    
-                    # Update voltage sensor data
-                    self.sensor_data['voltage']['raw_value'] = raw_volt_value
-                    self.sensor_data['voltage']['value'] = filtered_volt_value
-                    self.sensor_data['voltage']['history'].append(raw_volt_value)
-                    self.sensor_data['voltage']['filtered_history'].append(filtered_volt_value)
-                    self.sensor_data['voltage']['timestamps'].append(current_time)
-                    
-            elif line.startswith('LED_STATUS:'):
-                # Format: "LED_STATUS:gas,ldr,volt"
-                parts = line[11:].split(',')
-                if len(parts) == 3:
-                    gas_led = int(parts[0])
-                    ldr_led = int(parts[1])
-                    volt_led = int(parts[2])
-                    # Update LED status display if needed
-                    
-            elif line.startswith('MODE_CHANGED:'):
-                mode = line.split(':')[1]
-                self.log_message(f"Mode changed to: {mode}")
-                
-            elif line.startswith('LED') and ':' in line:
-                # LED command confirmation like "LED1:ON"
-                led, state = line.split(':', 1)
-                self.log_message(f"{led} turned {state}")
-                
-        except Exception as e:
-            print(f"Error parsing data: {e}")
+            if not core.running:
+                status, bg = "disconnected", '#34495e'
+            elif core.reconnecting:
+                status, bg = "reconnecting...", '#d35400'
+            else:
+                status = core.serial_port_obj.port if core.serial_port_obj else "replay"
+                bg = '#c0392b' if alerting else '#1e8449'
+            temp = min(core.sensor_data['voltage']['value'] * 100, 300)
+            text = (f"{status}\nGas: {core.sensor_data['gas']['value']:.0f} PPM\n"
+                    f"LDR: {core.sensor_data['ldr']['value']:.0f}\nTemp: {temp:.0f}°C")
+            tile['body'].config(text=text, bg=bg)
+            tile['title'].config(bg=bg)
+            tile['frame'].config(bg=bg)
+        return painted
 
     def create_sensor_frame(self, parent, title, row, col, color):
         frame = tk.Frame(parent, bg='#34495e', relief=tk.RAISED, bd=2)
@@ -743,6 +1126,8 @@ class SensorMonitorApp:
     def change_visualization(self, sensor_type):
         viz_type = getattr(self, f'{sensor_type}_viz_var').get()
         self.current_viz[sensor_type] = viz_type
+        # Force a repaint of the new view on the next tick
+        self.painted_generation[sensor_type] = -1
         
         container = getattr(self, f'{sensor_type}_viz_container')
         for widget in container.winfo_children():
@@ -755,505 +1140,104 @@ class SensorMonitorApp:
         elif viz_type == 'Digital Version':
             getattr(self, f'create_{sensor_type}_digital_version')()
             
-    # Update warning messages based on sensor values and LED states
+    # Update warning messages from the core's active alert rules, under each rule's panel
     def update_warnings(self):
-        # Gas sensor warning
-        gas_value = self.sensor_data['gas']['value']
-        if gas_value > 350:
-            self.gas_warning_label.config(text="⚠️ If sensor read upper than 350, Gas cooker not healthy.")
-        else:
-            self.gas_warning_label.config(text="")
-            
-        # Temperature sensor warning
-        temp_value = min(self.sensor_data['voltage']['value'] * 100, 300)
-        if temp_value > 200:
-            self.voltage_warning_label.config(text="⚠️ If maximum temperature upper than 200°C, Gas cooker not healthy.")
-        else:
-            self.voltage_warning_label.config(text="")
-            
-        # LDR sensor warning - based on LED state (pin 26)
-        ldr_led_state = self.sensor_data['ldr']['led_state']
-        if ldr_led_state:
-            self.ldr_warning_label.config(text="⚠️ LDR LED is ON - Gas cooker not healthy.")
-        else:
-            self.ldr_warning_label.config(text="")
-            
-    # Update LDR LED state based on Arduino logic (LDR value > 1500)
-    def update_ldr_led_state(self, ldr_value):
-        self.sensor_data['ldr']['led_state'] = (ldr_value > 1500)
-        
-    def log_message(self, message):
-        """Add message to log"""
-        print(f"LOG: {message}")
+        self.warnings_dirty = False
+        panels = {'gas': 'gas', 'ldr': 'ldr', 'voltage': 'voltage', 'temperature': 'voltage'}
+        messages = {'gas': [], 'ldr': [], 'voltage': []}
+        for rule in self.core.alert_engine.active():
+            messages[panels.get(rule.panel, 'gas')].append(rule.message)
+        for sensor, lines in messages.items():
+            getattr(self, f'{sensor}_warning_label').config(text="\n".join(lines))
 
     # ==================== OPTIMIZED VISUALIZATION METHODS ====================
     
     def create_gas_time_graph(self):
-        canvas = tk.Canvas(self.gas_viz_container, bg='#2c3e50', highlightthickness=0)
-        canvas.pack(fill=tk.BOTH, expand=True)
-        self.gas_time_canvas = canvas
-        canvas.bind('<Configure>', lambda e: self.update_gas_time_graph())
+        self.gas_time_graph = TimeGraph(self.gas_viz_container, '#2ecc71', 1000, "Gas Level",
+                                        threshold=350, y_ticks=range(0, 1001, 250),
+                                        current_text=lambda v: (f"Current: {v:.0f} PPM", '#ecf0f1'))
         
     def update_gas_time_graph(self):
-        if not hasattr(self, 'gas_time_canvas') or not self.gas_time_canvas.winfo_exists():
+        if not hasattr(self, 'gas_time_graph') or not self.gas_time_graph.exists():
             return
-
-        # Use filtered history for display
-        history = list(self.sensor_data['gas']['filtered_history'])
-        timestamps = list(self.sensor_data['gas']['timestamps'])
-        self.gas_time_canvas.delete("all")
-        
-        width = self.gas_time_canvas.winfo_width()
-        height = self.gas_time_canvas.winfo_height()
-        
-        if width < 50 or height < 50:
+        if self.history_span:
+            self.update_history_graph('gas')
             return
-        
-        if len(history) > 0:
-            graph_width = width - 80
-            graph_height = height - 100
-            
-            # Draw axes
-            self.gas_time_canvas.create_line(60, 40, 60, 40 + graph_height, fill='#7f8c8d', width=2)
-            self.gas_time_canvas.create_line(60, 40 + graph_height, 60 + graph_width, 40 + graph_height, 
-                                             fill='#7f8c8d', width=2)
-            
-            # Set gas sensor range to 0-1000
-            max_val = 1000
-            min_val = 0
-            val_range = max_val - min_val if max_val != min_val else 1
-            
-            # Optimized: Draw fewer points for better performance
-            points = []
-            step = max(1, len(history) // 50)  # Show max 50 points for performance
-            for i in range(0, len(history), step):
-                val = history[i]
-                x = 60 + (i / max(1, len(history)-1)) * graph_width
-                # Cap values at 1000 for display
-                display_val = min(val, max_val)
-                y = 40 + graph_height - ((display_val - min_val) / val_range) * graph_height
-                points.append((x, y))
-            
-            # Draw trend line - use simple line instead of smooth for performance
-            if len(points) > 1:
-                self.gas_time_canvas.create_line(points, fill='#2ecc71', width=2)
-            elif len(points) == 1:
-                x, y = points[0]
-                self.gas_time_canvas.create_oval(x-2, y-2, x+2, y+2, fill='#2ecc71', outline='#2ecc71')
-            
-            # Draw danger level line
-            danger_y = 40 + graph_height - ((350 - min_val) / val_range) * graph_height
-            if 40 <= danger_y <= 40 + graph_height:
-                self.gas_time_canvas.create_line(60, danger_y, 60 + graph_width, danger_y,
-                                                 fill='#f1c40f', width=2, dash=(5, 2))
-                self.gas_time_canvas.create_text(55, danger_y, text="350", anchor='e',
-                                                 font=('Arial', 8), fill='#f1c40f')
-            
-            # Draw current value
-            if history:
-                current_val = min(history[-1], max_val)  # Cap current value at 1000
-                self.gas_time_canvas.create_text(width/2, 20, 
-                                                 text=f"Current: {current_val:.0f} PPM", 
-                                                 font=('Arial', 12, 'bold'), fill='#ecf0f1')
-            
-            # Labels
-            self.gas_time_canvas.create_text(width/2, height-20, text="Time →", 
-                                             font=('Arial', 10), fill='#bdc3c7')
-            self.gas_time_canvas.create_text(20, height/2, text="Gas Level", angle=90,
-                                             font=('Arial', 10), fill='#bdc3c7')
-            
-            # Y-axis labels for gas sensor (0-1000) - reduced number for performance
-            for i in range(0, 1001, 250):
-                y_pos = 40 + graph_height - ((i - min_val) / val_range) * graph_height
-                if 40 <= y_pos <= 40 + graph_height:
-                    self.gas_time_canvas.create_text(50, y_pos, text=str(i), anchor='e',
-                                                    font=('Arial', 8), fill='#bdc3c7')
-        else:
-            self.gas_time_canvas.create_text(width/2, height/2, 
-                                             text="No data available\nConnect to device", 
-                                             font=('Arial', 12), fill='#bdc3c7')
+        # Use filtered history for display (a view into the ring buffer, no copy)
+        series = self.sensor_data['gas']['series']
+        self.gas_time_graph.update(series.filtered(self.graph_window), (self.core.device_id, series.generation))
 
     def create_ldr_time_graph(self):
-        canvas = tk.Canvas(self.ldr_viz_container, bg='#2c3e50', highlightthickness=0)
-        canvas.pack(fill=tk.BOTH, expand=True)
-        self.ldr_time_canvas = canvas
-        canvas.bind('<Configure>', lambda e: self.update_ldr_time_graph())
+        def current_text(value):
+            status = "HIGH" if value > 1500 else "LOW"
+            color = '#e74c3c' if value > 1500 else '#f39c12'
+            return f"Current: {value:.0f} ({status})", color
+        
+        self.ldr_time_graph = TimeGraph(self.ldr_viz_container, '#f39c12', 3000, "Light Level",
+                                        threshold=1500, threshold_color='#3498db',
+                                        y_ticks=range(0, 3001, 750), current_text=current_text)
         
     def update_ldr_time_graph(self):
-        if not hasattr(self, 'ldr_time_canvas') or not self.ldr_time_canvas.winfo_exists():
+        if not hasattr(self, 'ldr_time_graph') or not self.ldr_time_graph.exists():
             return
-
-        # Use filtered history for display
-        history = list(self.sensor_data['ldr']['filtered_history'])
-        timestamps = list(self.sensor_data['ldr']['timestamps'])
-        self.ldr_time_canvas.delete("all")
-        
-        width = self.ldr_time_canvas.winfo_width()
-        height = self.ldr_time_canvas.winfo_height()
-        
-        if width < 50 or height < 50:
+        if self.history_span:
+            self.update_history_graph('ldr')
             return
-        
-        if len(history) > 0:
-            graph_width = width - 80
-            graph_height = height - 100
-            
-            self.ldr_time_canvas.create_line(60, 40, 60, 40 + graph_height, fill='#7f8c8d', width=2)
-            self.ldr_time_canvas.create_line(60, 40 + graph_height, 60 + graph_width, 40 + graph_height, 
-                                             fill='#7f8c8d', width=2)
-            
-            # Set LDR sensor range to 0-3000
-            max_val = 3000
-            min_val = 0
-            val_range = max_val - min_val if max_val != min_val else 1
-            
-            # Optimized: Draw fewer points
-            points = []
-            step = max(1, len(history) // 50)
-            for i in range(0, len(history), step):
-                val = history[i]
-                x = 60 + (i / max(1, len(history)-1)) * graph_width
-                # Cap values at 3000 for display
-                display_val = min(val, max_val)
-                y = 40 + graph_height - ((display_val - min_val) / val_range) * graph_height
-                points.append((x, y))
-            
-            if len(points) > 1:
-                self.ldr_time_canvas.create_line(points, fill='#f39c12', width=2)
-            elif len(points) == 1:
-                x, y = points[0]
-                self.ldr_time_canvas.create_oval(x-2, y-2, x+2, y+2, fill='#f39c12', outline='#f39c12')
-            
-            threshold_y = 40 + graph_height - ((1500 - min_val) / val_range) * graph_height
-            if 40 <= threshold_y <= 40 + graph_height:
-                self.ldr_time_canvas.create_line(60, threshold_y, 60 + graph_width, threshold_y,
-                                                 fill='#3498db', width=2, dash=(5, 2))
-                self.ldr_time_canvas.create_text(55, threshold_y, text="1500", anchor='e',
-                                                 font=('Arial', 8), fill='#3498db')
-            
-            if history:
-                current_val = min(history[-1], max_val)  # Cap current value at 3000
-                status = "HIGH" if current_val > 1500 else "LOW"
-                color = '#e74c3c' if current_val > 1500 else '#f39c12'
-                self.ldr_time_canvas.create_text(width/2, 20, 
-                                                 text=f"Current: {current_val:.0f} ({status})", 
-                                                 font=('Arial', 12, 'bold'), fill=color)
-            
-            self.ldr_time_canvas.create_text(width/2, height-20, text="Time →", 
-                                             font=('Arial', 10), fill='#bdc3c7')
-            self.ldr_time_canvas.create_text(20, height/2, text="Light Level", angle=90,
-                                             font=('Arial', 10), fill='#bdc3c7')
-            
-            # Y-axis labels for LDR sensor (0-3000) - reduced number
-            for i in range(0, 3001, 750):
-                y_pos = 40 + graph_height - ((i - min_val) / val_range) * graph_height
-                if 40 <= y_pos <= 40 + graph_height:
-                    self.ldr_time_canvas.create_text(50, y_pos, text=str(i), anchor='e',
-                                                    font=('Arial', 8), fill='#bdc3c7')
-        else:
-            self.ldr_time_canvas.create_text(width/2, height/2, 
-                                             text="No data available\nConnect to device", 
-                                             font=('Arial', 12), fill='#bdc3c7')
+        series = self.sensor_data['ldr']['series']
+        self.ldr_time_graph.update(series.filtered(self.graph_window), (self.core.device_id, series.generation))
 
     def create_voltage_time_graph(self):
-        canvas = tk.Canvas(self.voltage_viz_container, bg='#2c3e50', highlightthickness=0)
-        canvas.pack(fill=tk.BOTH, expand=True)
-        self.voltage_time_canvas = canvas
-        canvas.bind('<Configure>', lambda e: self.update_voltage_time_graph())
+        self.voltage_time_graph = TimeGraph(self.voltage_viz_container, '#e74c3c', 300, "Temperature (°C)",
+                                            threshold=200,
+                                            current_text=lambda v: (f"Current: {v:.1f}°C", '#ecf0f1'))
         
     def update_voltage_time_graph(self):
-        if not hasattr(self, 'voltage_time_canvas') or not self.voltage_time_canvas.winfo_exists():
+        if not hasattr(self, 'voltage_time_graph') or not self.voltage_time_graph.exists():
             return
-
-        # Use filtered history for display
-        history_volt = list(self.sensor_data['voltage']['filtered_history'])
-        timestamps = list(self.sensor_data['voltage']['timestamps'])
-        self.voltage_time_canvas.delete("all")
-        
-        width = self.voltage_time_canvas.winfo_width()
-        height = self.voltage_time_canvas.winfo_height()
-        
-        if width < 50 or height < 50:
+        if self.history_span:
+            self.update_history_graph('voltage')
             return
-        
-        if len(history_volt) > 0:
-            history_temp = [min(v * 100, 300) for v in history_volt]
-            
-            graph_width = width - 80
-            graph_height = height - 100
-            
-            self.voltage_time_canvas.create_line(60, 40, 60, 40 + graph_height, fill='#7f8c8d', width=2)
-            self.voltage_time_canvas.create_line(60, 40 + graph_height, 60 + graph_width, 40 + graph_height, 
-                                             fill='#7f8c8d', width=2)
-            
-            max_val = 300 
-            min_val = 0
-            val_range = max_val - min_val if max_val != min_val else 1
-            
-            # Optimized: Draw fewer points
-            points = []
-            step = max(1, len(history_temp) // 50)
-            for i in range(0, len(history_temp), step):
-                temp = history_temp[i]
-                x = 60 + (i / max(1, len(history_temp)-1)) * graph_width
-                y = 40 + graph_height - ((temp - min_val) / val_range) * graph_height
-                points.append((x, y))
-            
-            if len(points) > 1:
-                self.voltage_time_canvas.create_line(points, fill='#e74c3c', width=2)
-            elif len(points) == 1:
-                x, y = points[0]
-                self.voltage_time_canvas.create_oval(x-2, y-2, x+2, y+2, fill='#e74c3c', outline='#e74c3c')
-            
-            danger_y = 40 + graph_height - ((200 - min_val) / val_range) * graph_height
-            if 40 <= danger_y <= 40 + graph_height:
-                self.voltage_time_canvas.create_line(60, danger_y, 60 + graph_width, danger_y,
-                                                 fill='#f1c40f', width=2, dash=(5, 2))
-                self.voltage_time_canvas.create_text(55, danger_y, text="200", anchor='e',
-                                                 font=('Arial', 8), fill='#f1c40f')
-            
-            if history_temp:
-                current_val = history_temp[-1]
-                self.voltage_time_canvas.create_text(width/2, 20, 
-                                                 text=f"Current: {current_val:.1f}°C", 
-                                                 font=('Arial', 12, 'bold'), fill='#ecf0f1')
-            
-            self.voltage_time_canvas.create_text(width/2, height-20, text="Time →", 
-                                             font=('Arial', 10), fill='#bdc3c7')
-            self.voltage_time_canvas.create_text(20, height/2, text="Temperature (°C)", angle=90,
-                                             font=('Arial', 10), fill='#bdc3c7')
-        else:
-            self.voltage_time_canvas.create_text(width/2, height/2, 
-                                             text="No data available\nConnect to device", 
-                                             font=('Arial', 12), fill='#bdc3c7')
+        series = self.sensor_data['voltage']['series']
+        history_volt = series.filtered(self.graph_window)
+        self.voltage_time_graph.update(np.minimum(history_volt * 100, 300), (self.core.device_id, series.generation))
 
     # ==================== SPEED METER VISUALIZATIONS ====================
     
     def create_gas_speed_meter(self):
-        canvas = tk.Canvas(self.gas_viz_container, bg='#2c3e50', highlightthickness=0)
-        canvas.pack(fill=tk.BOTH, expand=True)
-        self.gas_speed_canvas = canvas
-        canvas.bind('<Configure>', lambda e: self.update_gas_speed_meter())
+        # Gas sensor range 0-1000, danger above 350
+        self.gas_gauge = Gauge(self.gas_viz_container, 1000,
+                               zones=[(350, '#27ae60'), (1000, '#e74c3c')],
+                               ticks=range(0, 1001, 250), label="Gas Level",
+                               value_text=lambda v: f"{v:.0f} PPM")
         
     def update_gas_speed_meter(self):
-        if not hasattr(self, 'gas_speed_canvas') or not self.gas_speed_canvas.winfo_exists():
+        if not hasattr(self, 'gas_gauge') or not self.gas_gauge.exists():
             return
-            
         # Use filtered value for display
-        value = min(self.sensor_data['gas']['value'], 1000)  # Cap at 1000
-        self.gas_speed_canvas.delete("all")
-        
-        width = self.gas_speed_canvas.winfo_width()
-        height = self.gas_speed_canvas.winfo_height()
-        
-        if width < 10 or height < 10:
-            return
-        
-        center_x, center_y = width/2, height/2 + 20
-        radius = min(width, height) / 3
-        
-        start_angle = 135
-        extent = 270
-        
-        # Set gas sensor range to 0-1000
-        max_val = 1000
-        min_val = 0
-        
-        # Color zones for gas sensor (0-1000 range)
-        safe_end = 350/max_val * extent
-        danger_end = extent - safe_end
-
-        # Draw the gauge background
-        self.gas_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle, extent=safe_end, outline='#27ae60', width=15, style=tk.ARC)
-        self.gas_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle+safe_end, extent=danger_end, outline='#e74c3c', width=15, style=tk.ARC)
-        
-        # Draw needle
-        needle_angle = start_angle + (min(max(value, min_val), max_val) / max_val) * extent
-        rad_angle = math.radians(needle_angle)
-        needle_x = center_x + (radius-10) * math.cos(rad_angle)
-        needle_y = center_y - (radius-10) * math.sin(rad_angle)
-        
-        self.gas_speed_canvas.create_line(center_x, center_y, needle_x, needle_y, fill='#ffffff', width=4)
-        
-        # Draw center circle
-        self.gas_speed_canvas.create_oval(center_x-10, center_y-10, center_x+10, center_y+10,
-                                         fill='#34495e', outline='#ffffff', width=2)
-        
-        # Draw value and label
-        self.gas_speed_canvas.create_text(width/2, 40, text=f"{value:.0f} PPM", 
-                                         font=('Arial', 16, 'bold'), fill='#ecf0f1')
-        self.gas_speed_canvas.create_text(width/2, 70, text="Gas Level", 
-                                         font=('Arial', 12), fill='#bdc3c7')
-        
-        # Draw scale marks (0-1000 range) - reduced number for performance
-        for i in range(0, 1001, 250):
-            mark_angle = start_angle + (i / max_val) * extent
-            rad_mark = math.radians(mark_angle)
-            
-            inner_radius = radius - 20
-            outer_radius = radius
-            inner_x = center_x + inner_radius * math.cos(rad_mark)
-            inner_y = center_y - inner_radius * math.sin(rad_mark)
-            outer_x = center_x + outer_radius * math.cos(rad_mark)
-            outer_y = center_y - outer_radius * math.sin(rad_mark)
-            
-            self.gas_speed_canvas.create_line(inner_x, inner_y, outer_x, outer_y, fill='#ecf0f1', width=2)
-            
-            label_radius = radius - 35
-            label_x = center_x + label_radius * math.cos(rad_mark)
-            label_y = center_y - label_radius * math.sin(rad_mark)
-            self.gas_speed_canvas.create_text(label_x, label_y, text=str(i),
-                                             font=('Arial', 8), fill='#bdc3c7')
+        self.gas_gauge.update(min(self.sensor_data['gas']['value'], 1000))  # Cap at 1000
 
     def create_ldr_speed_meter(self):
-        canvas = tk.Canvas(self.ldr_viz_container, bg='#2c3e50', highlightthickness=0)
-        canvas.pack(fill=tk.BOTH, expand=True)
-        self.ldr_speed_canvas = canvas
-        canvas.bind('<Configure>', lambda e: self.update_ldr_speed_meter())
+        # Color zones for LDR (dark below the 1500 LED threshold)
+        self.ldr_gauge = Gauge(self.ldr_viz_container, 4095,
+                               zones=[(1500, '#3498db'), (4095, '#e74c3c')],
+                               ticks=[0, 1024, 2048, 3072, 4095], label="Light Level")
         
     def update_ldr_speed_meter(self):
-        if not hasattr(self, 'ldr_speed_canvas') or not self.ldr_speed_canvas.winfo_exists():
-            return
-            
-        # Use filtered value for display
-        value = self.sensor_data['ldr']['value']
-        self.ldr_speed_canvas.delete("all")
-        
-        width = self.ldr_speed_canvas.winfo_width()
-        height = self.ldr_speed_canvas.winfo_height()
-        
-        if width < 10 or height < 10:
+        if not hasattr(self, 'ldr_gauge') or not self.ldr_gauge.exists():
             return
-        
-        center_x, center_y = width/2, height/2 + 20
-        radius = min(width, height) / 3
-        
-        start_angle = 135
-        extent = 270
-        
-        max_val = 4095
-        
-        # Color zones for LDR
-        dark_end = 1500 / max_val * extent
-        bright_end = extent - dark_end
-        
-        self.ldr_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle, extent=dark_end, outline='#3498db', width=15, style=tk.ARC)
-        self.ldr_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle+dark_end, extent=bright_end, outline='#e74c3c', width=15, style=tk.ARC)
-        
-        needle_angle = start_angle + (min(max(value, 0), max_val) / max_val) * extent
-        rad_angle = math.radians(needle_angle)
-        needle_x = center_x + (radius-10) * math.cos(rad_angle)
-        needle_y = center_y - (radius-10) * math.sin(rad_angle)
-        
-        self.ldr_speed_canvas.create_line(center_x, center_y, needle_x, needle_y, fill='#ffffff', width=4)
-        
-        self.ldr_speed_canvas.create_oval(center_x-10, center_y-10, center_x+10, center_y+10,
-                                         fill='#34495e', outline='#ffffff', width=2)
-        
-        self.ldr_speed_canvas.create_text(width/2, 40, text=f"{value:.0f}", 
-                                         font=('Arial', 16, 'bold'), fill='#ecf0f1')
-        self.ldr_speed_canvas.create_text(width/2, 70, text="Light Level", 
-                                         font=('Arial', 12), fill='#bdc3c7')
-        
-        # Reduced number of marks for performance
-        for i in [0, 1024, 2048, 3072, 4095]:
-            mark_angle = start_angle + (i / max_val) * extent
-            rad_mark = math.radians(mark_angle)
-            
-            inner_radius = radius - 20
-            outer_radius = radius
-            inner_x = center_x + inner_radius * math.cos(rad_mark)
-            inner_y = center_y - inner_radius * math.sin(rad_mark)
-            outer_x = center_x + outer_radius * math.cos(rad_mark)
-            outer_y = center_y - outer_radius * math.sin(rad_mark)
-            
-            self.ldr_speed_canvas.create_line(inner_x, inner_y, outer_x, outer_y, fill='#ecf0f1', width=2)
-            
-            label_radius = radius - 35
-            label_x = center_x + label_radius * math.cos(rad_mark)
-            label_y = center_y - label_radius * math.sin(rad_mark)
-            self.ldr_speed_canvas.create_text(label_x, label_y, text=str(i),
-                                             font=('Arial', 8), fill='#bdc3c7')
+        self.ldr_gauge.update(self.sensor_data['ldr']['value'])
 
     def create_voltage_speed_meter(self):
-        canvas = tk.Canvas(self.voltage_viz_container, bg='#2c3e50', highlightthickness=0)
-        canvas.pack(fill=tk.BOTH, expand=True)
-        self.voltage_speed_canvas = canvas
-        canvas.bind('<Configure>', lambda e: self.update_voltage_speed_meter())
+        # Color zones for temperature
+        self.voltage_gauge = Gauge(self.voltage_viz_container, 300,
+                                   zones=[(100, '#27ae60'), (200, '#f1c40f'), (300, '#e74c3c')],
+                                   ticks=range(0, 301, 100), label="Temperature",
+                                   value_text=lambda v: f"{v:.1f}°C")
         
     def update_voltage_speed_meter(self):
-        if not hasattr(self, 'voltage_speed_canvas') or not self.voltage_speed_canvas.winfo_exists():
-            return
-
-        # Use filtered value for display
-        value_volt = self.sensor_data['voltage']['value']
-        value_temp = min(value_volt * 100, 300)
-        
-        self.voltage_speed_canvas.delete("all")
-        
-        width = self.voltage_speed_canvas.winfo_width()
-        height = self.voltage_speed_canvas.winfo_height()
-        
-        if width < 10 or height < 10:
+        if not hasattr(self, 'voltage_gauge') or not self.voltage_gauge.exists():
             return
-        
-        center_x, center_y = width/2, height/2 + 20
-        radius = min(width, height) / 3
-        
-        start_angle = 135
-        extent = 270
-        max_val = 300
-        
-        # Color zones for temperature
-        safe_end = 100/max_val * extent
-        warning_end = (200/max_val * extent) - safe_end
-        danger_end = extent - (safe_end + warning_end)
-
-        self.voltage_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle, extent=safe_end, outline='#27ae60', width=15, style=tk.ARC)
-        self.voltage_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle+safe_end, extent=warning_end, outline='#f1c40f', width=15, style=tk.ARC)
-        self.voltage_speed_canvas.create_arc(center_x-radius, center_y-radius, center_x+radius, center_y+radius,
-                                         start=start_angle+safe_end+warning_end, extent=danger_end, outline='#e74c3c', width=15, style=tk.ARC)
-        
-        needle_angle = start_angle + (min(max(value_temp, 0), max_val) / max_val) * extent
-        rad_angle = math.radians(needle_angle)
-        needle_x = center_x + (radius-10) * math.cos(rad_angle)
-        needle_y = center_y - (radius-10) * math.sin(rad_angle)
-        
-        self.voltage_speed_canvas.create_line(center_x, center_y, needle_x, needle_y, fill='#ffffff', width=4)
-        
-        self.voltage_speed_canvas.create_oval(center_x-10, center_y-10, center_x+10, center_y+10,
-                                         fill='#34495e', outline='#ffffff', width=2)
-        
-        self.voltage_speed_canvas.create_text(width/2, 40, text=f"{value_temp:.1f}°C", 
-                                         font=('Arial', 16, 'bold'), fill='#ecf0f1')
-        self.voltage_speed_canvas.create_text(width/2, 70, text="Temperature", 
-                                         font=('Arial', 12), fill='#bdc3c7')
-        
-        # Reduced number of marks for performance
-        for i in range(0, 301, 100):
-            mark_angle = start_angle + (i / max_val) * extent
-            rad_mark = math.radians(mark_angle)
-            
-            inner_radius = radius - 20
-            outer_radius = radius
-            inner_x = center_x + inner_radius * math.cos(rad_mark)
-            inner_y = center_y - inner_radius * math.sin(rad_mark)
-            outer_x = center_x + outer_radius * math.cos(rad_mark)
-            outer_y = center_y - outer_radius * math.sin(rad_mark)
-            
-            self.voltage_speed_canvas.create_line(inner_x, inner_y, outer_x, outer_y, fill='#ecf0f1', width=2)
-            
-            label_radius = radius - 35
-            label_x = center_x + label_radius * math.cos(rad_mark)
-            label_y = center_y - label_radius * math.sin(rad_mark)
-            self.voltage_speed_canvas.create_text(label_x, label_y, text=str(i),
-                                             font=('Arial', 8), fill='#bdc3c7')
+        self.voltage_gauge.update(min(self.sensor_data['voltage']['value'] * 100, 300))
 
     # ==================== DIGITAL VERSION VISUALIZATIONS ====================
     
@@ -1394,9 +1378,47 @@ class SensorMonitorApp:
     def on_closing(self):
         """Called when the window is closed."""
         self.stop_serial()
+        if self.api_server:
+            self.api_server.stop()
+        self.devices.close()
         self.root.destroy()
 
+def benchmark_startup():
+    """Cold start the dashboard, print how long each phase took, and exit.
+
+    Run as the first thing in a fresh interpreter so the import phase is cold.
+    """
+    phases = [('imports', time.perf_counter() - IMPORTS_STARTED)]
+    started = time.perf_counter()
+    root = tk.Tk()
+    phases.append(('tk', time.perf_counter() - started))
+    app = SensorMonitorApp(root)
+    phases.extend(app.startup_phases)
+    started = time.perf_counter()
+    root.update()
+    phases.append(('window shown', time.perf_counter() - started))
+    window_shown = time.perf_counter() - IMPORTS_STARTED
+    # The port scan runs alongside the above; wait for it so its time can be reported
+    while app.ports_thread is not None and app.ports_thread.is_alive():
+        time.sleep(0.005)
+    
+    print(f"{'phase':16s} {'ms':>8s}")
+    for phase, seconds in phases:
+        print(f"{phase:16s} {seconds * 1000:8.1f}")
+    print(f"{'to window':16s} {window_shown * 1000:8.1f}")
+    print(f"{'port scan':16s} {app.ports_seconds * 1000:8.1f}  (background)")
+    app.devices.close()
+    root.destroy()
+    return 0
+
+
 if __name__ == "__main__":
+    if sys.argv[1:] == ['--bench-startup']:
+        sys.exit(benchmark_startup())
+    if len(sys.argv) > 1:
+        # Headless ingest/replay, e.g. Over.py --replay capture.txt; see monitor_core.main.
+        # `python monitor_core.py ...` runs the same thing without loading tkinter
+        sys.exit(headless_main())
     root = tk.Tk()
     app = SensorMonitorApp(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
@@ -0,0 +1,373 @@
+"""Streaming alert rules, evaluated on every filtered sample.
+
+Rules are plain dicts. The defaults reproduce the dashboard's original
+warnings; alerts.json next to this file (``python alerts.py --init`` writes a
+starter copy) replaces or extends them, per device if needed:
+
+    {
+      "default": [
+        {"name": "gas", "type": "threshold", "sensor": "gas", "above": 350,
+         "hysteresis": 15, "min_duration": 0.5, "message": "Gas high"},
+        {"name": "gas_rise", "type": "rate", "sensor": "gas", "above": 20,
+         "window": 2.0, "message": "Gas rising faster than 20 PPM/s"},
+        {"name": "leak_and_heat", "type": "all", "rules": ["gas", "temperature"],
+         "panel": "gas", "message": "Gas and heat together"}
+      ],
+      "devices": {"device2": [{"name": "gas_rise", "enabled": false}]}
+    }
+
+threshold: active while the sensor is above (or below) a level. It clears only
+    once it is back by more than `hysteresis`. It must hold for `min_duration`
+    seconds to raise and for `clear_duration` seconds to clear.
+rate: the same, applied to the rise per second over the last `window` seconds.
+all / any: active when all / any of the named rules are (combined ones too, in
+    any order; a cycle is an error).
+
+Sensors are 'gas', 'ldr', 'voltage' and 'temperature' (display degrees, from
+the voltage). ``python alerts.py --bench`` times rule evaluation per sample.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+ALERTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alerts.json')
+
+# Alert sensor -> (filtered input sensor, conversion to display units)
+DERIVED_SENSORS = {'temperature': ('voltage', lambda volts: min(volts * 100, 300))}
+INPUT_SENSORS = ('gas', 'ldr', 'voltage')
+
+# Evaluated per sample, a bare threshold flickers with sensor noise; the small
+# hysteresis bands keep a warning up until the reading is clearly back
+DEFAULT_RULES = [
+    {'name': 'gas', 'type': 'threshold', 'sensor': 'gas', 'above': 350, 'hysteresis': 10,
+     'message': "⚠️ If sensor read upper than 350, Gas cooker not healthy."},
+    {'name': 'temperature', 'type': 'threshold', 'sensor': 'temperature', 'above': 200, 'hysteresis': 5,
+     'message': "⚠️ If maximum temperature upper than 200°C, Gas cooker not healthy."},
+    # Same condition as the firmware's LDR LED (pin 26)
+    {'name': 'ldr', 'type': 'threshold', 'sensor': 'ldr', 'above': 1500,
+     'message': "⚠️ LDR LED is ON - Gas cooker not healthy."},
+]
+
+
+class ThresholdRule:
+    """Level rule with hysteresis and raise/clear debounce."""
+
+    __slots__ = ('name', 'sensor', 'panel', 'message', 'sign', 'level', 'hysteresis',
+                 'min_duration', 'clear_duration', 'active', 'since', 'value')
+
+    def __init__(self, spec):
+        self.name = spec['name']
+        self.sensor = spec['sensor']
+        if self.sensor not in INPUT_SENSORS and self.sensor not in DERIVED_SENSORS:
+            raise ValueError(f"alert rule {self.name!r}: unknown sensor {self.sensor!r}")
+        self.panel = spec.get('panel', self.sensor)
+        self.message = spec.get('message', f"⚠️ {self.name}")
+        if ('above' in spec) == ('below' in spec):
+            raise ValueError(f"alert rule {self.name!r}: needs exactly one of 'above' or 'below'")
+        # Compare sign * value against sign * level, so 'below' is 'above' mirrored
+        self.sign = 1.0 if 'above' in spec else -1.0
+        self.level = self.sign * float(spec['above'] if 'above' in spec else spec['below'])
+        self.hysteresis = float(spec.get('hysteresis', 0.0))
+        self.min_duration = float(spec.get('min_duration', 0.0))
+        self.clear_duration = float(spec.get('clear_duration', 0.0))
+        self.active = False
+        self.since = None   # when the pending raise/clear condition started
+        self.value = 0.0    # last value the rule saw
+
+    def update(self, t, value):
+        """Feed one sample at time t; returns True if the rule raised or cleared."""
+        self.value = value
+        x = self.sign * value
+        if self.active:
+            changing = x <= self.level - self.hysteresis
+            hold = self.clear_duration
+        else:
+            changing = x > self.level
+            hold = self.min_duration
+        if not changing:
+            self.since = None
+            return False
+        if hold:
+            if self.since is None:
+                self.since = t
+            if t - self.since < hold:
+                return False
+        self.since = None
+        self.active = not self.active
+        return True
+
+
+class RateRule(ThresholdRule):
+    """Threshold on the rate of change (units per second) over a sliding window.
+
+    The engine feeds it the rate from a RateSignal shared by every rate rule on
+    the same sensor and window.
+    """
+
+    __slots__ = ('window',)
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.window = float(spec.get('window', 1.0))
+        if self.window <= 0:
+            raise ValueError(f"alert rule {self.name!r}: window must be positive")
+
+
+class Signal:
+    """One sensor value as the rules see it (converted to display units if needed)."""
+
+    __slots__ = ('convert', 'rules')
+
+    def __init__(self, convert):
+        self.convert = convert
+        self.rules = []
+
+    def feed(self, t, value):
+        return value if self.convert is None else self.convert(value)
+
+
+class RateSignal(Signal):
+    """Rise per second over the last window seconds, from a deque of recent samples."""
+
+    __slots__ = ('window', 'history')
+
+    def __init__(self, convert, window):
+        super().__init__(convert)
+        self.window = window
+        self.history = deque()
+
+    def feed(self, t, value):
+        if self.convert is not None:
+            value = self.convert(value)
+        history = self.history
+        history.append((t, value))
+        while t - history[0][0] > self.window:
+            history.popleft()
+        first_t, first_value = history[0]
+        return (value - first_value) / (t - first_t) if t > first_t else 0.0
+
+
+class CombinedRule:
+    """Active when all (or any) of the named rules are active."""
+
+    __slots__ = ('name', 'sensor', 'panel', 'message', 'mode', 'names', 'children', 'active', 'value')
+
+    def __init__(self, spec):
+        self.name = spec['name']
+        self.mode = spec['type']
+        self.names = list(spec.get('rules', ()))
+        if not self.names:
+            raise ValueError(f"alert rule {self.name!r}: '{self.mode}' needs a 'rules' list")
+        self.sensor = None
+        self.panel = spec.get('panel')
+        self.message = spec.get('message', f"⚠️ {self.name}")
+        self.children = []
+        self.active = False
+        self.value = 0.0
+
+    def update(self, t, value=None):
+        states = [child.active for child in self.children]
+        active = all(states) if self.mode == 'all' else any(states)
+        self.value = float(sum(states))
+        if active != self.active:
+            self.active = active
+            return True
+        return False
+
+
+RULE_TYPES = {'threshold': ThresholdRule, 'rate': RateRule, 'all': CombinedRule, 'any': CombinedRule}
+
+
+def build_rule(spec):
+    try:
+        rule_type = RULE_TYPES[spec.get('type', 'threshold')]
+    except KeyError:
+        raise ValueError(f"alert rule {spec.get('name')!r}: unknown type {spec.get('type')!r}")
+    return rule_type(spec)
+
+
+def merge_rules(base, overrides):
+    """Replace base rules by name, append new ones and drop those with "enabled": false."""
+    merged = {spec['name']: spec for spec in base}
+    for spec in overrides:
+        if spec.get('enabled', True):
+            inherited = merged.get(spec['name'], {})
+            if 'above' in spec or 'below' in spec:
+                # An override's comparison replaces the inherited one rather than joining it
+                inherited = {key: value for key, value in inherited.items() if key not in ('above', 'below')}
+            merged[spec['name']] = {**inherited, **spec}
+        else:
+            merged.pop(spec['name'], None)
+    return [spec for spec in merged.values() if spec.get('enabled', True)]
+
+
+def load_rules(device_id=None, path=ALERTS_PATH):
+    """Rule specs for a device: the file's defaults plus that device's overrides
+    (DEFAULT_RULES when there is no file); raises ValueError on a malformed file."""
+    if not path or not os.path.exists(path):
+        return list(DEFAULT_RULES)
+    with open(path, encoding='utf-8') as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+    rules = config.get('default', DEFAULT_RULES)
+    if device_id is not None:
+        rules = merge_rules(rules, config.get('devices', {}).get(device_id, []))
+    return [spec for spec in rules if spec.get('enabled', True)]
+
+
+def dependency_order(combined):
+    """Combined rules ordered so each comes after the combined rules it names;
+    raises ValueError on a cycle."""
+    ordered = []
+    state = {}  # rule name -> 'visiting' or 'done'
+
+    def visit(rule, path):
+        if state.get(rule.name) == 'done':
+            return
+        if state.get(rule.name) == 'visiting':
+            cycle = ' -> '.join(path[path.index(rule.name):] + [rule.name])
+            raise ValueError(f"alert rules form a cycle: {cycle}")
+        state[rule.name] = 'visiting'
+        for child in rule.children:
+            if isinstance(child, CombinedRule):
+                visit(child, path + [rule.name])
+        state[rule.name] = 'done'
+        ordered.append(rule)
+
+    for rule in combined:
+        visit(rule, [])
+    return ordered
+
+
+class AlertEngine:
+    """Evaluates a rule set sample by sample and reports state changes.
+
+    on_change(rule, t) is called for every raise and clear, after combined rules
+    depending on it have been re-evaluated.
+    """
+
+    def __init__(self, specs, on_change=None):
+        self.on_change = on_change
+        self.rules = {}
+        for spec in specs:
+            rule = build_rule(spec)
+            if rule.name in self.rules:
+                raise ValueError(f"alert rule {rule.name!r} is defined twice")
+            self.rules[rule.name] = rule
+
+        # Input sensor -> signals derived from it, each with its rules, so a sample only
+        # visits its own rules and each conversion or rate is computed once
+        self.by_sensor = {sensor: [] for sensor in INPUT_SENSORS}
+        self.combined = []
+        signals = {}
+        for rule in self.rules.values():
+            if isinstance(rule, CombinedRule):
+                for name in rule.names:
+                    if name not in self.rules:
+                        raise ValueError(f"alert rule {rule.name!r}: no rule named {name!r}")
+                    rule.children.append(self.rules[name])
+                self.combined.append(rule)
+                continue
+            source, convert = DERIVED_SENSORS.get(rule.sensor, (rule.sensor, None))
+            window = rule.window if isinstance(rule, RateRule) else None
+            key = (rule.sensor, window)
+            if key not in signals:
+                signals[key] = Signal(convert) if window is None else RateSignal(convert, window)
+                self.by_sensor[source].append(signals[key])
+            signals[key].rules.append(rule)
+        # A combined rule may name another; evaluate children first so a sample
+        # settles the whole tree in one pass whatever order the file lists them in
+        self.combined = dependency_order(self.combined)
+        for rule in self.combined:
+            if rule.panel is None:
+                rule.panel = next((child.panel for child in rule.children if child.panel), None)
+
+        # --- Counters ---
+        self.samples = 0
+        self.changes = 0
+
+    def update(self, sensor, t, value):
+        """Feed one filtered sample (t in the core's relative seconds)."""
+        self.samples += 1
+        changed = None
+        for signal in self.by_sensor[sensor]:
+            x = signal.feed(t, value)
+            for rule in signal.rules:
+                if rule.update(t, x):
+                    if changed is None:
+                        changed = []
+                    changed.append(rule)
+        if changed is None:
+            return
+        for rule in self.combined:
+            if rule.update(t):
+                changed.append(rule)
+        self.changes += len(changed)
+        if self.on_change:
+            for rule in changed:
+                self.on_change(rule, t)
+
+    def active(self):
+        return [rule for rule in self.rules.values() if rule.active]
+
+
+def benchmark(rules_per_sensor=20, samples=200000):
+    """Time AlertEngine.update over a noisy signal with many rules per sensor."""
+    import random
+    rng = random.Random(1)
+    specs = list(DEFAULT_RULES)
+    for sensor in INPUT_SENSORS + ('temperature',):
+        for number in range(rules_per_sensor):
+            level = rng.uniform(100, 1500)
+            specs.append({'name': f'{sensor}_level_{number}', 'type': 'threshold', 'sensor': sensor,
+                          'above': level, 'hysteresis': level * 0.02, 'min_duration': 0.2})
+            specs.append({'name': f'{sensor}_rise_{number}', 'type': 'rate', 'sensor': sensor,
+                          'above': rng.uniform(5, 50), 'window': 1.0})
+    specs.append({'name': 'combined', 'type': 'all', 'rules': ['gas', 'temperature']})
+    engine = AlertEngine(specs)
+    per_sample = len(specs) / len(INPUT_SENSORS)
+
+    values = {'gas': 300.0, 'ldr': 1200.0, 'voltage': 1.5}
+    feed = []
+    for number in range(samples):
+        sensor = INPUT_SENSORS[number % 3]
+        values[sensor] = max(0.0, values[sensor] + rng.gauss(0, values[sensor] * 0.01))
+        feed.append((sensor, number / 60.0, values[sensor]))
+
+    update = engine.update
+    start = time.perf_counter()
+    for sensor, t, value in feed:
+        update(sensor, t, value)
+    elapsed = time.perf_counter() - start
+    print(f"{len(specs)} rules (~{per_sample:.0f} per sample), {samples} samples: "
+          f"{elapsed / samples * 1e6:.2f} us per sample, "
+          f"{elapsed / (samples * per_sample) * 1e9:.0f} ns per rule evaluation, "
+          f"{engine.changes} state changes")
+    return elapsed / samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alert rules: benchmark or write a starter alerts.json.")
+    parser.add_argument('--bench', action='store_true', help="time rule evaluation per sample")
+    parser.add_argument('--rules', type=int, default=20, help="threshold + rate rules per sensor (bench)")
+    parser.add_argument('--init', action='store_true', help=f"write the default rules to {ALERTS_PATH}")
+    args = parser.parse_args(argv)
+    if args.init:
+        if os.path.exists(ALERTS_PATH):
+            print(f"{ALERTS_PATH} already exists")
+            return 1
+        with open(ALERTS_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'default': DEFAULT_RULES, 'devices': {}}, f, indent=2, ensure_ascii=False)
+        print(f"Wrote {ALERTS_PATH}")
+    else:
+        benchmark(args.rules)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
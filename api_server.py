@@ -0,0 +1,528 @@
+"""Local HTTP/WebSocket API for live sensor data.
+
+An asyncio server on its own thread, standard library only:
+
+    GET /                              small live status page
+    GET /api/devices                   every device, connection and active alerts
+    GET /api/devices/<id>              current values, LEDs, mode and alert states
+    GET /api/devices/<id>/history      ?sensor=gas&seconds=60 from the in-memory history, or
+                                       ?sensor=gas&start=T&end=T[&points=N] from the recordings
+    GET /api/stats                     subscriber count and per-client queue, drops and send lag
+    GET /metrics                       Prometheus / OpenMetrics scrape (metrics.py)
+    GET /ws[?device=<id>,...]          WebSocket push of filtered samples, alerts and link changes
+
+After every drain the owner thread copies just the new samples out of each
+sensor's ring buffer and hands them to the server loop; that costs a few
+microseconds and never waits on a client. The loop encodes each message
+once and queues the same frame on every subscriber. A subscriber whose queue
+is full loses its oldest sample messages (alerts and link changes are kept),
+so a slow client only ever falls behind itself.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from history import HistoryReader
+from metrics import render_metrics
+
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC11B85'
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+SENSORS = ('gas', 'ldr', 'voltage')
+
+STATUS_PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><title>GasHealth Monitor</title>
+<style>body{font-family:Arial;background:#2c3e50;color:#ecf0f1}td,th{padding:4px 12px;text-align:left}
+.alert{color:#e74c3c;font-weight:bold}</style></head>
+<body><h2>GASHEALTH MONITOR</h2><table id="devices"><tr><th>Device</th><th>Gas (PPM)</th>
+<th>LDR</th><th>Temp (&deg;C)</th><th>Alerts</th></tr></table>
+<script>
+const rows = {}, alerts = {};
+function row(id) {
+  if (!rows[id]) {
+    const tr = document.getElementById('devices').insertRow();
+    tr.innerHTML = '<td>' + id + '</td><td></td><td></td><td></td><td class="alert"></td>';
+    rows[id] = tr; alerts[id] = {};
+  }
+  return rows[id];
+}
+function last(samples, sensor) { const s = samples[sensor]; return s ? s.value[s.value.length - 1] : null; }
+const ws = new WebSocket('ws://' + location.host + '/ws');
+ws.onmessage = (event) => {
+  const msg = JSON.parse(event.data), tr = row(msg.device);
+  if (msg.type === 'samples') {
+    const gas = last(msg.samples, 'gas'), ldr = last(msg.samples, 'ldr'), volt = last(msg.samples, 'voltage');
+    if (gas !== null) tr.cells[1].textContent = gas.toFixed(0);
+    if (ldr !== null) tr.cells[2].textContent = ldr.toFixed(0);
+    if (volt !== null) tr.cells[3].textContent = Math.min(volt * 100, 300).toFixed(0);
+  } else if (msg.type === 'alert') {
+    if (msg.active) alerts[msg.device][msg.name] = 1; else delete alerts[msg.device][msg.name];
+    tr.cells[4].textContent = Object.keys(alerts[msg.device]).join(', ');
+  }
+};
+fetch('/api/devices').then(r => r.json()).then(list => list.forEach(d => {
+  const tr = row(d.id); d.alerts.forEach(name => alerts[d.id][name] = 1);
+  tr.cells[4].textContent = d.alerts.join(', ');
+}));
+</script></body></html>
+"""
+
+
+def ws_frame(payload, opcode=OP_TEXT):
+    """An unmasked, unfragmented server frame."""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_ws_frame(reader, max_size=1 << 16):
+    """(opcode, payload) of the next client frame, unmasked."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await reader.readexactly(8))[0]
+    if length > max_size:
+        raise ValueError(f"client frame of {length} bytes")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask and length:
+        key = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+    return first & 0x0F, payload
+
+
+def parse_address(text, default_port=8765):
+    """(host, port) from 'host:port', ':port' or 'host'; the host defaults to localhost."""
+    host, sep, port = text.rpartition(':')
+    if not sep:
+        host, port = text, default_port
+    return host or '127.0.0.1', int(port)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * fraction + 0.5))] if ordered else None
+
+
+class Subscriber:
+    """One WebSocket client: its send queue and counters (loop thread only)."""
+
+    def __init__(self, number, peer, writer, devices, max_queue):
+        self.number = number
+        self.peer = peer
+        self.writer = writer
+        self.devices = devices  # device ids to send, or None for all
+        self.max_queue = max_queue
+        self.queue = deque()    # (queued at, frame, droppable)
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.connected_at = time.time()
+
+        # --- Counters ---
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.send_lag_ms = deque(maxlen=1000)  # queued -> handed to the socket
+
+    def offer(self, frame, now, droppable=True):
+        queue = self.queue
+        if droppable and len(queue) >= self.max_queue:
+            # Full: the oldest sample message goes, alerts and link changes stay
+            for position, item in enumerate(queue):
+                if item[2]:
+                    del queue[position]
+                    self.dropped += 1
+                    break
+        queue.append((now, frame, droppable))
+        self.wakeup.set()
+
+    def get_stats(self, now):
+        lags = sorted(self.send_lag_ms)
+        return {
+            'id': self.number,
+            'peer': self.peer,
+            'devices': sorted(self.devices) if self.devices else None,
+            'connected_s': time.time() - self.connected_at,
+            'queued': len(self.queue),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'bytes_sent': self.bytes_sent,
+            'lag_ms': (now - self.queue[0][0]) * 1000 if self.queue else 0.0,
+            'send_lag_p50_ms': percentile(lags, 0.5),
+            'send_lag_p99_ms': percentile(lags, 0.99),
+        }
+
+
+class ApiServer:
+    """Serves a set of MonitorCores (device id -> core) over HTTP and WebSocket.
+
+    The devices dict is read live, so a DeviceManager's devices can be passed
+    directly; attach() each core (owner thread) to stream its samples.
+    render_histogram, when given, is the dashboard's paint-time histogram for /metrics.
+    """
+
+    def __init__(self, devices, host='127.0.0.1', port=8765, max_queue=256, send_buffer=1 << 16,
+                 max_history_points=5000, render_histogram=None):
+        self.devices = devices
+        self.render_histogram = render_histogram
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.send_buffer = send_buffer
+        self.max_history_points = max_history_points
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.subscribers = {}
+        self.next_subscriber = 1
+        self.tasks = set()      # connection handlers and senders, cancelled on shutdown
+        # device id -> (core, {event: callback}, {sensor: generation streamed so far})
+        self.attached = {}
+        self.history_readers = {}
+
+        # --- Counters ---
+        self.requests = 0
+        self.messages = 0
+        self.frames_queued = 0
+
+    # --- Owner thread ---
+
+    def start(self):
+        """Bind and serve on a background thread; raises OSError if the address is taken."""
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.server = self.loop.run_until_complete(
+                    asyncio.start_server(self.handle, self.host, self.port))
+            except OSError as e:
+                failure.append(e)
+                ready.set()
+                self.loop.close()
+                return
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+            self.loop.run_until_complete(self._shutdown())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True, name='api-server')
+        self.thread.start()
+        ready.wait()
+        if failure:
+            self.thread = None
+            raise failure[0]
+
+    def stop(self, timeout=2.0):
+        for device_id in list(self.attached):
+            self.detach(device_id)
+        if self.thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+            self.thread = None
+
+    def attach(self, device_id, core):
+        """Stream a core's samples, alerts and link changes (call on the core's owner thread)."""
+        if device_id in self.attached:
+            return
+        callbacks = {
+            'applied': lambda count: self.on_applied(device_id),
+            'alert': lambda name, active, value: self.publish(device_id, {
+                'type': 'alert', 'name': name, 'active': active, 'value': value, 't': time.time()}, False),
+            'link': lambda state, detail: self.publish(device_id, {
+                'type': 'link', 'state': state,
+                'detail': detail if isinstance(detail, str) else
+                {key: value for key, value in detail.items() if isinstance(value, (int, float, str))},
+                't': time.time()}, False),
+        }
+        for event, callback in callbacks.items():
+            core.subscribe(event, callback)
+        cursors = {sensor: core.sensor_data[sensor]['series'].generation for sensor in SENSORS}
+        self.attached[device_id] = (core, callbacks, cursors)
+
+    def detach(self, device_id):
+        entry = self.attached.pop(device_id, None)
+        if entry:
+            core, callbacks, _cursors = entry
+            for event, callback in callbacks.items():
+                core.unsubscribe(event, callback)
+
+    def on_applied(self, device_id):
+        """After a drain: copy the samples added since the last one and queue them for the clients."""
+        core, _callbacks, cursors = self.attached[device_id]
+        streaming = bool(self.subscribers)
+        samples = {}
+        for sensor in SENSORS:
+            series = core.sensor_data[sensor]['series']
+            new = series.generation - cursors[sensor]
+            cursors[sensor] = series.generation
+            if new <= 0 or not streaming:
+                continue
+            times, raws, values = series.columns(new)
+            samples[sensor] = {
+                't': (times + core.start_time).tolist(),
+                'raw': raws.tolist(),
+                'value': values.tolist(),
+            }
+        if samples:
+            self.publish(device_id, {'type': 'samples', 'samples': samples})
+
+    def publish(self, device_id, message, droppable=True):
+        """Hand a message to the loop thread; never blocks the caller."""
+        if not self.subscribers or self.loop is None:
+            return
+        message['device'] = device_id
+        self.loop.call_soon_threadsafe(self._broadcast, device_id, message, droppable)
+
+    # --- Loop thread ---
+
+    def _broadcast(self, device_id, message, droppable):
+        frame = ws_frame(json.dumps(message, separators=(',', ':')).encode('utf-8'))
+        now = time.perf_counter()
+        self.messages += 1
+        for subscriber in self.subscribers.values():
+            if subscriber.devices is None or device_id in subscriber.devices:
+                subscriber.offer(frame, now, droppable)
+                self.frames_queued += 1
+
+    def _track(self, task):
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _shutdown(self):
+        """Stop listening and finish every connection before the loop closes."""
+        self.server.close()
+        for subscriber in list(self.subscribers.values()):
+            subscriber.closed = True
+            subscriber.wakeup.set()
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self._track(asyncio.current_task())
+        peer = writer.get_extra_info('peername')
+        peer = f"{peer[0]}:{peer[1]}" if peer else "?"
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, _version = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError,
+                asyncio.CancelledError):
+            writer.close()
+            return
+        self.requests += 1
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        try:
+            if url.path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                await self.websocket(reader, writer, headers, params, peer)
+                return
+            if method != 'GET':
+                status, content_type, body = 405, 'application/json', {'error': 'only GET is supported'}
+            else:
+                status, content_type, body = self.route(url.path, params, headers)
+            if content_type == 'application/json':
+                body = json.dumps(body).encode('utf-8')
+            writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                         f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                         f"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Shutdown; end normally, as start_server's done callback can't take a cancelled task
+            pass
+        finally:
+            writer.close()
+
+    # --- REST ---
+
+    def route(self, path, params, headers=None):
+        """(status, content type, body) for a GET request."""
+        parts = [part for part in path.split('/') if part]
+        if not parts:
+            return 200, 'text/html; charset=utf-8', STATUS_PAGE
+        if parts == ['metrics']:
+            content_type, body = render_metrics(self.devices, (headers or {}).get('accept'),
+                                                self.render_histogram, len(self.subscribers))
+            return 200, content_type, body
+        if parts == ['api', 'devices']:
+            return 200, 'application/json', [self.device_summary(device_id, core)
+                                             for device_id, core in list(self.devices.items())]
+        if parts == ['api', 'stats']:
+            return 200, 'application/json', self.get_stats()
+        if len(parts) in (3, 4) and parts[:2] == ['api', 'devices']:
+            core = self.devices.get(parts[2])
+            if core is None:
+                return 404, 'application/json', {'error': f"no device {parts[2]!r}"}
+            if len(parts) == 3:
+                return 200, 'application/json', self.device_state(parts[2], core)
+            if parts[3] == 'history':
+                try:
+                    return 200, 'application/json', self.history(parts[2], core, params)
+                except (KeyError, ValueError) as e:
+                    return 400, 'application/json', {'error': str(e)}
+        return 404, 'application/json', {'error': 'not found'}
+
+    def device_summary(self, device_id, core):
+        port = core.serial_port_obj.port if core.serial_port_obj else None
+        return {
+            'id': device_id,
+            'connected': core.connected,
+            'reconnecting': core.reconnecting,
+            'port': port,
+            'alerts': [name for name, active in core.alerts.items() if active],
+        }
+
+    def device_state(self, device_id, core):
+        state = self.device_summary(device_id, core)
+        data = core.sensor_data
+        state.update({
+            'time': time.time(),
+            'sensors': {sensor: {'value': data[sensor]['value'], 'raw': data[sensor]['raw_value']}
+                        for sensor in SENSORS},
+            'ldr_led': data['ldr']['led_state'],
+            'mode': core.mode,
+            'manual_leds': dict(core.manual_leds),
+            'alert_states': dict(core.alerts),
+        })
+        return state
+
+    def history(self, device_id, core, params):
+        sensor = params.get('sensor', ['gas'])[0]
+        if sensor not in SENSORS:
+            raise ValueError(f"unknown sensor {sensor!r}")
+        if 'start' in params or 'end' in params:
+            end = float(params.get('end', [time.time()])[0])
+            start = float(params.get('start', [end - 3600])[0])
+            points = min(int(params.get('points', [1000])[0]), self.max_history_points)
+            reader = self.history_readers.get(device_id)
+            if reader is None or reader.directory != core.recordings_dir:
+                reader = self.history_readers[device_id] = HistoryReader(core.recordings_dir)
+            times, lows, highs, means, resolution = reader.query(sensor, start, end, max_points=points)
+            return {'sensor': sensor, 'resolution_s': resolution, 't': times.tolist(),
+                    'min': lows.tolist(), 'max': highs.tolist(), 'mean': means.tolist()}
+
+        seconds = float(params.get('seconds', [60])[0])
+        series = core.sensor_data[sensor]['series']
+        # The owner thread may append meanwhile; retry until a copy saw no writes
+        for _attempt in range(5):
+            generation = series.generation
+            times, raws, values = (np.array(column) for column in series.columns())
+            if series.generation == generation:
+                break
+        times = times + core.start_time
+        keep = times >= time.time() - seconds
+        if keep.sum() > self.max_history_points:
+            keep[:np.flatnonzero(keep)[-self.max_history_points]] = False
+        return {'sensor': sensor, 't': times[keep].tolist(), 'raw': raws[keep].tolist(),
+                'value': values[keep].tolist()}
+
+    # --- WebSocket ---
+
+    async def websocket(self, reader, writer, headers, params, peer):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            writer.close()
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + WS_GUID).digest()).decode('ascii')
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        # Small socket and transport buffers, so a stalled client backs up into its
+        # own queue (where old samples are dropped) within ~128 KB instead of megabytes
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        writer.transport.set_write_buffer_limits(high=self.send_buffer)
+        devices = {device for value in params.get('device', []) for device in value.split(',') if device}
+        subscriber = Subscriber(self.next_subscriber, peer, writer, devices or None, self.max_queue)
+        self.next_subscriber += 1
+        self.subscribers[subscriber.number] = subscriber
+        sender = self._track(asyncio.ensure_future(self.send_loop(subscriber)))
+        try:
+            while True:
+                opcode, payload = await read_ws_frame(reader)
+                if opcode == OP_CLOSE:
+                    subscriber.offer(ws_frame(payload[:2], OP_CLOSE), time.perf_counter(), False)
+                    break
+                if opcode == OP_PING:
+                    subscriber.offer(ws_frame(payload, OP_PONG), time.perf_counter(), False)
+                # Anything else from the client is ignored
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            del self.subscribers[subscriber.number]
+            subscriber.closed = True
+            subscriber.wakeup.set()
+            try:
+                await asyncio.wait_for(sender, 1.0)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+            writer.close()
+
+    async def send_loop(self, subscriber):
+        """Write one subscriber's queue; awaiting drain() makes it this client's backpressure."""
+        writer = subscriber.writer
+        queue = subscriber.queue
+        try:
+            while True:
+                if not queue:
+                    if subscriber.closed:
+                        return
+                    subscriber.wakeup.clear()
+                    await subscriber.wakeup.wait()
+                    continue
+                queued_at, frame, _droppable = queue.popleft()
+                writer.write(frame)
+                await writer.drain()
+                subscriber.sent += 1
+                subscriber.bytes_sent += len(frame)
+                subscriber.send_lag_ms.append((time.perf_counter() - queued_at) * 1000)
+        except ConnectionError:
+            subscriber.closed = True
+
+    # --- Stats ---
+
+    def get_stats(self):
+        """Subscriber count and per-client queue depth, drops and send lag (any thread)."""
+        now = time.perf_counter()
+        clients = [subscriber.get_stats(now) for subscriber in list(self.subscribers.values())]
+        return {
+            'address': f"{self.host}:{self.port}",
+            'subscribers': len(clients),
+            'requests': self.requests,
+            'messages': self.messages,
+            'frames_queued': self.frames_queued,
+            'dropped': sum(client['dropped'] for client in clients),
+            'max_lag_ms': max((client['lag_ms'] for client in clients), default=0.0),
+            'clients': clients,
+        }
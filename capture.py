@@ -0,0 +1,173 @@
+import os
+import struct
+import threading
+import time
+from serial_ingest import SerialIngestEngine
+from frame_parser import BINARY_KINDS
+
+# --- Capture file layout ---
+# Header: magic, then the wall-clock time the capture started (epoch seconds, f8).
+# Body: one chunk per serial read, a (monotonic offset since start f8, length u4)
+# header followed by the raw bytes exactly as they came off the port.
+CAPTURE_MAGIC = b'OVRCAP1\n'
+CAPTURE_HEADER = struct.Struct('<d')
+CHUNK_HEADER = struct.Struct('<dI')
+
+
+class CaptureWriter:
+    """Appends raw serial reads with monotonic timestamps to a capture file.
+
+    write() is the ingest engine's tap and runs on the serial thread; it only
+    does a buffered file write, so it adds little to the read loop.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'wb', buffering=1 << 16)
+        self.start_epoch = time.time()
+        self.start = time.monotonic()
+        self.file.write(CAPTURE_MAGIC + CAPTURE_HEADER.pack(self.start_epoch))
+        self.lock = threading.Lock()
+        self.chunks = 0
+        self.bytes = 0
+
+    def write(self, data):
+        offset = time.monotonic() - self.start
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(CHUNK_HEADER.pack(offset, len(data)))
+            self.file.write(data)
+            self.chunks += 1
+            self.bytes += len(data)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_capture(path, chunk_size=1 << 16):
+    """Open a capture and return (start_epoch, chunks) where chunks yields (offset, data).
+
+    Files without the capture header are treated as plain serial text: start_epoch
+    is None and the chunks carry no offset.
+    """
+    f = open(path, 'rb')
+    magic = f.read(len(CAPTURE_MAGIC))
+    if magic != CAPTURE_MAGIC:
+        return None, _text_chunks(f, magic, chunk_size)
+    start_epoch, = CAPTURE_HEADER.unpack(f.read(CAPTURE_HEADER.size))
+    return start_epoch, _capture_chunks(f)
+
+
+def capture_start_epoch(path):
+    """Wall-clock start of a capture file, or None for plain text."""
+    with open(path, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            return None
+        return CAPTURE_HEADER.unpack(f.read(CAPTURE_HEADER.size))[0]
+
+
+def _text_chunks(f, head, chunk_size):
+    with f:
+        data = head + f.read(chunk_size)
+        while data:
+            yield None, data
+            data = f.read(chunk_size)
+
+
+def _capture_chunks(f):
+    with f:
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                return
+            offset, length = CHUNK_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return  # Truncated tail from a capture that was cut off
+            yield offset, data
+
+
+class CaptureReplayer:
+    """Feeds a capture back through the ingest engine's line/frame splitting.
+
+    speed is 1.0 for real time, N for N x, or None/0 for as fast as possible.
+    on_lines(lines, timestamp) and on_binary(data, timestamp) receive the same
+    batches the live port produced; timestamp is the chunk's offset in the
+    capture plus time_offset, or None to let the parser use the wall clock.
+    """
+
+    def __init__(self, path, on_lines, on_binary=None, speed=None, time_offset=None):
+        self.path = path
+        self.speed = speed or None
+        self.time_offset = time_offset
+        self.on_lines = on_lines
+        self.on_binary = on_binary
+        self.chunk_time = None
+        self.engine = SerialIngestEngine(None, self._lines,
+                                         on_binary=self._binary if on_binary else None,
+                                         binary_kinds=BINARY_KINDS)
+        self.thread = None
+        self.stopped = False
+        self.finished = False
+
+        # --- Counters ---
+        self.lines_total = 0
+        self.chunks_total = 0
+        self.start_epoch = None
+        self.elapsed = 0.0
+
+    def _lines(self, lines):
+        self.lines_total += len(lines)
+        self.on_lines(lines, self.chunk_time)
+
+    def _binary(self, data):
+        self.on_binary(data, self.chunk_time)
+
+    def start(self):
+        """Replay on a background thread (used by the dashboard)."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        self.stopped = True
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def run(self):
+        """Replay the whole capture on the calling thread and return get_stats()."""
+        self.start_epoch, chunks = read_capture(self.path)
+        started = time.perf_counter()
+        for offset, data in chunks:
+            if self.stopped:
+                break
+            if offset is not None:
+                if self.speed:
+                    # Pace against the replay start so sleep overshoot doesn't accumulate
+                    delay = started + offset / self.speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if self.time_offset is not None:
+                    self.chunk_time = offset + self.time_offset
+            self.chunks_total += 1
+            self.engine.feed(data)
+        self.elapsed = time.perf_counter() - started
+        self.finished = True
+        return self.get_stats()
+
+    def get_stats(self):
+        elapsed = self.elapsed or 0.0
+        return {
+            'lines': self.lines_total,
+            'chunks': self.chunks_total,
+            'bytes': self.engine.bytes_total,
+            'seconds': elapsed,
+            'lines_per_sec': self.lines_total / elapsed if elapsed > 0 else 0.0,
+            'garbage_bytes': self.engine.garbage_bytes,
+        }
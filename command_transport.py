@@ -0,0 +1,253 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from frame_parser import LED_IDS
+
+
+def expected_reply(command):
+    """The (kind, payload) of the parsed frame that acknowledges command, or None if
+    the firmware sends none ("ERROR: ..." instead rejects LED commands in auto mode)."""
+    if command.startswith('MODE_'):
+        return ('mode', command[5:])
+    if command.startswith('ALL_'):
+        return ('led_ack', ('ALL_LEDS', command[4:]))
+    led, sep, state = command.partition('_')
+    if sep and led in LED_IDS:
+        return ('led_ack', (led, state))
+    return None
+
+
+def command_target(command):
+    """What a command sets; a later unsent command for the same target replaces it."""
+    if command.startswith('MODE_'):
+        return 'mode'
+    if command.startswith('ALL_'):
+        return 'all'
+    return command.partition('_')[0]
+
+
+class Command:
+    """One queued command; done() is reported back as a result tuple."""
+
+    __slots__ = ('text', 'reply', 'timeout', 'merged', 'sent_at', 'future')
+
+    def __init__(self, text, timeout):
+        self.text = text
+        self.reply = expected_reply(text)
+        self.timeout = timeout
+        # Commands this one stands in for (superseded or coalesced into it)
+        self.merged = []
+        self.sent_at = None
+        self.future = None
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def command_loop():
+    """The event loop shared by every device's transport, started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True, name='command-loop').start()
+        return _loop
+
+
+class CommandTransport:
+    """Sends commands to one device from an asyncio loop and matches them to replies.
+
+    send() and send_many() only schedule work on the loop, so they never block
+    the caller. Commands go out one at a time; each waits for its reply (or the
+    timeout) before the next is written, because the firmware handles a single
+    command line per loop(). Unsent commands are coalesced: a newer command for
+    the same LED or mode replaces an older one, and a burst setting all three
+    LEDs to the same state goes out as one ALL_ON/ALL_OFF. If that times out
+    (firmware without ALL_ support) the individual commands are sent instead.
+
+    Results are collected in `completed` as (command, ok, reply, latency_ms)
+    tuples for the owner thread to pick up; latency is write-to-reply time.
+    """
+
+    def __init__(self, port_obj, timeout=1.0, history=1000):
+        self.port_obj = port_obj
+        self.timeout = timeout
+        self.loop = command_loop()
+        self.outbox = deque()
+        self.wakeup = None
+        self.in_flight = None
+        self.closed = False
+        self.completed = deque()
+        self.task = asyncio.run_coroutine_threadsafe(self.run(), self.loop)
+
+        # --- Counters ---
+        self.sent = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.round_trips = deque(maxlen=history)
+
+    # --- Any thread ---
+
+    def send(self, command, timeout=None):
+        self.send_many([command], timeout)
+
+    def send_many(self, commands, timeout=None):
+        """Queue a burst of commands together so they can be coalesced."""
+        items = [Command(text, timeout or self.timeout) for text in commands]
+        self.loop.call_soon_threadsafe(self._enqueue, items)
+
+    @property
+    def pending(self):
+        return self.in_flight is not None or bool(self.outbox)
+
+    def on_reply(self, frame):
+        """Called by the ingest thread with each mode/led_ack/error frame."""
+        received = time.perf_counter()
+        self.loop.call_soon_threadsafe(self._match, frame, received)
+
+    def close(self):
+        self.closed = True
+        self.loop.call_soon_threadsafe(self._shutdown)
+
+    # --- Loop thread ---
+
+    def _enqueue(self, items):
+        outbox = self.outbox
+        for item in items:
+            target = command_target(item.text)
+            for queued in reversed(list(outbox)):
+                queued_target = command_target(queued.text)
+                if (queued_target == 'mode') != (target == 'mode'):
+                    # Whether an LED command is accepted depends on the mode it
+                    # arrives in, so never merge across a mode change
+                    break
+                if queued_target == target or (target == 'all' and queued_target in LED_IDS):
+                    # Never sent, so only the newest state for this target matters
+                    outbox.remove(queued)
+                    item.merged[:0] = queued.merged + [queued]
+                    queued.merged = []
+                    self.coalesced += 1
+            outbox.append(item)
+        self._coalesce_all()
+        if self.wakeup:
+            self.wakeup.set()
+
+    def _coalesce_all(self):
+        """Replace a trailing run of LED1..3 commands with the same state by one ALL_ command."""
+        outbox = self.outbox
+        tail = []
+        for item in reversed(outbox):
+            if item.text.partition('_')[0] not in LED_IDS:
+                break
+            tail.append(item)
+        states = {item.text.partition('_')[2] for item in tail}
+        if len(tail) != len(LED_IDS) or len(states) != 1:
+            return
+        combined = Command(f"ALL_{states.pop()}", tail[0].timeout)
+        for item in reversed(tail):
+            outbox.pop()
+            combined.merged.append(item)
+        self.coalesced += len(tail) - 1
+        outbox.append(combined)
+
+    def _match(self, frame, received):
+        command = self.in_flight
+        if command is None or command.future.done():
+            return
+        kind, _timestamp, payload = frame
+        if (kind, payload) == command.reply:
+            # Report the reply as the firmware printed it
+            reply = f"MODE_CHANGED:{payload}" if kind == 'mode' else ':'.join(payload)
+            command.future.set_result((True, reply, received))
+        elif kind == 'error' and command.reply and command.reply[0] == 'led_ack':
+            command.future.set_result((False, payload, received))
+
+    def _shutdown(self):
+        self.outbox.clear()
+        if self.in_flight and not self.in_flight.future.done():
+            self.in_flight.future.cancel()
+        if self.wakeup:
+            self.wakeup.set()
+
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        while not self.closed:
+            if not self.outbox:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            command = self.outbox.popleft()
+            try:
+                ok, reply, latency = await self._exchange(command)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                ok, reply, latency = False, f"write failed: {e}", None
+
+            if not ok and reply == 'timeout' and command.text.startswith('ALL_') and command.merged:
+                # Older firmware ignores ALL_ commands; fall back to the individual ones
+                for item in reversed(command.merged):
+                    self.outbox.appendleft(item)
+                command.merged = []
+                continue
+            self._finish(command, ok, reply, latency)
+
+    async def _exchange(self, command):
+        """Write one command and wait for its reply; returns (ok, reply, latency_ms)."""
+        future = self.loop.create_future()
+        command.future = future
+        self.in_flight = command
+        try:
+            command.sent_at = time.perf_counter()
+            # The loop is shared by every device, so a port that stops draining its
+            # output buffer must not stall the others: write on an executor thread
+            # (the port's write_timeout bounds how long that thread is held)
+            await self.loop.run_in_executor(None, self.port_obj.write, f"{command.text}\n".encode('utf-8'))
+            self.sent += 1
+            if command.reply is None:
+                return True, None, None
+            try:
+                ok, reply, received = await asyncio.wait_for(future, command.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return False, 'timeout', None
+            latency = (received - command.sent_at) * 1000
+            if ok:
+                self.acked += 1
+                self.round_trips.append(latency)
+            else:
+                self.rejected += 1
+            return ok, reply, latency
+        finally:
+            self.in_flight = None
+
+    def _finish(self, command, ok, reply, latency):
+        # Oldest first, so the newest command's result is the last one applied
+        for merged in command.merged:
+            self.completed.append((merged.text, ok, reply, latency))
+        self.completed.append((command.text, ok, reply, latency))
+
+    # --- Stats ---
+
+    def latency_percentiles(self):
+        """(p50, p99, max) of recent round trips in ms, or None before the first reply."""
+        if not self.round_trips:
+            return None
+        ordered = sorted(self.round_trips)
+        last = len(ordered) - 1
+        return ordered[last // 2], ordered[min(last, int(last * 0.99 + 0.5))], ordered[-1]
+
+    def get_stats(self):
+        return {
+            'sent': self.sent,
+            'acked': self.acked,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+            'coalesced': self.coalesced,
+            'queued': len(self.outbox),
+            'latency_ms': self.latency_percentiles(),
+        }
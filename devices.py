@@ -0,0 +1,245 @@
+"""Several boards at once: one MonitorCore per device, one reader thread for all ports.
+
+    python devices.py --count 32 --rate 20 --seconds 10
+
+benchmarks N simulated boards (esp32_sim.py in a child process) read through
+one SerialPoller and drained on one thread, and reports the CPU it took.
+"""
+import argparse
+import os
+import re
+import selectors
+import subprocess
+import sys
+import threading
+import time
+from monitor_core import MonitorCore, DEFAULT_RECORDINGS_DIR
+
+
+class SerialPoller:
+    """Reads many serial ports from a single thread with a selector.
+
+    Ports are pyserial objects opened non-blocking (the POSIX default); each
+    ready port is drained with os.read and handed to its ingest engine. Ports
+    without a selectable fileno (Windows) fall back to the engine's own thread.
+    """
+
+    def __init__(self, read_size=65536, on_error=None):
+        self.read_size = read_size
+        # Called on the poller thread as on_error(engine, exception) when a port dies
+        self.on_error = on_error
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        # Wakes select() when ports are added or removed
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+
+        # --- Counters ---
+        self.wakeups = 0
+        self.reads = 0
+
+    @staticmethod
+    def selectable(port_obj):
+        try:
+            return os.name == 'posix' and port_obj.fileno() >= 0
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            return False
+
+    def add(self, engine):
+        """Start reading engine.port_obj; returns False if the port can't be polled."""
+        if not self.selectable(engine.port_obj):
+            return False
+        with self.lock:
+            self.selector.register(engine.port_obj.fileno(), selectors.EVENT_READ, engine)
+        engine.running = True
+        self.wake()
+        if not self.running:
+            self.start()
+        return True
+
+    def remove(self, engine):
+        engine.running = False
+        with self.lock:
+            for key in list(self.selector.get_map().values()):
+                if key.data is engine:
+                    self.selector.unregister(key.fileobj)
+        self.wake()
+
+    def wake(self):
+        try:
+            os.write(self.wake_w, b'\0')
+        except BlockingIOError:
+            pass
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        self.wake()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def run(self):
+        read = os.read
+        read_size = self.read_size
+        while self.running:
+            events = self.selector.select(timeout=1.0)
+            self.wakeups += 1
+            for key, _mask in events:
+                engine = key.data
+                if engine is None:
+                    try:
+                        read(self.wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                try:
+                    data = read(key.fd, read_size)
+                    if not data:
+                        # Readable but empty: the device went away
+                        raise OSError("device reports readiness to read but returned no data")
+                except BlockingIOError:
+                    continue
+                except OSError as e:
+                    self.remove(engine)
+                    engine.record_error(e)
+                    if engine.on_error:
+                        engine.on_error(engine, e)
+                    if self.on_error:
+                        self.on_error(engine, e)
+                    continue
+                self.reads += 1
+                try:
+                    engine.receive(data)
+                except Exception as e:
+                    # Counted like the engine's own reader thread does; keep polling the others
+                    engine.record_error(e)
+
+    def close(self):
+        self.stop()
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+
+
+class DeviceManager:
+    """Named devices, each with its own MonitorCore (state, filters, history, store).
+
+    All ports are read by one SerialPoller thread; drain_all() applies every
+    device's queued frames on the caller's thread.
+    """
+
+    def __init__(self, recordings_dir=DEFAULT_RECORDINGS_DIR, record=True):
+        self.recordings_dir = recordings_dir
+        self.record = record
+        self.poller = SerialPoller()
+        self.devices = {}  # device id -> MonitorCore, in creation order
+        self.next_number = 1
+
+    def add_device(self, device_id=None):
+        """Create an unconnected device slot and return its id."""
+        if device_id is None:
+            device_id = f"device{self.next_number}"
+        self.next_number += 1
+        core = MonitorCore(os.path.join(self.recordings_dir, device_id), record=self.record)
+        core.device_id = device_id
+        core.poller = self.poller
+        core.load_alert_rules()
+        core.load_filter_chains()
+        self.devices[device_id] = core
+        return device_id
+
+    def remove_device(self, device_id):
+        self.devices.pop(device_id).close()
+
+    def connect(self, device_id, port, baudrate):
+        self.devices[device_id].connect(port, baudrate)
+
+    def connected_ports(self):
+        """Port -> device id for every open port, and every port a device is reconnecting to."""
+        ports = {}
+        for device_id, core in self.devices.items():
+            if core.connected:
+                ports[core.serial_port_obj.port] = device_id
+            elif core.reconnecting:
+                ports[core.supervisor.port] = device_id
+        return ports
+
+    def drain_all(self):
+        """Apply queued frames for every device; returns the total applied."""
+        return sum(core.drain() for core in self.devices.values())
+
+    def get_stats(self):
+        return {device_id: core.get_stats() for device_id, core in self.devices.items()}
+
+    def close(self):
+        for core in self.devices.values():
+            core.close()
+        self.poller.close()
+
+
+def benchmark(count=32, rate=20.0, seconds=10.0, tick_ms=100, record=False):
+    """N simulated boards through one poller thread, drained every tick_ms like the dashboard.
+
+    Reports frames applied, drops and this process's CPU use (100% = one core).
+    """
+    sim = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'esp32_sim.py'),
+                            '--count', str(count), '--rate', str(rate), '--seed', '1',
+                            '--duration', str(seconds + 3)],
+                           stdout=subprocess.PIPE, text=True)
+    ports = []
+    while len(ports) < count:
+        match = re.search(r'on (\S+)', sim.stdout.readline())
+        if match:
+            ports.append(match.group(1))
+
+    manager = DeviceManager(recordings_dir=os.path.join(DEFAULT_RECORDINGS_DIR, 'bench'), record=record)
+    for port in ports:
+        manager.connect(manager.add_device(), port, 115200)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    applied = 0
+    worst_tick = 0.0
+    while time.perf_counter() - wall_start < seconds:
+        tick_start = time.perf_counter()
+        applied += manager.drain_all()
+        worst_tick = max(worst_tick, time.perf_counter() - tick_start)
+        time.sleep(max(0.0, tick_ms / 1000 - (time.perf_counter() - tick_start)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    stats = manager.get_stats()
+    received = sum(s['ingest']['frames_total'] for s in stats.values())
+    dropped = sum(s['queue']['dropped'] for s in stats.values())
+    errors = sum(s['parse_errors'] for s in stats.values())
+    manager.close()
+    sim.terminate()
+    sim.wait()
+
+    print(f"{count} devices at {rate:g} loops/s for {wall:.1f} s, one poller thread:")
+    print(f"  {received} lines received ({received / wall:,.0f}/s), {applied} frames applied, "
+          f"{dropped} dropped, {errors} parse errors")
+    print(f"  CPU {cpu / wall * 100:.1f}% of one core, worst drain tick {worst_tick * 1000:.2f} ms")
+    return cpu / wall
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark many simulated devices on one reader thread.")
+    parser.add_argument('--count', type=int, default=32)
+    parser.add_argument('--rate', type=float, default=20.0, help="loop() iterations per second per board")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--record', action='store_true', help="also write each device's store")
+    args = parser.parse_args(argv)
+    benchmark(args.count, args.rate, args.seconds, record=args.record)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def m4_indices(values, buckets):
+    """Indices of the first, min, max and last sample of each bucket (M4 aggregation).
+
+    Keeps every local extreme that would be visible at the given resolution, so
+    short spikes survive decimation. Returns sorted indices, at most 4 * buckets.
+    """
+    values = np.asarray(values)
+    count = len(values)
+    if buckets < 1 or count <= 4 * buckets:
+        return np.arange(count)
+
+    edges = (np.arange(buckets + 1) * count) // buckets
+    starts = edges[:-1]
+    ends = edges[1:]
+
+    # Lay the buckets out as rows of a padded 2-D block (sizes differ by at most one)
+    width = int((ends - starts).max())
+    index = starts[:, None] + np.arange(width)[None, :]
+    valid = index < ends[:, None]
+    block = values[np.minimum(index, count - 1)]
+
+    mins = np.where(valid, block, np.inf).argmin(axis=1) + starts
+    maxs = np.where(valid, block, -np.inf).argmax(axis=1) + starts
+    return np.unique(np.concatenate((starts, mins, maxs, ends - 1)))
+
+
+class DownsampleCache:
+    """Remembers the last decimation per (data generation, pixel width)."""
+
+    def __init__(self):
+        self.key = None
+        self.indices = None
+        self.hits = 0
+        self.misses = 0
+
+    def indices_for(self, values, generation, pixel_width):
+        """M4 indices for roughly two points per pixel column."""
+        key = (generation, pixel_width, len(values))
+        if key == self.key and generation is not None:
+            self.hits += 1
+            return self.indices
+        self.misses += 1
+        self.key = key
+        self.indices = m4_indices(values, max(1, pixel_width // 2))
+        return self.indices
@@ -0,0 +1,460 @@
+"""Software stand-in for the ESP32 running over.ino, served on a pseudo-terminal.
+
+    python esp32_sim.py --rate 1000 --noise 20 --spike-rate 0.001 --garbage-rate 0.0005
+
+prints the pty path (and optionally symlinks it with --link); connect to it
+from the dashboard or ``monitor_core.py --port`` like a real board. The
+baudrate is ignored. ``--bench`` runs the simulator and a headless core
+against each other and reports end-to-end throughput and command latency.
+"""
+import argparse
+import os
+import random
+import select
+import sys
+import threading
+import time
+import tty
+from frame_parser import (pack_binary_frame, BINARY_KIND_GAS, BINARY_KIND_LDR,
+                          BINARY_KIND_VOLT, BINARY_KIND_LED_STATUS)
+
+
+def arduino_float(value, digits=2):
+    """Serial.print(float) formatting: fixed decimals, no exponent."""
+    return f"{value:.{digits}f}"
+
+
+class ESP32Simulator:
+    """Emits the over.ino serial protocol at a configurable loop rate.
+
+    The sensor model runs the firmware's own smoothing (moving average + LPF)
+    over a drifting ADC signal, and LED/mode handling follows checkCommands()
+    and handleLEDCommand() reply for reply.
+    """
+
+    def __init__(self, rate=20.0, noise=10.0, spike_rate=0.0, garbage_rate=0.0,
+                 binary=False, ldr_interval_ms=20, seed=None, unplug_every=None, unplug_for=1.0):
+        self.rate = rate                  # loop() iterations per second (firmware: ~20)
+        self.noise = noise                # ADC counts of gaussian noise per reading
+        self.spike_rate = spike_rate      # probability per reading of a large spike
+        self.garbage_rate = garbage_rate  # probability per loop of a burst of random bytes
+        self.binary = binary
+        self.ldr_interval_ms = ldr_interval_ms
+        self.random = random.Random(seed)
+        # Pull the "USB cable" every unplug_every seconds for unplug_for seconds
+        self.unplug_every = unplug_every
+        self.unplug_for = unplug_for
+
+        # --- Firmware state (names follow over.ino) ---
+        self.danger_level = 350
+        self.gas_alpha = 0.05
+        self.gas_buffer = [0] * 5
+        self.gas_index = 0
+        self.gas_total = 0
+        self.filtered_gas = 0.0
+        self.ldr_readings = [0] * 10
+        self.ldr_index = 0
+        self.ldr_total = 0
+        self.ldr_alpha = 0.03
+        self.ldr_lpf = 0.0
+        self.ldr_prev_millis = 0
+        self.dark_threshold = 1500
+        self.volt_alpha = 0.05
+        self.filtered_voltage = 0.0
+        self.threshold_voltage = 2.0
+        self.manual_mode = False
+        self.leds = [0, 0, 0]  # GAS_LED, LDR_LED, VOLT_LED
+
+        # Slowly drifting "true" ADC levels the noise rides on
+        self.levels = {'gas': 250.0, 'ldr': 1200.0, 'volt': 2000.0}
+
+        # setup(): the gas filter starts from one reading instead of ramping up from zero
+        self.filtered_gas = float(self.adc('gas'))
+        self.gas_buffer = [int(self.filtered_gas)] * len(self.gas_buffer)
+        self.gas_total = sum(self.gas_buffer)
+
+        self.master_fd = None
+        self.slave_fd = None
+        self.port_name = None
+        self.link = None
+        self.command_buffer = bytearray()
+        self.start_time = None
+        self.boot_time = None
+        self.stop_time = None
+        self.thread = None
+        self.running = False
+
+        # --- Counters ---
+        self.loops = 0
+        self.lines_sent = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self.garbage_sent = 0
+        self.commands_received = 0
+        self.unplugs = 0
+
+    # --- Pseudo-terminal ---
+
+    def open(self, link=None):
+        """Create the pty and return the path a serial client should open."""
+        self.master_fd, self.slave_fd = os.openpty()
+        # Raw mode: no echo and no newline translation, like a USB-serial bridge
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.port_name = os.ttyname(self.slave_fd)
+        self.link = link
+        if link:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(self.port_name, link)
+        return self.port_name
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def replug(self, downtime=1.0):
+        """Unplug and re-plug: the port disappears, then the board reboots on a new pty
+        (reachable again under the same --link path)."""
+        self.close()
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+        self.unplugs += 1
+        time.sleep(downtime)
+        # Power cycle: setup() state, millis() from zero
+        self.manual_mode = False
+        self.leds = [0, 0, 0]
+        self.command_buffer = bytearray()
+        self.loops = 0
+        self.ldr_prev_millis = 0
+        self.open(self.link)
+        self.begin()
+
+    def write(self, data):
+        """Write to the pty without blocking; bytes that don't fit are dropped, as on a UART."""
+        try:
+            written = os.write(self.master_fd, data)
+        except BlockingIOError:
+            written = 0
+        except OSError:
+            # Client closed its end; keep running so it can reconnect
+            written = 0
+        self.bytes_sent += written
+        self.bytes_dropped += len(data) - written
+
+    # --- Sensor model ---
+
+    def adc(self, name, low=0, high=4095):
+        level = self.levels[name] + self.random.gauss(0, self.noise * 0.05)
+        self.levels[name] = min(max(level, low), high)
+        value = level + self.random.gauss(0, self.noise)
+        if self.spike_rate and self.random.random() < self.spike_rate:
+            value += self.random.choice((-1, 1)) * self.random.uniform(500, 2000)
+        return int(min(max(value, low), high))
+
+    def println(self, out, text):
+        out += text.encode('ascii')
+        out += b'\r\n'  # Serial.println line ending
+        self.lines_sent += 1
+
+    def send_frame(self, out, kind, aux, value, millis):
+        out += pack_binary_frame(kind, value, aux, millis)
+        self.lines_sent += 1
+
+    def loop(self, millis, out):
+        """One firmware loop() at simulated time millis, appending its output to out."""
+        # ===================== GAS SENSOR =====================
+        raw_gas = self.adc('gas')
+        self.gas_total -= self.gas_buffer[self.gas_index]
+        self.gas_buffer[self.gas_index] = raw_gas
+        self.gas_total += raw_gas
+        self.gas_index = (self.gas_index + 1) % len(self.gas_buffer)
+        avg_gas = self.gas_total / len(self.gas_buffer)
+        self.filtered_gas += self.gas_alpha * (avg_gas - self.filtered_gas)
+        if self.binary:
+            self.send_frame(out, BINARY_KIND_GAS, self.danger_level, self.filtered_gas, millis)
+        else:
+            self.println(out, f"GAS:{arduino_float(self.filtered_gas)},{self.danger_level}")
+        if not self.manual_mode:
+            self.leds[0] = int(self.filtered_gas > self.danger_level)
+
+        # ===================== LDR SENSOR =====================
+        if millis - self.ldr_prev_millis >= self.ldr_interval_ms:
+            self.ldr_prev_millis = millis
+            self.ldr_total -= self.ldr_readings[self.ldr_index]
+            self.ldr_readings[self.ldr_index] = self.adc('ldr')
+            self.ldr_total += self.ldr_readings[self.ldr_index]
+            self.ldr_index = (self.ldr_index + 1) % len(self.ldr_readings)
+            average_ldr = self.ldr_total // len(self.ldr_readings)
+            self.ldr_lpf += self.ldr_alpha * (average_ldr - self.ldr_lpf)
+            if self.binary:
+                self.send_frame(out, BINARY_KIND_LDR, 0, self.ldr_lpf, millis)
+            else:
+                self.println(out, f"LDR:{arduino_float(millis / 1000.0)},{arduino_float(self.ldr_lpf)}")
+            if not self.manual_mode:
+                self.leds[1] = int(self.ldr_lpf >= self.dark_threshold)
+
+        # ===================== VOLTAGE SENSOR =====================
+        voltage = self.adc('volt') * (3.3 / 4095.0)
+        self.filtered_voltage += self.volt_alpha * (voltage - self.filtered_voltage)
+        if self.binary:
+            self.send_frame(out, BINARY_KIND_VOLT, 0, self.filtered_voltage, millis)
+        else:
+            self.println(out, f"VOLT:0,{arduino_float(self.filtered_voltage, 3)},3.30")
+        if not self.manual_mode:
+            self.leds[2] = int(self.filtered_voltage > self.threshold_voltage)
+
+        # LED status
+        gas_led, ldr_led, volt_led = self.leds
+        if self.binary:
+            self.send_frame(out, BINARY_KIND_LED_STATUS, gas_led | ldr_led << 1 | volt_led << 2, 0.0, millis)
+        else:
+            self.println(out, f"LED_STATUS:{gas_led},{ldr_led},{volt_led}")
+
+        if self.garbage_rate and self.random.random() < self.garbage_rate:
+            garbage = bytes(self.random.getrandbits(8) for _ in range(self.random.randint(1, 16)))
+            out += garbage
+            self.garbage_sent += len(garbage)
+        self.loops += 1
+
+    # --- Commands (checkCommands / handleLEDCommand) ---
+
+    LED_COMMANDS = {
+        'LED1_ON': ((0, 1), "LED1:ON"), 'LED1_OFF': ((0, 0), "LED1:OFF"),
+        'LED2_ON': ((1, 1), "LED2:ON"), 'LED2_OFF': ((1, 0), "LED2:OFF"),
+        'LED3_ON': ((2, 1), "LED3:ON"), 'LED3_OFF': ((2, 0), "LED3:OFF"),
+    }
+    ALL_COMMANDS = {'ALL_ON': (1, "ALL_LEDS:ON"), 'ALL_OFF': (0, "ALL_LEDS:OFF")}
+
+    def handle_command(self, command, out):
+        self.commands_received += 1
+        if command == "MODE_AUTO":
+            self.manual_mode = False
+            self.println(out, "MODE_CHANGED:AUTO")
+        elif command == "MODE_MANUAL":
+            self.manual_mode = True
+            self.println(out, "MODE_CHANGED:MANUAL")
+        elif command.startswith("LED") or command.startswith("ALL_"):
+            if not self.manual_mode:
+                self.println(out, "ERROR: Switch to manual mode first")
+            elif command in self.LED_COMMANDS:
+                (led, state), reply = self.LED_COMMANDS[command]
+                self.leds[led] = state
+                self.println(out, reply)
+            elif command in self.ALL_COMMANDS:
+                state, reply = self.ALL_COMMANDS[command]
+                self.leds = [state] * 3
+                self.println(out, reply)
+
+    def read_commands(self, out):
+        try:
+            data = os.read(self.master_fd, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self.command_buffer += data
+        while b'\n' in self.command_buffer:
+            line, _, rest = self.command_buffer.partition(b'\n')
+            self.command_buffer = bytearray(rest)
+            self.handle_command(line.decode('ascii', errors='ignore').strip(), out)
+
+    # --- Main loop ---
+
+    def start(self):
+        """Run on a background thread (for benchmarks driving a client in-process)."""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def run(self, duration=None):
+        """Emit loops at self.rate until stopped; late loops are sent together in one write."""
+        self.running = True
+        self.begin()
+        started = plugged = time.monotonic()
+        while self.running:
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+            if self.unplug_every and time.monotonic() - plugged >= self.unplug_every:
+                self.replug(self.unplug_for)
+                plugged = time.monotonic()
+            wait = self.tick()
+            # Wake for the next loop or an incoming command, whichever comes first
+            if wait > 0:
+                select.select([self.master_fd], [], [], wait)
+        self.stop_time = time.monotonic()
+        self.running = False
+
+    def begin(self):
+        # start_time is the first boot (for rates); boot_time drives millis()
+        self.boot_time = time.monotonic()
+        if self.start_time is None:
+            self.start_time = self.boot_time
+        out = bytearray()
+        self.println(out, "SYSTEM_READY:Auto Mode")
+        self.write(bytes(out))
+
+    def tick(self):
+        """Answer pending commands and emit every loop that is due; returns seconds until the next."""
+        out = bytearray()
+        self.read_commands(out)
+        period = 1.0 / self.rate
+        due = int((time.monotonic() - self.boot_time) * self.rate) + 1
+        while self.loops < due:
+            self.loop(int(self.loops * period * 1000), out)
+        if out:
+            self.write(bytes(out))
+        return self.boot_time + self.loops * period - time.monotonic()
+
+    def get_stats(self):
+        elapsed = 0.0
+        if self.start_time:
+            elapsed = (self.stop_time or time.monotonic()) - self.start_time
+        return {
+            'loops': self.loops,
+            'lines_sent': self.lines_sent,
+            'bytes_sent': self.bytes_sent,
+            'bytes_dropped': self.bytes_dropped,
+            'garbage_bytes': self.garbage_sent,
+            'commands': self.commands_received,
+            'unplugs': self.unplugs,
+            'lines_per_sec': self.lines_sent / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def run_many(sims, duration=None):
+    """Drive several simulated boards from one thread (e.g. for multi-device soak tests)."""
+    for sim in sims:
+        sim.begin()
+    by_fd = {sim.master_fd: sim for sim in sims}
+    started = time.monotonic()
+    try:
+        while duration is None or time.monotonic() - started < duration:
+            wait = min(sim.tick() for sim in sims)
+            if wait > 0:
+                ready, _, _ = select.select(list(by_fd), [], [], wait)
+                for fd in ready:
+                    by_fd[fd].tick()
+    finally:
+        for sim in sims:
+            sim.stop_time = time.monotonic()
+
+
+def benchmark(rate=2000, seconds=5.0, noise=10.0, garbage_rate=0.0, binary=False):
+    """Drive a headless MonitorCore from the simulator over the pty and report
+    end-to-end throughput and command round-trip latency."""
+    from monitor_core import MonitorCore
+    from alerts import DEFAULT_RULES
+
+    sim = ESP32Simulator(rate=rate, noise=noise, garbage_rate=garbage_rate, binary=binary, seed=1)
+    port = sim.open()
+    sim.start()
+    core = MonitorCore(record=False)
+    # A rule at the simulated gas level, so alerts keep firing for the latency figures
+    core.set_alert_rules(DEFAULT_RULES + [{'name': 'bench', 'sensor': 'gas', 'above': 250}])
+    core.connect(port, 115200)
+
+    deadline = time.monotonic() + seconds
+    next_command = time.monotonic() + 0.2
+    mode = 'MANUAL'
+    try:
+        while time.monotonic() < deadline:
+            if core.frame_queue.wait(0.05):
+                core.drain()
+            if time.monotonic() >= next_command and not core.transport.pending:
+                core.send_command(f"MODE_{mode}")
+                if mode == 'MANUAL':
+                    # Three LED writes go out as one ALL_OFF
+                    core.send_commands(['LED1_OFF', 'LED2_OFF', 'LED3_OFF'])
+                mode = 'AUTO' if mode == 'MANUAL' else 'MANUAL'
+                next_command = time.monotonic() + 0.2
+    finally:
+        # Stop the board first so the ingest thread's last reads are complete lines
+        sim.stop()
+        time.sleep(0.2)
+        core.drain(core.frame_queue.maxsize)
+        ingest = core.ingest_engine.get_stats()
+        commands = core.transport.get_stats()
+        core.close()
+        sim.close()
+
+    stats = sim.get_stats()
+    queue = core.frame_queue.get_stats()
+    print(f"Simulator: {stats['lines_sent']} lines at {stats['lines_per_sec']:,.0f} lines/s "
+          f"({stats['bytes_sent']} bytes, {stats['bytes_dropped']} dropped at the pty)")
+    print(f"Core: {ingest['frames_total']} lines received, {core.frames_applied} frames applied, "
+          f"{queue['dropped']} dropped in queue, {core.frame_parser.errors} parse errors, "
+          f"{ingest['garbage_bytes']} garbage bytes skipped")
+    if commands['latency_ms']:
+        p50, p99, worst = commands['latency_ms']
+        print(f"Commands: {commands['sent']} sent, {commands['acked']} acked, {commands['timeouts']} timed out, "
+              f"{commands['coalesced']} coalesced; round trip p50 {p50:.2f} ms, p99 {p99:.2f} ms, "
+              f"max {worst:.2f} ms")
+    alerts = core.alert_stats()
+    if alerts['latency_p50_ms'] is not None:
+        print(f"Alerts: {core.alert_count} raised; serial read to alert p50 {alerts['latency_p50_ms']:.2f} ms, "
+              f"p99 {alerts['latency_p99_ms']:.2f} ms")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the over.ino ESP32 on a pseudo-terminal.")
+    parser.add_argument('--rate', type=float, default=20.0, help="loop() iterations per second (firmware ~20)")
+    parser.add_argument('--noise', type=float, default=10.0, help="ADC noise standard deviation")
+    parser.add_argument('--spike-rate', type=float, default=0.0, help="chance per reading of a spike")
+    parser.add_argument('--garbage-rate', type=float, default=0.0, help="chance per loop of random bytes")
+    parser.add_argument('--binary', action='store_true', help="send BINARY_FRAMES instead of ASCII lines")
+    parser.add_argument('--ldr-interval', type=int, default=20, help="LDR sample interval in ms")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--link', help="also expose the pty under this path (symlink)")
+    parser.add_argument('--count', type=int, default=1,
+                        help="simulate this many boards, one pty each (--link gets a -N suffix)")
+    parser.add_argument('--duration', type=float)
+    parser.add_argument('--unplug-every', type=float, metavar='SECONDS',
+                        help="simulate pulling the USB cable this often (use with --link)")
+    parser.add_argument('--unplug-for', type=float, default=1.0, metavar='SECONDS',
+                        help="how long the board stays unplugged")
+    parser.add_argument('--bench', action='store_true', help="measure end-to-end throughput and latency")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        benchmark(args.rate, args.duration or 5.0, args.noise, args.garbage_rate, args.binary)
+        return 0
+
+    sims = []
+    for number in range(args.count):
+        seed = None if args.seed is None else args.seed + number
+        sim = ESP32Simulator(args.rate, args.noise, args.spike_rate, args.garbage_rate,
+                             args.binary, args.ldr_interval, seed, args.unplug_every, args.unplug_for)
+        link = args.link
+        if link and args.count > 1:
+            link = f"{link}-{number}"
+        port = sim.open(link)
+        print(f"Simulated ESP32 on {port}" + (f" (linked as {link})" if link else ""), flush=True)
+        sims.append((sim, link))
+    try:
+        if len(sims) == 1:
+            sims[0][0].run(args.duration)
+        else:
+            run_many([sim for sim, _ in sims], args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sim, link in sims:
+            sim.close()
+            if link and os.path.islink(link):
+                os.unlink(link)
+    for sim, _ in sims:
+        stats = sim.get_stats()
+        print(f"{sim.port_name}: sent {stats['lines_sent']} lines ({stats['lines_per_sec']:,.0f} lines/s), "
+              f"{stats['bytes_dropped']} bytes dropped, {stats['commands']} commands")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""Bulk export of a recorded session (tsstore segments) to columnar files.
+
+Samples and events go to two tables next to each other:
+
+    <output>-samples.<ext>   t, sensor, raw, filtered
+    <output>-events.<ext>    t, event, detail   (LED status, mode, LED acks, link)
+
+Segments are read a chunk of records at a time and each chunk is written
+before the next is read, so memory stays flat however large the session.
+Parquet and Arrow IPC need pyarrow and zstd CSV needs the zstandard
+package; without them gzip CSV is always available. t is epoch seconds.
+
+    python export.py recordings/device1 session --format parquet --start 2024-05-01T08:00
+"""
+import argparse
+import gzip
+import importlib
+import io
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from tsstore import (RECORD_DTYPE, RECORD_SIZE, SAMPLE_KINDS, KIND_NAMES, KIND_LED_STATUS,
+                     KIND_MODE, KIND_LED_ACK, KIND_LINK, MODE_CODES, LINK_LOST,
+                     TimeSeriesStore, index_bounds, segment_start_time)
+
+# Format -> file extension, best first; 'auto' picks the first one available
+FORMATS = {
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+    'csv.zst': 'csv.zst',
+    'csv.gz': 'csv.gz',
+    'csv': 'csv',
+}
+SENSOR_NAMES = sorted(SAMPLE_KINDS, key=SAMPLE_KINDS.get)
+MODE_NAMES = {code: name for name, code in MODE_CODES.items()}
+
+
+def optional_module(name):
+    """Import an optional dependency, or None if it isn't installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def available_formats():
+    formats = []
+    if optional_module('pyarrow') is not None:
+        formats += ['parquet', 'arrow']
+    if optional_module('zstandard') is not None:
+        formats.append('csv.zst')
+    return formats + ['csv.gz', 'csv']
+
+
+def output_paths(output, fmt):
+    """(samples path, events path) for an output base name, dropping a format suffix if given."""
+    extension = FORMATS[fmt]
+    for suffix in sorted(FORMATS.values(), key=len, reverse=True):
+        if output.endswith('.' + suffix):
+            output = output[:-len(suffix) - 1]
+            break
+    return f"{output}-samples.{extension}", f"{output}-events.{extension}"
+
+
+def format_for_path(path):
+    """The format named by a file's extension, or None."""
+    for fmt, extension in sorted(FORMATS.items(), key=lambda item: len(item[1]), reverse=True):
+        if path.endswith('.' + extension):
+            return fmt
+    return None
+
+
+def parse_time(text):
+    """Epoch seconds from a number or an ISO 8601 date/time (local time if no zone)."""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+# ==================== COLUMNS ====================
+
+def sample_columns(records):
+    """Column arrays of a chunk's sample records."""
+    return {
+        't': records['t'],
+        'sensor': records['kind'] - SAMPLE_KINDS[SENSOR_NAMES[0]],  # index into SENSOR_NAMES
+        'raw': records['raw'],
+        'filtered': records['filtered'],
+    }
+
+
+def event_detail(record):
+    kind = int(record['kind'])
+    code = int(record['code'])
+    aux = int(record['aux'])
+    if kind == KIND_LED_STATUS:
+        return " ".join(f"{sensor}={aux >> bit & 1}" for bit, sensor in enumerate(SENSOR_NAMES))
+    if kind == KIND_MODE:
+        return MODE_NAMES.get(code, f"unknown ({code})")
+    if kind == KIND_LED_ACK:
+        return f"{f'LED{code}' if code else 'ALL_LEDS'} {'ON' if aux else 'OFF'}"
+    if kind == KIND_LINK:
+        if code == LINK_LOST:
+            return "lost"
+        return f"restored gap={float(record['raw']):.3f}s recovery={float(record['filtered']):.3f}s"
+    return f"code={code} aux={aux}"
+
+
+def event_columns(records):
+    """Column lists of a chunk's event records (few, so decoded one by one)."""
+    return {
+        't': records['t'],
+        'event': [KIND_NAMES.get(int(kind), str(kind)) for kind in records['kind']],
+        'detail': [event_detail(record) for record in records],
+    }
+
+
+# ==================== WRITERS ====================
+
+class CsvWriter:
+    """One CSV table, optionally gzip or zstd compressed, written chunk by chunk."""
+
+    def __init__(self, path, header, row_format, compression=None, level=None):
+        self.path = path
+        self.row_format = row_format
+        raw = open(path, 'wb')
+        if compression == 'gzip':
+            raw = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level or 3)
+            self.outer = raw.fileobj
+        elif compression == 'zstd':
+            zstandard = optional_module('zstandard')
+            if zstandard is None:
+                raw.close()
+                raise ValueError("zstd CSV needs the zstandard package")
+            self.outer = None
+            raw = zstandard.ZstdCompressor(level=level or 3).stream_writer(raw)
+        else:
+            self.outer = None
+        self.stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        self.stream.write(",".join(header) + "\n")
+
+    def write(self, columns):
+        names = list(columns)
+        count = len(columns[names[0]])
+        if not count:
+            return
+        # One %-format over the whole chunk is several times faster than a csv.writer
+        flat = [None] * (count * len(names))
+        for position, name in enumerate(names):
+            values = columns[name]
+            flat[position::len(names)] = values.tolist() if isinstance(values, np.ndarray) else values
+        self.stream.write((self.row_format * count) % tuple(flat))
+
+    def close(self):
+        self.stream.close()
+        if self.outer is not None:
+            # GzipFile doesn't close a file object it was handed
+            self.outer.close()
+
+
+class SampleCsvWriter(CsvWriter):
+    def __init__(self, path, **options):
+        super().__init__(path, ('t', 'sensor', 'raw', 'filtered'), '%.6f,%s,%.7g,%.7g\n', **options)
+        self.names = np.array(SENSOR_NAMES, dtype=object)
+
+    def write(self, columns):
+        columns = dict(columns, sensor=self.names[columns['sensor']])
+        columns['raw'] = columns['raw'].astype(np.float64)
+        columns['filtered'] = columns['filtered'].astype(np.float64)
+        super().write(columns)
+
+
+class EventCsvWriter(CsvWriter):
+    def __init__(self, path, **options):
+        super().__init__(path, ('t', 'event', 'detail'), '%.6f,%s,%s\n', **options)
+
+
+class ArrowWriter:
+    """One Parquet file or Arrow IPC file, one row group / record batch per chunk."""
+
+    def __init__(self, path, schema_fields, parquet):
+        pa = optional_module('pyarrow')
+        if pa is None:
+            raise ValueError("Parquet and Arrow export need the pyarrow package")
+        self.pa = pa
+        self.path = path
+        fields = []
+        for name, kind in schema_fields:
+            if kind == 'sensor':
+                kind = pa.dictionary(pa.int8(), pa.string())
+            fields.append(pa.field(name, kind))
+        self.schema = pa.schema(fields)
+        # Every batch shares one dictionary; IPC files can't replace it midway
+        self.sensors = pa.array(SENSOR_NAMES, type=pa.string())
+        if parquet:
+            parquet_module = importlib.import_module('pyarrow.parquet')
+            self.writer = parquet_module.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, columns):
+        pa = self.pa
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(values.astype(np.int8), type=pa.int8()), self.sensors))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        if len(arrays[0]):
+            self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writers(fmt, samples_path, events_path):
+    if fmt in ('parquet', 'arrow'):
+        pa = optional_module('pyarrow')
+        if pa is None:
+            raise ValueError("Parquet and Arrow export need the pyarrow package")
+        parquet = fmt == 'parquet'
+        samples = ArrowWriter(samples_path, [('t', pa.float64()), ('sensor', 'sensor'),
+                                             ('raw', pa.float32()), ('filtered', pa.float32())], parquet)
+        events = ArrowWriter(events_path, [('t', pa.float64()), ('event', pa.string()),
+                                           ('detail', pa.string())], parquet)
+        return samples, events
+    compression = {'csv.gz': 'gzip', 'csv.zst': 'zstd', 'csv': None}[fmt]
+    samples = SampleCsvWriter(samples_path, compression=compression)
+    try:
+        events = EventCsvWriter(events_path, compression=compression)
+    except Exception:
+        samples.close()
+        raise
+    return samples, events
+
+
+# ==================== EXPORT ====================
+
+def segment_ranges(directory, t0, t1):
+    """(path, first record, last record) of every segment part that can hold [t0, t1)."""
+    paths = TimeSeriesStore(directory).segments()
+    ranges = []
+    for position, path in enumerate(paths):
+        if segment_start_time(path) >= t1:
+            break
+        if position + 1 < len(paths) and segment_start_time(paths[position + 1]) <= t0:
+            continue
+        total = os.path.getsize(path) // RECORD_SIZE
+        first, last = index_bounds(path, t0, t1, total)
+        if last > first:
+            ranges.append((path, first, last))
+    return ranges
+
+
+def export_session(directory, output, fmt='auto', t0=None, t1=None, chunk_records=1 << 16,
+                   on_progress=None):
+    """Export a store directory's records in [t0, t1) (default: everything).
+
+    on_progress(records_done, records_total) is called after each chunk.
+    Returns the stats: records scanned and exported, input and output bytes,
+    seconds, exported records/s and input MB/s, and the two output paths.
+    """
+    if fmt == 'auto':
+        fmt = format_for_path(output) or available_formats()[0]
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r} (choose from {', '.join(FORMATS)})")
+    t0 = -np.inf if t0 is None else t0
+    t1 = np.inf if t1 is None else t1
+
+    start = time.perf_counter()
+    ranges = segment_ranges(directory, t0, t1)
+    total = sum(last - first for _path, first, last in ranges)
+    samples_path, events_path = output_paths(output, fmt)
+    directory_out = os.path.dirname(os.path.abspath(samples_path))
+    os.makedirs(directory_out, exist_ok=True)
+    sample_writer, event_writer = open_writers(fmt, samples_path, events_path)
+
+    last_sample_kind = max(SAMPLE_KINDS.values())
+    done = samples = events = 0
+    try:
+        for path, first, last in ranges:
+            with open(path, 'rb') as f:
+                f.seek(first * RECORD_SIZE)
+                remaining = last - first
+                while remaining > 0:
+                    count = min(chunk_records, remaining)
+                    records = np.fromfile(f, dtype=RECORD_DTYPE, count=count)
+                    if not len(records):
+                        break
+                    remaining -= len(records)
+                    done += len(records)
+                    records = records[(records['t'] >= t0) & (records['t'] < t1)]
+                    is_sample = (records['kind'] >= 1) & (records['kind'] <= last_sample_kind)
+                    sample_records = records[is_sample]
+                    event_records = records[~is_sample]
+                    sample_writer.write(sample_columns(sample_records))
+                    if len(event_records):
+                        event_writer.write(event_columns(event_records))
+                    samples += len(sample_records)
+                    events += len(event_records)
+                    if on_progress:
+                        on_progress(done, total)
+    finally:
+        sample_writer.close()
+        event_writer.close()
+
+    seconds = time.perf_counter() - start
+    bytes_in = done * RECORD_SIZE
+    return {
+        'format': fmt,
+        'paths': (samples_path, events_path),
+        'scanned': done,
+        'samples': samples,
+        'events': events,
+        'bytes_in': bytes_in,
+        'bytes_out': os.path.getsize(samples_path) + os.path.getsize(events_path),
+        'seconds': seconds,
+        'records_per_sec': (samples + events) / seconds if seconds > 0 else 0.0,
+        'mb_per_sec': bytes_in / seconds / 1e6 if seconds > 0 else 0.0,
+    }
+
+
+def format_stats(stats):
+    return (f"Exported {stats['samples']:,} samples and {stats['events']:,} events as {stats['format']} "
+            f"in {stats['seconds']:.2f} s ({stats['records_per_sec']:,.0f} records/s, "
+            f"{stats['mb_per_sec']:.1f} MB/s in, {stats['bytes_out'] / 1e6:.1f} MB out)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a recorded session to columnar files.")
+    parser.add_argument('directory', help="a device's recordings directory, e.g. recordings/device1")
+    parser.add_argument('output', help="output base name; writes <output>-samples.<ext> and <output>-events.<ext>")
+    parser.add_argument('--format', default='auto', choices=['auto'] + list(FORMATS),
+                        help=f"default: the first available of {', '.join(available_formats())}")
+    parser.add_argument('--start', type=parse_time, help="epoch seconds or ISO 8601 time")
+    parser.add_argument('--end', type=parse_time, help="epoch seconds or ISO 8601 time")
+    parser.add_argument('--chunk', type=int, default=1 << 16, help="records per chunk")
+    args = parser.parse_args(argv)
+
+    if not TimeSeriesStore(args.directory).segments():
+        print(f"No recorded segments in {args.directory}")
+        return 1
+    try:
+        stats = export_session(args.directory, args.output, args.format, args.start, args.end, args.chunk)
+    except (OSError, ValueError) as e:
+        print(f"Export failed: {e}")
+        return 1
+    print(format_stats(stats))
+    for path in stats['paths']:
+        print(f"  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,591 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from bisect import bisect_left, insort
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# ==================== ADAPTIVE LOW-PASS FILTER ====================
+#
+# Both paths work on the per-sensor state dict kept by AdaptiveStage
+# ('calibration_phase', 'calibration_samples', 'filter_buffer', 'initial_samples')
+# plus the last filtered value, and leave that state exactly as the other would.
+
+def _median(values):
+    """Median matching np.median (mean of the two middle values for even counts)."""
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return float(ordered[mid])
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def adaptive_filter_step(state, raw_value, last_filtered, calibration_count,
+                         initial_alpha, alpha):
+    """Filter one live sample: calibration median -> windowed median/mean -> EMA."""
+    if state['calibration_phase']:
+        samples = state['calibration_samples']
+        samples.append(raw_value)
+        if len(samples) < calibration_count:
+            # During calibration, return the current raw value (will be smoothed later)
+            return raw_value
+        # Baseline from calibration samples (median to ignore outliers)
+        baseline = _median(samples)
+        state['calibration_phase'] = False
+        state['initial_samples'] = calibration_count
+        buffer = state['filter_buffer']
+        for _ in range(3):
+            buffer.append(baseline)
+        return baseline
+
+    buffer = state['filter_buffer']
+    buffer.append(raw_value)
+    state['initial_samples'] += 1
+
+    size = len(buffer)
+    if size < 3:
+        return raw_value
+
+    if state['initial_samples'] <= calibration_count + 10:
+        # Median of the window with slow smoothing right after calibration
+        value = sorted(buffer)[size // 2]
+        weight = initial_alpha
+    else:
+        # Moving average with faster smoothing once stable
+        value = sum(buffer) / size
+        weight = alpha
+
+    if last_filtered is None:
+        return value
+    return weight * value + (1 - weight) * last_filtered
+
+
+def adaptive_filter_batch(state, raw_values, last_filtered, calibration_count,
+                          initial_alpha, alpha):
+    """Filter an array of samples at once; same results as calling adaptive_filter_step in order."""
+    raw = np.asarray(raw_values, dtype=np.float64)
+    count = len(raw)
+    out = np.empty(count, dtype=np.float64)
+    if count == 0:
+        return out
+
+    pos = 0
+    if state['calibration_phase']:
+        samples = state['calibration_samples']
+        take = min(max(calibration_count - len(samples), 1), count)
+        out[:take] = raw[:take]
+        samples.extend(raw[:take].tolist())
+        if len(samples) >= calibration_count:
+            baseline = float(np.median(samples))
+            out[take - 1] = baseline
+            state['calibration_phase'] = False
+            state['initial_samples'] = calibration_count
+            buffer = state['filter_buffer']
+            for _ in range(3):
+                buffer.append(baseline)
+        pos = take
+        if pos == count or state['calibration_phase']:
+            return out
+        last_filtered = float(out[pos - 1])
+
+    rest = raw[pos:]
+    n = len(rest)
+    buffer = state['filter_buffer']
+    width = buffer.maxlen
+    prefix_len = len(buffer)
+
+    # Window for sample j is the newest `width` values of buffer + rest[:j + 1];
+    # missing leading slots are NaN so they sort last
+    padded = np.concatenate((np.full(width - 1, np.nan), np.asarray(buffer, dtype=np.float64), rest))
+    windows = sliding_window_view(padded, width)[prefix_len:prefix_len + n]
+    sizes = np.minimum(np.arange(prefix_len + 1, prefix_len + n + 1), width)
+
+    ordered = np.sort(windows, axis=1)
+    medians = ordered[np.arange(n), sizes // 2]
+
+    # Sum column by column from oldest to newest so rounding matches sum(buffer)
+    filled = np.where(np.isnan(windows), 0.0, windows)
+    totals = np.zeros(n)
+    for column in range(width):
+        totals = totals + filled[:, column]
+    means = totals / sizes
+
+    sample_numbers = state['initial_samples'] + np.arange(1, n + 1)
+    median_phase = sample_numbers <= calibration_count + 10
+    values = np.where(median_phase, medians, means)
+    weights = np.where(median_phase, initial_alpha, alpha)
+    passthrough = sizes < 3
+
+    # The EMA is a first-order recurrence; run it over plain floats so every
+    # step rounds exactly as the scalar path does
+    results = out[pos:]
+    raw_list = rest.tolist()
+    previous = last_filtered
+    j = 0
+    # Window sizes only grow, so pass-through samples can only be at the start
+    while j < n and (passthrough[j] or previous is None):
+        previous = raw_list[j] if passthrough[j] else float(values[j])
+        results[j] = previous
+        j += 1
+    smoothed = []
+    append = smoothed.append
+    for value, weight, keep in zip(values[j:].tolist(), weights[j:].tolist(), (1 - weights[j:]).tolist()):
+        previous = weight * value + keep * previous
+        append(previous)
+    results[j:] = smoothed
+
+    buffer.extend(raw_list[-width:])
+    state['initial_samples'] += n
+    return out
+
+
+# ==================== FILTER PIPELINE ====================
+#
+# Each sensor runs its samples through a FilterChain of stages. A stage keeps
+# its own state and filters one sample in O(1) (O(log n) for the order
+# statistics of median/Hampel); update_many() filters an array in order and
+# gives the same results as repeated update() calls.
+
+FILTERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filters.json')
+
+
+class FilterStage:
+    """One filtering step; subclasses implement update() and reset()."""
+
+    kind = None
+
+    def update(self, t, x):
+        raise NotImplementedError
+
+    def update_many(self, times, values):
+        update = self.update
+        return np.array([update(t, x) for t, x in zip(times, values)], dtype=np.float64)
+
+    def reset(self):
+        pass
+
+    def describe(self):
+        return self.kind
+
+
+class AdaptiveStage(FilterStage):
+    """The dashboard's original scheme: calibration median -> 5-sample median/mean -> EMA."""
+
+    kind = 'adaptive'
+
+    def __init__(self, calibration=15, initial_alpha=0.3, alpha=0.6, width=5):
+        self.calibration = calibration
+        self.initial_alpha = initial_alpha
+        self.alpha = alpha
+        self.width = width
+        self.last = None
+        self.reset()
+
+    def reset(self):
+        # Restart calibration; the last output stays as the EMA's starting point
+        self.state = {
+            'filter_buffer': deque(maxlen=self.width),
+            'initial_samples': 0,
+            'calibration_phase': True,
+            'calibration_samples': [],
+        }
+
+    def update(self, t, x):
+        self.last = adaptive_filter_step(self.state, x, self.last, self.calibration,
+                                         self.initial_alpha, self.alpha)
+        return self.last
+
+    def update_many(self, times, values):
+        out = adaptive_filter_batch(self.state, values, self.last, self.calibration,
+                                    self.initial_alpha, self.alpha)
+        if len(out):
+            self.last = float(out[-1])
+        return out
+
+
+class EMAStage(FilterStage):
+    """Exponential moving average: y += alpha * (x - y)."""
+
+    kind = 'ema'
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.y = None
+
+    def reset(self):
+        self.y = None
+
+    def update(self, t, x):
+        y = self.y
+        self.y = y = x if y is None else y + self.alpha * (x - y)
+        return y
+
+    def describe(self):
+        return f"ema({self.alpha:g})"
+
+
+class SortedWindow:
+    """The last `size` samples in arrival order and in sorted order.
+
+    Insert and evict are a bisect plus a list memmove, so order statistics
+    (median, MAD) never need a sort of the window.
+    """
+
+    __slots__ = ('size', 'fifo', 'ordered')
+
+    def __init__(self, size):
+        self.size = size
+        self.fifo = deque()
+        self.ordered = []
+
+    def push(self, x):
+        ordered = self.ordered
+        if len(self.fifo) == self.size:
+            del ordered[bisect_left(ordered, self.fifo.popleft())]
+        self.fifo.append(x)
+        insort(ordered, x)
+
+    def clear(self):
+        self.fifo.clear()
+        self.ordered.clear()
+
+    def median(self):
+        ordered = self.ordered
+        n = len(ordered)
+        mid = n // 2
+        return ordered[mid] if n % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+    def kth_distance(self, center, k):
+        """k-th smallest |x - center| (0-based), by merging the two sides of center in O(log n)."""
+        s = self.ordered
+        split = bisect_left(s, center)  # s[:split] < center <= s[split:]
+        left_count, right_count = split, len(s) - split
+        # Take i distances from the left side and k + 1 - i from the right
+        lo, hi = max(0, k + 1 - right_count), min(k + 1, left_count)
+        while lo < hi:
+            i = (lo + hi) // 2
+            j = k + 1 - i
+            if j > 0 and center - s[split - 1 - i] < s[split + j - 1] - center:
+                lo = i + 1
+            else:
+                hi = i
+        j = k + 1 - lo
+        left = center - s[split - lo] if lo > 0 else -1.0
+        right = s[split + j - 1] - center if j > 0 else -1.0
+        return max(left, right)
+
+    def mad(self, center):
+        """Median absolute deviation from center."""
+        n = len(self.ordered)
+        if n % 2:
+            return self.kth_distance(center, n // 2)
+        return (self.kth_distance(center, n // 2 - 1) + self.kth_distance(center, n // 2)) / 2
+
+
+class MedianStage(FilterStage):
+    """Running median of the last `window` samples."""
+
+    kind = 'median'
+
+    def __init__(self, window=5):
+        self.window = SortedWindow(window)
+
+    def reset(self):
+        self.window.clear()
+
+    def update(self, t, x):
+        self.window.push(x)
+        return self.window.median()
+
+    def describe(self):
+        return f"median({self.window.size})"
+
+
+class HampelStage(FilterStage):
+    """Outlier rejection: a sample more than n_sigmas robust deviations from the
+    window median (1.4826 * MAD) is replaced by that median."""
+
+    kind = 'hampel'
+
+    def __init__(self, window=7, n_sigmas=3.0):
+        self.window = SortedWindow(window)
+        self.limit = n_sigmas * 1.4826
+        self.n_sigmas = n_sigmas
+        self.rejected = 0
+
+    def reset(self):
+        self.window.clear()
+
+    def update(self, t, x):
+        window = self.window
+        window.push(x)
+        if len(window.ordered) < 3:
+            return x
+        median = window.median()
+        if abs(x - median) > self.limit * window.mad(median):
+            self.rejected += 1
+            return median
+        return x
+
+    def describe(self):
+        return f"hampel({self.window.size}, {self.n_sigmas:g})"
+
+
+class SavitzkyGolayStage(FilterStage):
+    """Causal Savitzky-Golay: a least-squares polynomial of `order` over the last
+    `window` samples, evaluated at the newest one.
+
+    The fit only needs the moments S_j = sum(i**j * x_i) over the window; they
+    slide in O(order**2) per sample with a binomial shift instead of an
+    O(window) dot product, and are recomputed exactly once per window to stop
+    rounding from accumulating.
+    """
+
+    kind = 'savgol'
+
+    def __init__(self, window=11, order=2):
+        if window <= order:
+            raise ValueError("savgol window must be longer than the polynomial order")
+        self.size = window
+        self.order = order
+        positions = np.arange(window, dtype=np.float64)
+        vander = np.vander(positions, order + 1, increasing=True)
+        newest = (window - 1.0) ** np.arange(order + 1)
+        # Value at the newest sample = newest . (V^T V)^-1 V^T x = weights . S
+        self.weights = np.linalg.solve(vander.T @ vander, newest).tolist()
+        # Sliding the window renumbers i -> i - 1: S'_j = sum_m C(j, m) (-1)^(j - m) S_m
+        self.shift = [[math.comb(j, m) * (-1) ** (j - m) for m in range(j + 1)] for j in range(order + 1)]
+        self.powers = [(window - 1.0) ** j for j in range(order + 1)]
+        self.reset()
+
+    def reset(self):
+        self.fifo = deque()
+        self.moments = [0.0] * (self.order + 1)
+        self.slides = 0
+
+    def recompute(self):
+        values = np.asarray(self.fifo, dtype=np.float64)
+        positions = np.arange(len(values), dtype=np.float64)
+        self.moments = [float(np.dot(positions ** j, values)) for j in range(self.order + 1)]
+
+    def update(self, t, x):
+        fifo = self.fifo
+        fifo.append(x)
+        if len(fifo) <= self.size:
+            position = len(fifo) - 1
+            moments = self.moments
+            for j in range(self.order + 1):
+                moments[j] += position ** j * x
+            if len(fifo) < self.size:
+                return x
+        else:
+            oldest = fifo.popleft()
+            self.slides += 1
+            if self.slides >= self.size:
+                self.slides = 0
+                self.recompute()
+            else:
+                # Drop the oldest (position 0 only counts in S_0), renumber, add the newest
+                previous = self.moments
+                previous[0] -= oldest
+                self.moments = [sum(c * s for c, s in zip(row, previous)) + power * x
+                                for row, power in zip(self.shift, self.powers)]
+        return sum(w * s for w, s in zip(self.weights, self.moments))
+
+    def describe(self):
+        return f"savgol({self.size}, {self.order})"
+
+
+class KalmanStage(FilterStage):
+    """Scalar Kalman filter for a slowly drifting level.
+
+    q is the process noise (how far the true value may move per sample) and r
+    the measurement noise variance, both in squared sensor units.
+    """
+
+    kind = 'kalman'
+
+    def __init__(self, q=1.0, r=25.0):
+        self.q = q
+        self.r = r
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.p = self.r
+
+    def update(self, t, z):
+        if self.x is None:
+            self.x = z
+            return z
+        p = self.p + self.q
+        gain = p / (p + self.r)
+        self.x += gain * (z - self.x)
+        self.p = (1.0 - gain) * p
+        return self.x
+
+    def describe(self):
+        return f"kalman(q={self.q:g}, r={self.r:g})"
+
+
+class OneEuroStage(FilterStage):
+    """One-euro filter: an EMA whose cutoff rises with the signal's speed, so it
+    smooths hard at rest and lags little during fast changes (t in seconds)."""
+
+    kind = 'one_euro'
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0, default_dt=0.05):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.default_dt = default_dt
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.dx = 0.0
+        self.t = None
+
+    @staticmethod
+    def smoothing(cutoff, dt):
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+    def update(self, t, x):
+        if self.x is None:
+            self.x, self.t = x, t
+            return x
+        dt = t - self.t if t > self.t else self.default_dt
+        self.t = t
+        a = self.smoothing(self.d_cutoff, dt)
+        self.dx += a * ((x - self.x) / dt - self.dx)
+        a = self.smoothing(self.min_cutoff + self.beta * abs(self.dx), dt)
+        self.x += a * (x - self.x)
+        return self.x
+
+    def describe(self):
+        return f"one_euro({self.min_cutoff:g}, {self.beta:g})"
+
+
+STAGE_TYPES = {
+    'adaptive': AdaptiveStage,
+    'ema': EMAStage,
+    'median': MedianStage,
+    'hampel': HampelStage,
+    'savgol': SavitzkyGolayStage,
+    'kalman': KalmanStage,
+    'one_euro': OneEuroStage,
+}
+
+# Sensor -> chain of stage specs; every sensor keeps the original scheme unless configured
+DEFAULT_CHAINS = {sensor: [{'type': 'adaptive'}] for sensor in ('gas', 'ldr', 'voltage')}
+
+
+def build_stage(spec):
+    """A stage from {"type": ..., **parameters}; raises ValueError for bad specs."""
+    params = dict(spec)
+    kind = params.pop('type', None)
+    if kind not in STAGE_TYPES:
+        raise ValueError(f"unknown filter stage {kind!r}")
+    try:
+        return STAGE_TYPES[kind](**params)
+    except TypeError as e:
+        raise ValueError(f"filter stage {kind!r}: {e}")
+
+
+class FilterChain:
+    """A sensor's stages, applied in order."""
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    @classmethod
+    def from_specs(cls, specs):
+        return cls([build_stage(spec) for spec in specs])
+
+    def update(self, t, x):
+        for stage in self.stages:
+            x = stage.update(t, x)
+        return x
+
+    def update_many(self, times, values):
+        """Filter a batch; each stage runs over the whole array before the next."""
+        values = np.asarray(values, dtype=np.float64)
+        for stage in self.stages:
+            values = stage.update_many(times, values)
+        return values
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def describe(self):
+        return " -> ".join(stage.describe() for stage in self.stages) or "none"
+
+
+def load_filter_chains(device_id=None, path=FILTERS_PATH):
+    """Sensor -> stage specs for a device from filters.json, falling back to DEFAULT_CHAINS.
+
+    The file holds {"default": {sensor: [stage, ...]}, "devices": {device_id: {sensor: [...]}}};
+    a device's chain for a sensor replaces the default one.
+    """
+    chains = {sensor: list(specs) for sensor, specs in DEFAULT_CHAINS.items()}
+    if not path or not os.path.exists(path):
+        return chains
+    with open(path, encoding='utf-8') as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+    chains.update(config.get('default', {}))
+    if device_id is not None:
+        chains.update(config.get('devices', {}).get(device_id, {}))
+    return chains
+
+
+def benchmark(samples=100000):
+    """Per-stage cost on a noisy signal with spikes, one sample at a time and batched."""
+    import random
+    rng = random.Random(1)
+    signal = []
+    level = 300.0
+    for _ in range(samples):
+        level += rng.gauss(0, 0.5)
+        value = level + rng.gauss(0, 10)
+        if rng.random() < 0.01:
+            value += rng.choice((-1, 1)) * 400
+        signal.append(value)
+    times = [n * 0.05 for n in range(samples)]
+
+    specs = [{'type': 'adaptive'}, {'type': 'ema'}, {'type': 'median', 'window': 5},
+             {'type': 'median', 'window': 101}, {'type': 'hampel', 'window': 7},
+             {'type': 'hampel', 'window': 101}, {'type': 'savgol', 'window': 11, 'order': 2},
+             {'type': 'savgol', 'window': 101, 'order': 3}, {'type': 'kalman'}, {'type': 'one_euro'}]
+    print(f"{samples} samples per stage:")
+    for spec in specs:
+        stage = build_stage(spec)
+        start = time.perf_counter()
+        for t, x in zip(times, signal):
+            stage.update(t, x)
+        single = (time.perf_counter() - start) / samples
+        stage = build_stage(spec)
+        start = time.perf_counter()
+        stage.update_many(times, signal)
+        batch = (time.perf_counter() - start) / samples
+        print(f"  {stage.describe():24s} {single * 1e9:7.0f} ns/sample, batched {batch * 1e9:7.0f} ns/sample")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sensor filter stages.")
+    parser.add_argument('--samples', type=int, default=100000)
+    args = parser.parse_args(argv)
+    benchmark(args.samples)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
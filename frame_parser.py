@@ -0,0 +1,232 @@
+import struct
+import time
+
+# --- Binary frame layout (see BINARY_FRAMES in over.ino) ---
+# sync(u8) kind(u8) aux(u16) millis(u32) value(f32), little-endian, 12 bytes
+BINARY_SYNC = 0xA5
+BINARY_SYNC_BYTE = bytes([BINARY_SYNC])
+BINARY_FRAME = struct.Struct('<BBHIf')
+BINARY_FRAME_SIZE = BINARY_FRAME.size
+
+BINARY_KIND_GAS = 1
+BINARY_KIND_LDR = 2
+BINARY_KIND_VOLT = 3
+BINARY_KIND_LED_STATUS = 4
+BINARY_KINDS = frozenset((BINARY_KIND_GAS, BINARY_KIND_LDR, BINARY_KIND_VOLT, BINARY_KIND_LED_STATUS))
+
+# Firmware LED ids, and the frame kinds that answer a command (see command_transport.py)
+LED_IDS = ('LED1', 'LED2', 'LED3')
+REPLY_KINDS = frozenset(('mode', 'led_ack', 'error'))
+
+
+class FrameParser:
+    """Table-driven parser turning over.ino output into (kind, timestamp, payload) frames."""
+
+    def __init__(self, start_time=None):
+        self.start_time = time.time() if start_time is None else start_time
+        self.frames = 0
+        self.errors = 0
+        self.last_error = None
+
+        # Prefix (text before the first ':') -> handler(body) returning (kind, payload)
+        self.ascii_handlers = {
+            'GAS': self._parse_gas,
+            'LDR': self._parse_ldr,
+            'VOLT': self._parse_volt,
+            'LED_STATUS': self._parse_led_status,
+            'MODE_CHANGED': self._parse_mode,
+            'ALL_LEDS': self._parse_all_leds,
+            'ERROR': self._parse_error,
+        }
+        # Binary kind byte -> handler(aux, value) returning (kind, payload)
+        self.binary_handlers = {
+            BINARY_KIND_GAS: lambda aux, value: ('gas', value),
+            BINARY_KIND_LDR: lambda aux, value: ('ldr', value),
+            BINARY_KIND_VOLT: lambda aux, value: ('voltage', value),
+            BINARY_KIND_LED_STATUS: lambda aux, value: ('led_status', (aux & 1, (aux >> 1) & 1, (aux >> 2) & 1)),
+        }
+
+    # --- ASCII field handlers ---
+
+    @staticmethod
+    def _parse_gas(body):
+        # Format: "GAS:value,dangerLevel"
+        value, _danger = body.split(',')
+        return 'gas', float(value)
+
+    @staticmethod
+    def _parse_ldr(body):
+        # Format: "LDR:time,value"
+        _t, value = body.split(',')
+        return 'ldr', float(value)
+
+    @staticmethod
+    def _parse_volt(body):
+        # Format: "VOLT:min,value,max"
+        _low, value, _high = body.split(',')
+        return 'voltage', float(value)
+
+    @staticmethod
+    def _parse_led_status(body):
+        # Format: "LED_STATUS:gas,ldr,volt"
+        gas, ldr, volt = body.split(',')
+        return 'led_status', (int(gas), int(ldr), int(volt))
+
+    @staticmethod
+    def _parse_mode(body):
+        return 'mode', body
+
+    @staticmethod
+    def _parse_all_leds(body):
+        # Reply to ALL_ON / ALL_OFF, recorded like an LED command confirmation
+        return 'led_ack', ('ALL_LEDS', body)
+
+    @staticmethod
+    def _parse_error(body):
+        # Format: "ERROR: Switch to manual mode first"
+        return 'error', body.strip()
+
+    def timestamp(self):
+        """Seconds since the parser's start time."""
+        return time.time() - self.start_time
+
+    def parse_lines(self, lines, timestamp=None):
+        """Parse a batch of lines into frames, stamping the whole batch with one timestamp."""
+        if timestamp is None:
+            timestamp = time.time() - self.start_time
+        handlers = self.ascii_handlers
+        frames = []
+        append = frames.append
+        count = len(lines)
+        i = 0
+        # The try sits outside the hot loop; on a bad line we count it and resume after it
+        while i < count:
+            try:
+                for i in range(i, count):
+                    line = lines[i]
+                    head, sep, body = line.partition(':')
+                    if not sep:
+                        continue
+                    handler = handlers.get(head)
+                    if handler is not None:
+                        kind, payload = handler(body)
+                        append((kind, timestamp, payload))
+                    elif head.startswith('LED'):
+                        # LED command confirmation like "LED1:ON"
+                        append(('led_ack', timestamp, (head, body)))
+                i = count
+            except (ValueError, IndexError) as e:
+                # Counted, not printed: a noisy line would otherwise flood stdout
+                self.errors += 1
+                self.last_error = f"{e} in {lines[i]!r}"
+                i += 1
+        self.frames += len(frames)
+        return frames
+
+    def parse_line(self, line, timestamp=None):
+        """Parse a single line, returning one frame or None."""
+        frames = self.parse_lines([line], timestamp)
+        return frames[0] if frames else None
+
+    def parse_binary(self, data, timestamp=None):
+        """Parse a run of fixed-size binary frames.
+
+        A frame with a bad sync or kind byte costs one byte: parsing resumes at
+        the next sync byte after it, so a corrupt byte can't take the good
+        frames behind it along.
+        """
+        if timestamp is None:
+            timestamp = time.time() - self.start_time
+        handlers = self.binary_handlers
+        usable = len(data) - len(data) % BINARY_FRAME_SIZE
+        frames = []
+        # Fast path while the frames are aligned
+        for index, (sync, kind, aux, _millis, value) in enumerate(
+                BINARY_FRAME.iter_unpack(memoryview(data)[:usable])):
+            handler = handlers.get(kind)
+            if sync != BINARY_SYNC or handler is None:
+                self._parse_binary_resync(data, index * BINARY_FRAME_SIZE, timestamp, frames)
+                break
+            name, payload = handler(aux, value)
+            frames.append((name, timestamp, payload))
+        self.frames += len(frames)
+        return frames
+
+    def _parse_binary_resync(self, data, position, timestamp, frames):
+        """Parse from a bad frame at position onwards, rescanning for the sync byte."""
+        handlers = self.binary_handlers
+        last = len(data) - BINARY_FRAME_SIZE
+        while 0 <= position <= last:
+            sync, kind, aux, _millis, value = BINARY_FRAME.unpack_from(data, position)
+            handler = handlers.get(kind)
+            if sync != BINARY_SYNC or handler is None:
+                self.errors += 1
+                position = data.find(BINARY_SYNC_BYTE, position + 1)
+                continue
+            name, payload = handler(aux, value)
+            frames.append((name, timestamp, payload))
+            position += BINARY_FRAME_SIZE
+
+    def parse_binary_frame(self, data, offset, timestamp):
+        """Parse one binary frame at offset, returning a frame or None."""
+        sync, kind, aux, _millis, value = BINARY_FRAME.unpack_from(data, offset)
+        handler = self.binary_handlers.get(kind)
+        if sync != BINARY_SYNC or handler is None:
+            self.errors += 1
+            return None
+        self.frames += 1
+        name, payload = handler(aux, value)
+        return (name, timestamp, payload)
+
+    def get_stats(self):
+        return {'frames': self.frames, 'errors': self.errors, 'last_error': self.last_error}
+
+
+def pack_binary_frame(kind, value, aux=0, millis=0):
+    """Build one binary frame the way over.ino does with BINARY_FRAMES enabled."""
+    return BINARY_FRAME.pack(BINARY_SYNC, kind, aux, millis, value)
+
+
+def benchmark(lines_per_kind=50000, repeat=3):
+    """Compare ASCII and binary parse throughput in lines (frames) per second."""
+    ascii_lines = []
+    binary = bytearray()
+    for i in range(lines_per_kind):
+        gas = 300.0 + (i % 100)
+        ldr = 1400.0 + (i % 200)
+        volt = 1.5 + (i % 10) * 0.01
+        ascii_lines.append(f"GAS:{gas:.2f},350")
+        ascii_lines.append(f"LDR:{i * 0.05:.2f},{ldr:.2f}")
+        ascii_lines.append(f"VOLT:0,{volt:.3f},3.30")
+        ascii_lines.append("LED_STATUS:0,1,0")
+        binary += pack_binary_frame(BINARY_KIND_GAS, gas, 350, i * 50)
+        binary += pack_binary_frame(BINARY_KIND_LDR, ldr, 0, i * 50)
+        binary += pack_binary_frame(BINARY_KIND_VOLT, volt, 0, i * 50)
+        binary += pack_binary_frame(BINARY_KIND_LED_STATUS, 0.0, 0b010, i * 50)
+    binary = bytes(binary)
+
+    parser = FrameParser()
+    total = len(ascii_lines)
+
+    best_ascii = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse_lines(ascii_lines)
+        best_ascii = min(best_ascii, time.perf_counter() - start)
+
+    best_binary = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse_binary(binary)
+        best_binary = min(best_binary, time.perf_counter() - start)
+
+    ascii_rate = total / best_ascii
+    binary_rate = total / best_binary
+    print(f"ASCII : {ascii_rate:12,.0f} lines/s ({total} lines, {best_ascii * 1000:.1f} ms)")
+    print(f"Binary: {binary_rate:12,.0f} frames/s ({total} frames, {best_binary * 1000:.1f} ms)")
+    print(f"Speedup: {binary_rate / ascii_rate:.1f}x")
+    return ascii_rate, binary_rate
+
+
+if __name__ == "__main__":
+    benchmark()
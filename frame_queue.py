@@ -0,0 +1,117 @@
+import threading
+from collections import deque
+
+
+class FrameQueue:
+    """Bounded single-producer/single-consumer queue between the serial thread and the GUI."""
+
+    DROP_OLDEST = 'drop_oldest'
+    COALESCE = 'coalesce'
+
+    def __init__(self, maxsize=2048, policy=DROP_OLDEST, key_func=None):
+        if policy not in (self.DROP_OLDEST, self.COALESCE):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        # Frames are (kind, ...) tuples, so coalescing is per frame kind by default
+        self.key_func = key_func or (lambda frame: frame[0])
+
+        self.items = deque()
+        # Latest overflowing frame per key, in arrival order, delivered after the
+        # queued backlog (or moved into it when a partial drain makes room)
+        self.latest = {}
+        self.lock = threading.Lock()
+        # Set while frames are queued, for consumers that block instead of polling
+        self.ready = threading.Event()
+
+        # --- Counters ---
+        self.enqueued = 0
+        self.drained = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def put(self, frame):
+        """Enqueue one frame; never blocks, applies the overflow policy when full."""
+        with self.lock:
+            self._put(frame)
+            self._update_high_water()
+        self.ready.set()
+
+    def put_many(self, frames):
+        """Enqueue a batch of frames under a single lock acquisition."""
+        if not frames:
+            return
+        with self.lock:
+            for frame in frames:
+                self._put(frame)
+            self._update_high_water()
+        self.ready.set()
+
+    def _put(self, frame):
+        # Caller holds the lock
+        self.enqueued += 1
+        items = self.items
+        latest = self.latest
+        # Frames that overflowed arrived before this one: once a drain has made room,
+        # they go back in line first so a newer frame is never applied before them
+        while latest and len(items) < self.maxsize:
+            items.append(latest.pop(next(iter(latest))))
+        if len(items) < self.maxsize and not latest:
+            items.append(frame)
+        elif self.policy == self.DROP_OLDEST:
+            items.popleft()
+            items.append(frame)
+            self.dropped += 1
+        else:
+            key = self.key_func(frame)
+            # Re-insert so the dict stays in arrival order of the frames it keeps
+            if latest.pop(key, None) is not None:
+                self.dropped += 1
+            latest[key] = frame
+
+    def _update_high_water(self):
+        depth = len(self.items) + len(self.latest)
+        if depth > self.high_water:
+            self.high_water = depth
+
+    def drain(self, max_items=None):
+        """Remove and return up to max_items frames in arrival order."""
+        with self.lock:
+            items = self.items
+            if max_items is None or max_items >= len(items):
+                batch = list(items)
+                items.clear()
+                if self.latest:
+                    batch.extend(self.latest.values())
+                    self.latest.clear()
+            else:
+                batch = [items.popleft() for _ in range(max_items)]
+            if not items and not self.latest:
+                self.ready.clear()
+            self.drained += len(batch)
+            return batch
+
+    def clear(self):
+        """Discard everything queued."""
+        with self.lock:
+            self.items.clear()
+            self.latest.clear()
+            self.ready.clear()
+
+    def wait(self, timeout=None):
+        """Block until frames are queued or the timeout passes; True if there are frames."""
+        return self.ready.wait(timeout)
+
+    def __len__(self):
+        return len(self.items) + len(self.latest)
+
+    def get_stats(self):
+        """Snapshot of depth and drop counters."""
+        return {
+            'depth': len(self),
+            'high_water': self.high_water,
+            'enqueued': self.enqueued,
+            'drained': self.drained,
+            'dropped': self.dropped,
+            'policy': self.policy,
+        }
@@ -0,0 +1,249 @@
+import mmap
+import os
+import numpy as np
+from tsstore import (RECORD_DTYPE, SAMPLE_KINDS, SEGMENT_SUFFIX, KIND_LINK, LINK_LOST,
+                     segment_start_time, index_bounds, TimeSeriesStore)
+
+# --- Rollups ---
+# Per segment and resolution, one min/max/mean/count row per (sensor kind, time bucket)
+ROLLUP_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('kind', 'u1'),
+    ('min', '<f4'),
+    ('max', '<f4'),
+    ('mean', '<f4'),
+    ('count', '<u4'),
+])
+ROLLUP_LEVELS = (1, 60, 3600)  # seconds per bucket
+
+
+def rollup_path(segment_path, resolution):
+    return segment_path[:-len(SEGMENT_SUFFIX)] + f".r{resolution}"
+
+
+def map_segment(path):
+    """Memory-map a segment file as a read-only record array (no copy)."""
+    size = os.path.getsize(path)
+    usable = size - size % RECORD_DTYPE.itemsize
+    if usable == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), usable, access=mmap.ACCESS_READ)
+    # The array keeps the mapping alive for as long as it is referenced
+    return np.frombuffer(mapped, dtype=RECORD_DTYPE)
+
+
+def compute_rollup(records, resolution):
+    """Aggregate the filtered value of sample records into fixed time buckets."""
+    samples = records[records['kind'] <= max(SAMPLE_KINDS.values())]
+    if len(samples) == 0:
+        return np.empty(0, dtype=ROLLUP_DTYPE)
+    kinds = samples['kind']
+    buckets = np.floor(samples['t'] / resolution)
+    values = samples['filtered'].astype(np.float64)
+
+    order = np.lexsort((buckets, kinds))
+    kinds = kinds[order]
+    buckets = buckets[order]
+    values = values[order]
+
+    change = np.empty(len(order), dtype=bool)
+    change[0] = True
+    change[1:] = (kinds[1:] != kinds[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(change)
+    counts = np.diff(np.append(starts, len(order)))
+
+    rollup = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+    rollup['t'] = buckets[starts] * resolution
+    rollup['kind'] = kinds[starts]
+    rollup['min'] = np.minimum.reduceat(values, starts)
+    rollup['max'] = np.maximum.reduceat(values, starts)
+    rollup['mean'] = np.add.reduceat(values, starts) / counts
+    rollup['count'] = counts
+    return rollup
+
+
+def merge_rollup(rollup, newer):
+    """Fold the rollup of later records into a rollup at the same resolution.
+
+    Records reach a segment in time order, so for each kind the newer rows
+    start at or after the last bucket of the older ones and only that bucket
+    needs combining. Returns None if they overlap further (records out of
+    order), when only a full compute_rollup is right.
+    """
+    if len(newer) == 0:
+        return rollup
+    if len(rollup) == 0:
+        return newer
+    # Both are sorted by kind, then time (as compute_rollup returns them)
+    pieces = []
+    for kind in np.union1d(rollup['kind'], newer['kind']):
+        older = rollup[np.searchsorted(rollup['kind'], kind):np.searchsorted(rollup['kind'], kind, 'right')]
+        later = newer[np.searchsorted(newer['kind'], kind):np.searchsorted(newer['kind'], kind, 'right')]
+        if len(older) and len(later):
+            last, first = older[-1], later[0]
+            if first['t'] < last['t']:
+                return None
+            if first['t'] == last['t']:
+                joined = later[:1].copy()
+                count = int(last['count']) + int(first['count'])
+                joined['min'] = min(last['min'], first['min'])
+                joined['max'] = max(last['max'], first['max'])
+                joined['mean'] = (float(last['mean']) * int(last['count'])
+                                  + float(first['mean']) * int(first['count'])) / count
+                joined['count'] = count
+                older = older[:-1]
+                later = np.concatenate((joined, later[1:]))
+        pieces += [older, later]
+    return np.concatenate(pieces)
+
+
+def build_rollups(segment_path):
+    """Write every rollup level for a finished segment next to it."""
+    records = map_segment(segment_path)
+    for resolution in ROLLUP_LEVELS:
+        compute_rollup(records, resolution).tofile(rollup_path(segment_path, resolution))
+
+
+class HistoryReader:
+    """Time-range queries over recorded segments for the history browser.
+
+    Raw samples are read through mmap views; wide ranges are served from the
+    precomputed 1 s / 1 min / 1 h rollups so a week renders in a few bucket rows.
+    """
+
+    def __init__(self, directory):
+        self.store = TimeSeriesStore(directory)
+        self.directory = directory
+        # Rollups kept in memory for the segment still being written:
+        # path -> {resolution: (records rolled up, rollup)}
+        self.live_rollups = {}
+        # Connection events per segment: path -> (size, records)
+        self.link_cache = {}
+
+    def segments_between(self, t0, t1):
+        paths = self.store.segments()
+        selected = []
+        for position, path in enumerate(paths):
+            if segment_start_time(path) >= t1:
+                break
+            if position + 1 < len(paths) and segment_start_time(paths[position + 1]) <= t0:
+                continue
+            selected.append((path, position == len(paths) - 1))
+        return selected
+
+    def time_bounds(self):
+        """(first, last) recorded timestamps, or None when nothing is recorded."""
+        paths = self.store.segments()
+        for path in paths:
+            first = map_segment(path)
+            if len(first):
+                break
+        else:
+            return None
+        for path in reversed(paths):
+            last = map_segment(path)
+            if len(last):
+                return float(first['t'][0]), float(last['t'][-1])
+        return None
+
+    def rollup_for(self, path, resolution, newest):
+        if not newest:
+            file_path = rollup_path(path, resolution)
+            if not os.path.exists(file_path):
+                build_rollups(path)
+            return np.fromfile(file_path, dtype=ROLLUP_DTYPE)
+        # The newest segment may still be growing. Only the records appended since
+        # the last call are rolled up and folded in: the history view refreshes
+        # every few seconds on the Tk thread, and the segment can hold ~1M records
+        if path not in self.live_rollups:
+            self.live_rollups = {path: {}}
+        rollups = self.live_rollups[path]
+        records = map_segment(path)
+        count, rollup = rollups.get(resolution, (0, None))
+        if rollup is None or len(records) < count:
+            rollup = compute_rollup(records, resolution)
+        elif len(records) > count:
+            rollup = merge_rollup(rollup, compute_rollup(records[count:], resolution))
+            if rollup is None:
+                rollup = compute_rollup(records, resolution)
+        rollups[resolution] = (len(records), rollup)
+        return rollup
+
+    def link_events(self, path):
+        """The connection lost/restored records of one segment, rescanned only when it grows."""
+        size = os.path.getsize(path)
+        cached = self.link_cache.get(path)
+        if cached is None or cached[0] != size:
+            records = map_segment(path)
+            cached = (size, records[records['kind'] == KIND_LINK].copy())
+            self.link_cache[path] = cached
+        return cached[1]
+
+    def outages(self, t0, t1):
+        """(start, end) of connection outages overlapping [t0, t1).
+
+        A restore event carries its gap, so an outage that began before t0 is
+        still found; one with no restore yet runs to t1.
+        """
+        spans = []
+        lost = None
+        for path, _newest in self.segments_between(t0, t1):
+            for event in self.link_events(path):
+                t = float(event['t'])
+                if event['code'] == LINK_LOST:
+                    lost = t
+                    continue
+                start = t - float(event['raw'])
+                lost = None
+                if t >= t0 and start < t1:
+                    spans.append((start, t))
+        if lost is not None and lost < t1:
+            spans.append((lost, t1))
+        return spans
+
+    def raw(self, sensor, t0, t1):
+        """(t, filtered) of raw samples in [t0, t1), sliced out of the mmap via the sparse index."""
+        kind = SAMPLE_KINDS[sensor]
+        times, values = [], []
+        for path, _newest in self.segments_between(t0, t1):
+            records = map_segment(path)
+            first, last = index_bounds(path, t0, t1, len(records))
+            window = records[first:last]
+            window = window[(window['kind'] == kind) & (window['t'] >= t0) & (window['t'] < t1)]
+            times.append(window['t'])
+            values.append(window['filtered'])
+        if not times:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(times), np.concatenate(values).astype(np.float64)
+
+    def query(self, sensor, t0, t1, max_points=1000):
+        """Best-resolution view of [t0, t1): returns (t, min, max, mean, resolution).
+
+        resolution is 0 for raw samples, where min == max == mean.
+        """
+        span = max(t1 - t0, 1e-9)
+        # ~20 samples/s per sensor; use raw data if it fits in the point budget
+        if span * 20 <= max_points:
+            times, values = self.raw(sensor, t0, t1)
+            return times, values, values, values, 0
+
+        resolution = ROLLUP_LEVELS[-1]
+        for level in ROLLUP_LEVELS:
+            if span / level <= max_points:
+                resolution = level
+                break
+
+        kind = SAMPLE_KINDS[sensor]
+        chunks = []
+        for path, newest in self.segments_between(t0, t1):
+            rollup = self.rollup_for(path, resolution, newest)
+            rollup = rollup[(rollup['kind'] == kind) & (rollup['t'] >= t0 - resolution) & (rollup['t'] < t1)]
+            if len(rollup):
+                chunks.append(rollup)
+        if not chunks:
+            empty = np.empty(0)
+            return empty, empty, empty, empty, resolution
+        rows = np.concatenate(chunks)
+        return (rows['t'], rows['min'].astype(np.float64), rows['max'].astype(np.float64),
+                rows['mean'].astype(np.float64), resolution)
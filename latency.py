@@ -0,0 +1,240 @@
+"""Stage-by-stage latency tracing from serial read to screen paint.
+
+Each batch of lines from one read is traced as a unit (its frames share the
+parser's timestamp anyway), so the cost is a few perf_counter() calls per
+read rather than per frame. A batch is stamped when the read arrives, when
+its lines are split, parsed and enqueued on the ingest thread, and when the
+owner thread drains it, has applied it (filters, store, alerts) and the
+dashboard has painted it. The time between consecutive stamps goes into one
+histogram per stage:
+
+    read     bytes arrived -> complete lines split out (capture tap, decode)
+    parse    lines -> frames
+    enqueue  frames -> in the FrameQueue (lock hand-off)
+    drain    waiting in the queue until the owner thread picks it up
+    filter   filter chains, history, store and alert rules
+    paint    applied -> the dashboard's repaint has run (Tk idle)
+    total    read -> paint
+
+Histograms are log-linear in microseconds like HdrHistogram: exact below 128
+µs and within 1/64 (about 1.6 %) above, up to a little over 2 minutes, in a
+fixed array, so recording is an index computation and one increment.
+"""
+import json
+import time
+from collections import deque
+
+STAGES = ('read', 'parse', 'enqueue', 'drain', 'filter', 'paint', 'total')
+
+
+class LatencyHistogram:
+    """Counts of latencies in log-linear microsecond buckets."""
+
+    def __init__(self, sub_bits=6, max_shift=21):
+        self.sub_buckets = 1 << sub_bits
+        self.sub_bits = sub_bits
+        self.max_shift = max_shift
+        self.counts = [0] * ((max_shift + 2) * self.sub_buckets)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def bucket(self, us):
+        """Index of the bucket holding us (an int >= 0)."""
+        size = self.sub_buckets
+        if us < size:
+            return us
+        shift = us.bit_length() - self.sub_bits - 1
+        if shift > self.max_shift:
+            return len(self.counts) - 1
+        return shift * size + (us >> shift)
+
+    def bucket_range(self, index):
+        """[low, high) microseconds covered by a bucket."""
+        shift = max(0, index // self.sub_buckets - 1)
+        low = (index - shift * self.sub_buckets) << shift
+        return low, low + (1 << shift)
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        if us < 0:
+            us = 0
+        self.counts[self.bucket(us)] += 1
+        self.total += 1
+        self.sum_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentiles(self, *fractions):
+        """Latencies in ms at each fraction (0.5 = p50), in one pass; None when empty."""
+        if not self.total:
+            return [None] * len(fractions)
+        targets = sorted((max(1, int(fraction * self.total + 0.5)), n) for n, fraction in enumerate(fractions))
+        results = [None] * len(fractions)
+        seen = 0
+        pending = iter(targets)
+        target, slot = next(pending)
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while seen >= target:
+                low, high = self.bucket_range(index)
+                # Bucket midpoint, but never above the largest value recorded
+                results[slot] = min((low + high - 1) / 2, self.max_us) / 1000
+                try:
+                    target, slot = next(pending)
+                except StopIteration:
+                    return results
+        return results
+
+    def summary(self):
+        p50, p90, p99, p999 = self.percentiles(0.5, 0.9, 0.99, 0.999)
+        return {
+            'count': self.total,
+            'mean_ms': self.sum_us / self.total / 1000 if self.total else None,
+            'p50_ms': p50,
+            'p90_ms': p90,
+            'p99_ms': p99,
+            'p999_ms': p999,
+            'max_ms': self.max_us / 1000 if self.total else None,
+        }
+
+    def buckets(self):
+        """Non-empty buckets as [low_us, high_us, count]."""
+        return [[*self.bucket_range(index), count] for index, count in enumerate(self.counts) if count]
+
+    def cumulative(self, bounds_us):
+        """Counts at or below each bound (ascending µs) plus the overall count, from one
+        snapshot of the buckets, so the last value always equals the sum of the others'
+        increments even while another thread records. A bucket straddling a bound counts
+        below it when its midpoint does."""
+        counts = list(self.counts)
+        results = []
+        seen = 0
+        bounds = iter(bounds_us)
+        bound = next(bounds, None)
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            low, high = self.bucket_range(index)
+            while bound is not None and (low + high - 1) / 2 > bound:
+                results.append(seen)
+                bound = next(bounds, None)
+            seen += count
+        while bound is not None:
+            results.append(seen)
+            bound = next(bounds, None)
+        results.append(seen)
+        return results
+
+
+class LatencyTracer:
+    """Per-stage latency histograms for one MonitorCore.
+
+    enqueued() runs on the ingest thread; applied(), painted() and
+    skip_paint() on the owner thread. Batches waiting for the next stage are
+    kept in bounded deques, so a consumer that stops painting can't grow them.
+    """
+
+    def __init__(self, enabled=True, max_pending=1024):
+        self.enabled = enabled
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        # (queue position after the batch, read time, enqueue time), ingest -> owner thread
+        self.in_queue = deque(maxlen=max_pending)
+        # (read time, applied time) of batches not painted yet
+        self.unpainted = deque(maxlen=max_pending)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    # --- Ingest thread ---
+
+    def enqueued(self, received, split, parsed, enqueued, position):
+        """One read's frames are queued; position is the queue's enqueue count after them."""
+        histograms = self.histograms
+        histograms['read'].record(split - received)
+        histograms['parse'].record(parsed - split)
+        histograms['enqueue'].record(enqueued - parsed)
+        self.in_queue.append((position, received, enqueued))
+
+    # --- Owner thread ---
+
+    def applied(self, position, drained, applied):
+        """Frames up to queue position were drained at `drained` and applied at `applied`."""
+        in_queue = self.in_queue
+        drain = self.histograms['drain']
+        count = 0
+        while in_queue and in_queue[0][0] <= position:
+            _, received, enqueued = in_queue.popleft()
+            drain.record(drained - enqueued)
+            self.unpainted.append((received, applied))
+            count += 1
+        if count:
+            # Batches drained together were filtered together
+            filter_histogram = self.histograms['filter']
+            elapsed = applied - drained
+            for _ in range(count):
+                filter_histogram.record(elapsed)
+
+    def painted(self, now=None):
+        """The dashboard has repainted with everything applied so far."""
+        if now is None:
+            now = time.perf_counter()
+        paint = self.histograms['paint']
+        total = self.histograms['total']
+        unpainted = self.unpainted
+        while unpainted:
+            received, applied = unpainted.popleft()
+            paint.record(now - applied)
+            total.record(now - received)
+
+    def skip_paint(self):
+        """Nothing showing this device was repainted; don't charge the wait to paint."""
+        self.unpainted.clear()
+
+    # --- Reporting ---
+
+    def summary(self):
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def format_table(self):
+        """Fixed-width p50/p99/max table of the stages that have samples."""
+        rows = [f"{'stage':8s} {'count':>8s} {'p50 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}"]
+        for stage, histogram in self.histograms.items():
+            if not histogram.total:
+                continue
+            p50, p99 = histogram.percentiles(0.5, 0.99)
+            rows.append(f"{stage:8s} {histogram.total:8d} {p50:9.3f} {p99:9.3f} {histogram.max_us / 1000:9.3f}")
+        return "\n".join(rows)
+
+
+def export_latency(tracers, path):
+    """Write each device's stage summaries and raw buckets to a JSON file."""
+    report = {
+        'exported': time.time(),
+        'unit': 'us',
+        'devices': {
+            device_id: {
+                stage: dict(histogram.summary(), buckets=histogram.buckets())
+                for stage, histogram in tracer.histograms.items()
+            }
+            for device_id, tracer in tracers.items()
+        },
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    return path
@@ -0,0 +1,210 @@
+"""Prometheus / OpenMetrics exposition of the monitoring pipeline.
+
+The API server (api_server.py) serves this at GET /metrics. Nothing here runs
+on the ingest or owner thread: every value is read at scrape time from
+counters the pipeline keeps anyway (FrameParser.frames/errors, the
+FrameQueue and store drop counts, the core's reconnect and alert counts) and
+from the latency tracer's histograms, so the hot path pays no locks and no
+extra work for being scraped. Counters are plain ints bumped by one thread
+and read by another; a scrape may see one a few frames stale, never torn.
+
+    gashealth_sensor_value{device,sensor}            filtered value (temperature in degrees)
+    gashealth_sensor_raw_value{device,sensor}        last raw reading
+    gashealth_alert_active{device,rule}              1 while a rule is over its threshold
+                                                     (gas > 350, temperature > 200, ...)
+    gashealth_ldr_led_on{device}                     the LDR LED the firmware lights above 1500
+    gashealth_connected{device}, gashealth_queue_depth{device}
+    gashealth_frames_parsed_total, gashealth_frames_applied_total,
+    gashealth_parse_errors_total, gashealth_frames_dropped_total{stage=queue|store},
+    gashealth_serial_disconnects_total, gashealth_serial_reconnects_total,
+    gashealth_alerts_raised_total                    per device
+    gashealth_pipeline_stage_seconds{device,stage}   latency.py stages, filter included
+    gashealth_render_seconds                         dashboard paint pass, when a GUI runs
+    gashealth_api_subscribers                        WebSocket clients
+
+Prometheus' text format 0.0.4 is the default; a scraper that sends
+``Accept: application/openmetrics-text`` gets OpenMetrics 1.0 instead.
+``python metrics.py --replay FILE`` prints the exposition after replaying a
+capture, and ``--bench N`` times N scrapes of it.
+"""
+import argparse
+import math
+import sys
+import time
+from alerts import DERIVED_SENSORS
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+NAMESPACE = 'gashealth'
+SENSORS = ('gas', 'ldr', 'voltage')
+# Histogram bucket bounds in seconds, 100 µs to 10 s
+LATENCY_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                  0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def wants_openmetrics(accept):
+    return 'application/openmetrics-text' in (accept or '')
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Exposition:
+    """Builds one scrape's text, family by family."""
+
+    def __init__(self, openmetrics=False):
+        self.openmetrics = openmetrics
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name, labels, value):
+        self.lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    def gauge(self, name, help_text, samples):
+        """samples: (labels, value) pairs; None values are left out."""
+        name = f"{NAMESPACE}_{name}"
+        self.family(name, 'gauge', help_text)
+        for labels, value in samples:
+            if value is not None:
+                self.sample(name, labels, value)
+
+    def counter(self, name, help_text, samples):
+        # OpenMetrics names the family without the _total its samples carry
+        name = f"{NAMESPACE}_{name}"
+        self.family(name if self.openmetrics else f"{name}_total", 'counter', help_text)
+        for labels, value in samples:
+            self.sample(f"{name}_total", labels, value)
+
+    def histogram(self, name, help_text, series, bounds=LATENCY_BOUNDS):
+        """series: (labels, LatencyHistogram) pairs, bucketed at bounds (seconds)."""
+        name = f"{NAMESPACE}_{name}"
+        self.family(name, 'histogram', help_text)
+        bounds_us = [bound * 1e6 for bound in bounds]
+        for labels, histogram in series:
+            counts = histogram.cumulative(bounds_us)
+            for bound, count in zip(bounds, counts):
+                self.sample(f"{name}_bucket", dict(labels, le=format_value(bound)), count)
+            self.sample(f"{name}_bucket", dict(labels, le='+Inf'), counts[-1])
+            self.sample(f"{name}_count", labels, counts[-1])
+            self.sample(f"{name}_sum", labels, histogram.sum_us / 1e6)
+
+    def render(self):
+        if self.openmetrics:
+            self.lines.append('# EOF')
+        return ('\n'.join(self.lines) + '\n').encode('utf-8')
+
+
+def sensor_values(core, field):
+    """(sensor, value) of each input sensor and the derived ones, from one field of sensor_data."""
+    data = core.sensor_data
+    values = [(sensor, data[sensor][field]) for sensor in SENSORS]
+    for sensor, (source, derive) in DERIVED_SENSORS.items():
+        values.append((sensor, derive(data[source][field])))
+    return values
+
+
+def collect(exposition, devices, render_histogram=None, subscribers=None):
+    """Add every family for devices (id -> MonitorCore) to the exposition."""
+    cores = [(device_id or 'device', core) for device_id, core in list(devices.items())]
+
+    def per_device(value):
+        return [({'device': device_id}, value(core)) for device_id, core in cores]
+
+    exposition.gauge('sensor_value', "Filtered sensor value (temperature in degrees C).", [
+        ({'device': device_id, 'sensor': sensor}, value)
+        for device_id, core in cores for sensor, value in sensor_values(core, 'value')])
+    exposition.gauge('sensor_raw_value', "Last raw sensor reading.", [
+        ({'device': device_id, 'sensor': sensor}, value)
+        for device_id, core in cores for sensor, value in sensor_values(core, 'raw_value')])
+    exposition.gauge('alert_active', "1 while the alert rule is active (over its threshold).", [
+        ({'device': device_id, 'rule': rule}, active)
+        for device_id, core in cores for rule, active in list(core.alerts.items())])
+    exposition.gauge('ldr_led_on', "1 while the LDR LED is lit (LDR above 1500).",
+                     per_device(lambda core: core.sensor_data['ldr']['led_state']))
+    exposition.gauge('connected', "1 while the serial port is open.",
+                     per_device(lambda core: core.connected))
+    exposition.gauge('queue_depth', "Frames waiting between the ingest and owner threads.",
+                     per_device(lambda core: len(core.frame_queue)))
+
+    exposition.counter('frames_parsed', "Frames parsed from the serial stream.",
+                       per_device(lambda core: core.frame_parser.frames))
+    exposition.counter('frames_applied', "Frames applied to sensor state.",
+                       per_device(lambda core: core.frames_applied))
+    exposition.counter('parse_errors', "Serial lines or binary frames that failed to parse.",
+                       per_device(lambda core: core.frame_parser.errors))
+    dropped = [({'device': device_id, 'stage': 'queue'}, core.frame_queue.dropped) for device_id, core in cores]
+    dropped += [({'device': device_id, 'stage': 'store'}, core.store.dropped)
+                for device_id, core in cores if core.store]
+    exposition.counter('frames_dropped', "Frames dropped by a full frame queue or recording queue.", dropped)
+    exposition.counter('serial_disconnects', "Times the serial link was lost.",
+                       per_device(lambda core: core.link_losses))
+    exposition.counter('serial_reconnects', "Times the serial link was restored after a loss.",
+                       per_device(lambda core: core.reconnects))
+    exposition.counter('alerts_raised', "Alert rule activations.",
+                       per_device(lambda core: core.alert_count))
+
+    exposition.histogram('pipeline_stage_seconds', "Per-stage latency from serial read to paint.", [
+        ({'device': device_id, 'stage': stage}, histogram)
+        for device_id, core in cores for stage, histogram in core.tracer.histograms.items()])
+    if render_histogram is not None:
+        exposition.histogram('render_seconds', "Duration of one dashboard paint pass.",
+                             [({}, render_histogram)])
+    if subscribers is not None:
+        exposition.gauge('api_subscribers', "Connected WebSocket clients.", [({}, subscribers)])
+
+
+def render_metrics(devices, accept=None, render_histogram=None, subscribers=None):
+    """(content type, body) of one scrape, in the format the Accept header asks for."""
+    openmetrics = wants_openmetrics(accept)
+    exposition = Exposition(openmetrics)
+    collect(exposition, devices, render_histogram, subscribers)
+    return (OPENMETRICS_CONTENT_TYPE if openmetrics else CONTENT_TYPE), exposition.render()
+
+
+def main(argv=None):
+    from monitor_core import MonitorCore, replay_capture
+
+    parser = argparse.ArgumentParser(description="Print the metrics exposition after replaying a capture.")
+    parser.add_argument('--replay', metavar='FILE', required=True, help="capture to replay first")
+    parser.add_argument('--openmetrics', action='store_true', help="OpenMetrics instead of Prometheus text")
+    parser.add_argument('--bench', type=int, metavar='N', help="time N scrapes instead of printing one")
+    args = parser.parse_args(argv)
+
+    core = MonitorCore(record=False)
+    replay_capture(core, args.replay)
+    accept = 'application/openmetrics-text' if args.openmetrics else None
+    devices = {'device': core}
+    if not args.bench:
+        sys.stdout.write(render_metrics(devices, accept)[1].decode('utf-8'))
+        return 0
+    start = time.perf_counter()
+    for _ in range(args.bench):
+        _, body = render_metrics(devices, accept)
+    elapsed = time.perf_counter() - start
+    print(f"{args.bench} scrapes in {elapsed:.3f} s ({elapsed / args.bench * 1000:.3f} ms each, "
+          f"{len(body)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,660 @@
+"""GUI-free monitoring pipeline: ingest -> parse -> filter -> store -> alert.
+
+SensorMonitorApp attaches to a MonitorCore as one consumer; the same core runs
+headless from the command line (``python monitor_core.py --help``) without
+importing tkinter, either live from a serial port (optionally recording a raw
+capture) or replaying a capture at real time, N x speed or as fast as possible.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from serial_ingest import SerialIngestEngine, WRITE_TIMEOUT
+from capture import CaptureWriter, CaptureReplayer, capture_start_epoch
+from reconnect import ConnectionSupervisor
+from alerts import AlertEngine, ALERTS_PATH, DEFAULT_RULES, load_rules
+from frame_queue import FrameQueue
+from frame_parser import FrameParser, BINARY_KINDS, LED_IDS, REPLY_KINDS
+from ring_buffer import SensorRingBuffer
+from filters import DEFAULT_CHAINS, FILTERS_PATH, FilterChain, load_filter_chains
+from tsstore import TimeSeriesStore
+from history import build_rollups
+from latency import LatencyTracer, export_latency
+
+SENSORS = ('gas', 'ldr', 'voltage')
+DEFAULT_RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+
+class MonitorCore:
+    """Sensor state, filtering, recording and alerting for one device.
+
+    The serial thread only parses and enqueues (process_serial_lines); the thread
+    that owns the core applies frames with drain(). Replays call process_lines()
+    to parse and apply in one step with no queue in between.
+    """
+
+    def __init__(self, recordings_dir=DEFAULT_RECORDINGS_DIR, record=True,
+                 history_capacity=20 * 60 * 60):
+        # --- Serial communication ---
+        self.serial_port_obj = None
+        self.ingest_engine = None
+        self.running = False
+        # Outgoing commands and their acknowledgements
+        self.transport = None
+        # Shared SerialPoller (devices.py) to read from; None = own reader thread
+        self.poller = None
+        self.device_id = None
+        # Reconnects after a dead port (reconnect.py); None when not connected
+        self.auto_reconnect = True
+        self.supervisor = None
+        # Over the core's lifetime; the supervisor's own counts restart with each connect()
+        self.link_losses = 0
+        self.reconnects = 0
+        # Last confirmed board state, restored after a reconnect
+        self.mode = None
+        self.manual_leds = {led_id: False for led_id in LED_IDS}
+
+        # --- Raw capture recording and replay ---
+        self.capture = None
+        self.replayer = None
+
+        # --- Serial thread -> owner thread hand-off ---
+        self.frame_queue = FrameQueue(maxsize=2048, policy=FrameQueue.DROP_OLDEST)
+        self.max_frames_per_tick = 1000
+        self.batch_filter_threshold = 64  # frames above this use the vectorized filter
+        self.last_line = None
+
+        # --- On-disk recording of samples and LED/mode events ---
+        self.recordings_dir = recordings_dir
+        self.store = None
+        if record:
+            self.store = TimeSeriesStore(recordings_dir, on_segment_closed=build_rollups)
+            self.store.start()
+        self.last_led_status = None
+
+        # --- Sensor data storage with timestamps and filtering ---
+        # History is kept in array-backed ring buffers (timestamp/raw/filtered columns)
+        self.history_capacity = history_capacity  # one hour at the firmware's ~20 Hz
+        self.sensor_data = {}
+        for sensor in SENSORS:
+            self.sensor_data[sensor] = {
+                'value': 0,
+                'raw_value': 0,
+                'series': SensorRingBuffer(history_capacity),
+            }
+        self.sensor_data['ldr']['led_state'] = False
+
+        # Each sensor's samples go through its own chain of filter stages (filters.py)
+        self.filter_chains = {}
+        self.set_filter_chains(DEFAULT_CHAINS)
+
+        # Skip counters for initial noise
+        self.skip_counter = {sensor: 0 for sensor in SENSORS}
+        self.max_skip = 10
+
+        # --- Alerts ---
+        # Rules run on every filtered sample (alerts.py); alerts maps rule name -> active
+        self.alert_engine = None
+        self.alerts = {}
+        self.alert_count = 0
+        self.alert_latency_ms = deque(maxlen=1000)  # serial read -> alert raised, live only
+        self.set_alert_rules(DEFAULT_RULES)
+
+        # --- Consumers ---
+        # event name -> callbacks; called on the owner thread
+        # 'alert': (name, active, value), 'log': (message,),
+        # 'command': (command, ok, reply, latency_ms),
+        # 'link': ('lost', reason) or ('restored', outage dict) -- see reconnect.py
+        # 'applied': (frame count,) after a drain applied frames
+        self.listeners = {'alert': [], 'log': [], 'command': [], 'link': [], 'applied': []}
+
+        # --- Latency tracing: read -> parse -> enqueue -> drain -> filter -> paint ---
+        self.tracer = LatencyTracer()
+
+        self.frames_applied = 0
+        self.start_time = time.time()
+        self.frame_parser = FrameParser(self.start_time)
+
+    # --- Consumers ---
+
+    def subscribe(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        if callback in self.listeners[event]:
+            self.listeners[event].remove(callback)
+
+    def emit(self, event, *args):
+        # A copy, so a listener can unsubscribe itself
+        for callback in tuple(self.listeners[event]):
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Listener error ({event}): {e}")
+
+    def log_message(self, message):
+        """Add message to log"""
+        print(f"LOG: {message}")
+        self.emit('log', message)
+
+    # --- Filter chains ---
+
+    def set_filter_chains(self, specs):
+        """Replace the filter chains of the sensors in specs (raises ValueError for a bad stage)."""
+        chains = {sensor: FilterChain.from_specs(stages)
+                  for sensor, stages in specs.items() if sensor in self.sensor_data}
+        self.filter_chains.update(chains)
+
+    def load_filter_chains(self, path=None):
+        """Use this device's chains from filters.json, keeping the current ones if it is invalid."""
+        try:
+            self.set_filter_chains(load_filter_chains(self.device_id, path or FILTERS_PATH))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.log_message(f"Filter chains not loaded: {e}")
+
+    # --- Alert rules ---
+
+    def set_alert_rules(self, specs):
+        """Replace the alert rules (raises ValueError for an invalid rule set)."""
+        engine = AlertEngine(specs, on_change=self.alert_changed)
+        for name, active in self.alerts.items():
+            if active and name not in engine.rules:
+                self.emit('alert', name, False, 0.0)
+        self.alert_engine = engine
+        self.alerts = {name: False for name in engine.rules}
+
+    def load_alert_rules(self, path=None):
+        """Use this device's rules from alerts.json, keeping the current ones if it is invalid."""
+        try:
+            self.set_alert_rules(load_rules(self.device_id, path or ALERTS_PATH))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.log_message(f"Alert rules not loaded: {e}")
+
+    def alert_changed(self, rule, t):
+        """AlertEngine callback: a rule raised or cleared at relative time t."""
+        self.alerts[rule.name] = rule.active
+        if rule.active:
+            self.alert_count += 1
+            if self.connected:
+                # Frame time is taken when the ingest thread parsed the read
+                self.alert_latency_ms.append((time.time() - self.start_time - t) * 1000)
+        self.emit('alert', rule.name, rule.active, rule.value)
+
+    # --- Serial connection ---
+
+    def connect(self, port, baudrate, fingerprint=None):
+        """Open the port and start the ingest thread; raises serial.SerialException on failure.
+
+        fingerprint identifies the port's hardware for reconnecting (reconnect.py);
+        without it, the reconnect supervisor looks it up in the background.
+        """
+        import serial
+
+        # The ingest thread blocks in read(); the timeout only bounds how long stop() waits
+        port_obj = serial.Serial(port, int(baudrate), timeout=0.1, write_timeout=WRITE_TIMEOUT)
+
+        # Re-run calibration and initial-noise skipping for the new connection
+        self.reset_filters()
+
+        # Drop frames left over from a previous connection
+        self.frame_queue.clear()
+        self.mode = None
+        self.attach(port_obj)
+        if self.auto_reconnect:
+            self.supervisor = ConnectionSupervisor(self, port, baudrate, fingerprint)
+
+    def attach(self, port_obj):
+        """Start reading and commanding an open port."""
+        # Imported on first connect: the transport brings in asyncio, which the
+        # dashboard doesn't need to come up
+        from command_transport import CommandTransport
+
+        self.serial_port_obj = port_obj
+        self.running = True
+        self.last_line = None
+        self.transport = CommandTransport(port_obj)
+        self.ingest_engine = SerialIngestEngine(port_obj, self.process_serial_lines,
+                                                on_binary=self.process_binary_frames,
+                                                binary_kinds=BINARY_KINDS,
+                                                tap=self.capture.write if self.capture else None,
+                                                on_error=self.port_failed)
+        if not (self.poller and self.poller.add(self.ingest_engine)):
+            self.ingest_engine.start()
+
+    def detach(self):
+        """Stop reading and commanding the current port and close it."""
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+        if self.ingest_engine:
+            if self.poller:
+                self.poller.remove(self.ingest_engine)
+            self.ingest_engine.stop()
+        self.ingest_engine = None
+
+        if self.serial_port_obj and self.serial_port_obj.is_open:
+            self.serial_port_obj.close()
+        self.serial_port_obj = None
+
+    def port_failed(self, engine, error):
+        """Ingest thread or poller: reading the port raised (cable pulled, board reset)."""
+        if engine is self.ingest_engine and self.supervisor:
+            self.supervisor.port_lost(error)
+
+    def connection_lost(self, reason, last_data):
+        """Owner thread: the supervisor gave up on the port and is reconnecting."""
+        self.detach()
+        self.link_losses += 1
+        self.log_message(f"Connection lost ({reason}); reconnecting")
+        if self.store:
+            self.store.append_link(last_data, restored=False)
+        self.emit('link', 'lost', reason)
+
+    def connection_restored(self, port_obj, outage):
+        """Owner thread: the supervisor reopened the device; resume and restore its state."""
+        self.attach(port_obj)
+        self.reconnects += 1
+        if self.mode is not None:
+            # A re-plugged board restarts in auto mode with its LEDs off
+            self.send_command(f"MODE_{self.mode}")
+            if self.mode == 'MANUAL':
+                self.send_commands([f"{led_id}_{'ON' if on else 'OFF'}"
+                                    for led_id, on in self.manual_leds.items()])
+        self.log_message(f"Reconnected on {port_obj.port} after {outage['recovery']:.1f} s "
+                         f"(gap {outage['gap']:.1f} s, {outage['attempts']} attempts)")
+        if self.store:
+            self.store.append_link(outage['end'], restored=True, gap=outage['gap'],
+                                   recovery=outage['recovery'])
+        self.emit('link', 'restored', outage)
+
+    def start_replay(self, path, speed=1.0):
+        """Play a capture into the live queue as if it came from a port (speed None = max)."""
+        self.running = True
+        self.reset_filters()
+        self.frame_queue.clear()
+        self.last_line = None
+        self.replayer = CaptureReplayer(path, self.process_serial_lines,
+                                        on_binary=self.process_binary_frames, speed=speed)
+        self.ingest_engine = self.replayer.engine
+        self.replayer.start()
+
+    def disconnect(self):
+        """Stop the ingest thread (or replay), any reconnecting, and close the port."""
+        self.running = False
+        if self.supervisor:
+            self.supervisor.stop()
+            self.supervisor = None
+        if self.replayer:
+            self.replayer.stop()
+            self.replayer = None
+            self.ingest_engine = None
+        self.detach()
+
+    @property
+    def connected(self):
+        return self.running and self.serial_port_obj is not None and self.serial_port_obj.is_open
+
+    @property
+    def reconnecting(self):
+        return self.supervisor is not None and self.supervisor.state != 'connected'
+
+    def send_command(self, command):
+        """Queue one command; its result arrives as a 'command' event from drain()."""
+        self.transport.send(command)
+
+    def send_commands(self, commands):
+        """Queue a burst of commands that may be coalesced (e.g. three LED OFFs -> ALL_OFF)."""
+        self.transport.send_many(commands)
+
+    def start_capture(self, path):
+        """Record every raw read from the port (from now on) to a capture file."""
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+        if self.ingest_engine and not self.replayer:
+            self.ingest_engine.tap = self.capture.write
+
+    def stop_capture(self):
+        if self.capture:
+            if self.ingest_engine:
+                self.ingest_engine.tap = None
+            self.capture.close()
+            self.capture = None
+
+    def close(self):
+        self.disconnect()
+        self.stop_capture()
+        if self.store:
+            self.store.close()
+
+    def reset_filters(self):
+        """Reset filter states and enable calibration."""
+        for chain in self.filter_chains.values():
+            chain.reset()
+        self.skip_counter = {sensor: 0 for sensor in SENSORS}
+
+    # --- Serial thread ---
+
+    def process_serial_lines(self, lines, timestamp=None):
+        """Callback from the ingest engine: parse a batch and hand the frames to the queue."""
+        split = time.perf_counter()
+        self.last_line = lines[-1]
+        frames = self.frame_parser.parse_lines(lines, timestamp)
+        parsed = time.perf_counter()
+        transport = self.transport
+        if transport is not None and transport.pending:
+            # Match replies here rather than after the queue so round trips aren't
+            # inflated by the owner thread's drain interval
+            for frame in frames:
+                if frame[0] in REPLY_KINDS:
+                    transport.on_reply(frame)
+        self.enqueue_frames(frames, split, parsed)
+
+    def process_binary_frames(self, data, timestamp=None):
+        """Callback from the ingest engine with a run of binary frames (BINARY_FRAMES firmware)."""
+        split = time.perf_counter()
+        frames = self.frame_parser.parse_binary(data, timestamp)
+        self.enqueue_frames(frames, split, time.perf_counter())
+
+    def enqueue_frames(self, frames, split, parsed):
+        queue = self.frame_queue
+        queue.put_many(frames)
+        if frames and self.tracer.enabled:
+            engine = self.ingest_engine
+            received = engine.received_at if engine else split
+            self.tracer.enqueued(received, split, parsed, time.perf_counter(), queue.enqueued)
+
+    # --- Owner thread ---
+
+    def drain(self, max_frames=None):
+        """Apply queued frames to sensor state and return how many."""
+        if self.supervisor:
+            self.supervisor.check()
+        queue = self.frame_queue
+        frames = queue.drain(max_frames or self.max_frames_per_tick)
+        drained = time.perf_counter()
+        self.apply_frames(frames)
+        if self.tracer.in_queue:
+            # Everything up to this queue position has now been drained or dropped
+            self.tracer.applied(queue.drained + queue.dropped, drained, time.perf_counter())
+        if frames:
+            self.emit('applied', len(frames))
+        if self.transport and self.transport.completed:
+            completed = self.transport.completed
+            while completed:
+                self.emit('command', *completed.popleft())
+        return len(frames)
+
+    def process_lines(self, lines, timestamp=None):
+        """Parse and apply a batch of lines directly (replay and batch analysis)."""
+        self.last_line = lines[-1] if lines else self.last_line
+        self.apply_frames(self.frame_parser.parse_lines(lines, timestamp))
+
+    def process_binary(self, data, timestamp=None):
+        self.apply_frames(self.frame_parser.parse_binary(data, timestamp))
+
+    def apply_frames(self, frames):
+        if not frames:
+            return
+        if len(frames) >= self.batch_filter_threshold:
+            self.apply_frame_batch(frames)
+        else:
+            for frame in frames:
+                self.apply_sensor_frame(frame)
+        self.frames_applied += len(frames)
+
+    def apply_frame_batch(self, frames):
+        """Apply a backlog of frames, filtering each sensor's samples in one batch call."""
+        pending = {sensor: ([], []) for sensor in self.sensor_data}
+        # Sensor of each filtered sample, or None and the frame for any other frame, in
+        # arrival order: the store and the alert rules see the batch as it arrived
+        order = []
+        for frame in frames:
+            kind = frame[0]
+            if kind not in pending:
+                order.append((None, frame))
+                continue
+            # Skip first few values for this sensor
+            if self.skip_counter[kind] < self.max_skip:
+                self.skip_counter[kind] += 1
+                continue
+            pending[kind][0].append(frame[1])
+            pending[kind][1].append(frame[2])
+            order.append((kind, None))
+
+        samples = {}
+
+        for sensor, (times, raws) in pending.items():
+            if not raws:
+                continue
+            filtered = self.filter_chains[sensor].update_many(times, raws)
+            data = self.sensor_data[sensor]
+            data['series'].extend(times, raws, filtered)
+            samples[sensor] = iter(zip(times, raws, filtered.tolist()))
+            data['raw_value'] = raws[-1]
+            data['value'] = float(filtered[-1])
+            if sensor == 'ldr':
+                self.update_ldr_led_state(data['value'])
+
+        # Records must reach the store in time order (its index is searched by time),
+        # and combined alert rules are only exact in arrival order
+        store = self.store
+        update = self.alert_engine.update
+        start_time = self.start_time
+        for sensor, frame in order:
+            if sensor is None:
+                self.apply_sensor_frame(frame)
+                continue
+            current_time, raw, value = next(samples[sensor])
+            if store:
+                store.append_sample(sensor, start_time + current_time, raw, value)
+            update(sensor, current_time, value)
+
+    def apply_sensor_frame(self, frame):
+        """Filter a parsed frame and append it to the sensor history."""
+        kind, current_time, payload = frame
+
+        if kind in self.sensor_data:
+            # Skip first few values for this sensor
+            if self.skip_counter[kind] < self.max_skip:
+                self.skip_counter[kind] += 1
+                return  # Skip this data point
+
+            filtered_value = self.filter_chains[kind].update(current_time, payload)
+
+            # Update sensor data
+            data = self.sensor_data[kind]
+            data['raw_value'] = payload
+            data['value'] = filtered_value
+            data['series'].append(current_time, payload, filtered_value)
+            if self.store:
+                self.store.append_sample(kind, self.start_time + current_time, payload, filtered_value)
+            self.alert_engine.update(kind, current_time, filtered_value)
+
+            if kind == 'ldr':
+                # Update LDR LED state
+                self.update_ldr_led_state(filtered_value)
+
+        elif kind == 'led_status':
+            # Firmware repeats this every loop; only record changes
+            if payload != self.last_led_status:
+                self.last_led_status = payload
+                self.record_frame(frame)
+
+        elif kind == 'mode':
+            self.mode = payload
+            self.log_message(f"Mode changed to: {payload}")
+            self.record_frame(frame)
+
+        elif kind == 'led_ack':
+            led, state = payload
+            for led_id in (LED_IDS if led == 'ALL_LEDS' else (led,)):
+                if led_id in self.manual_leds:
+                    self.manual_leds[led_id] = state == 'ON'
+            self.log_message(f"{led} turned {state}")
+            self.record_frame(frame)
+
+        elif kind == 'error':
+            self.log_message(f"Device error: {payload}")
+
+    def record_frame(self, frame):
+        if self.store:
+            self.store.append_frame(frame, self.start_time + frame[1])
+
+    # Update LDR LED state based on Arduino logic (LDR value > 1500)
+    def update_ldr_led_state(self, ldr_value):
+        self.sensor_data['ldr']['led_state'] = (ldr_value > 1500)
+
+    # --- Alerts ---
+
+    def alert_stats(self):
+        latencies = sorted(self.alert_latency_ms)
+        last = len(latencies) - 1
+        return {
+            'rules': len(self.alert_engine.rules),
+            'samples': self.alert_engine.samples,
+            'active': [name for name, active in self.alerts.items() if active],
+            'latency_p50_ms': latencies[last // 2] if latencies else None,
+            'latency_p99_ms': latencies[min(last, int(last * 0.99 + 0.5))] if latencies else None,
+        }
+
+    def get_stats(self):
+        stats = {
+            'frames_parsed': self.frame_parser.frames,
+            'frames_applied': self.frames_applied,
+            'parse_errors': self.frame_parser.errors,
+            'parser': self.frame_parser.get_stats(),
+            'alerts_raised': self.alert_count,
+            'link_losses': self.link_losses,
+            'reconnects': self.reconnects,
+            'alerts': self.alert_stats(),
+            'filters': {sensor: chain.describe() for sensor, chain in self.filter_chains.items()},
+            'queue': self.frame_queue.get_stats(),
+            'latency': self.tracer.summary(),
+        }
+        if self.ingest_engine:
+            stats['ingest'] = self.ingest_engine.get_stats()
+        if self.transport:
+            stats['commands'] = self.transport.get_stats()
+        if self.supervisor:
+            stats['link'] = self.supervisor.get_stats()
+        if self.store:
+            stats['store'] = self.store.get_stats()
+        return stats
+
+
+# ==================== HEADLESS ENTRY POINT ====================
+
+def replay_capture(core, path, speed=None):
+    """Replay a capture straight into the core on this thread; returns the replay stats.
+
+    Frames get the capture's own timestamps, so repeated replays of one capture
+    produce identical sensor histories and recordings.
+    """
+    start_epoch = capture_start_epoch(path)
+    time_offset = None
+    if start_epoch is not None:
+        # Run the core's clock from the moment the capture started
+        core.start_time = core.frame_parser.start_time = start_epoch
+        time_offset = 0.0
+    replayer = CaptureReplayer(path, core.process_lines, on_binary=core.process_binary,
+                               speed=speed, time_offset=time_offset)
+    return replayer.run()
+
+
+def run_live(core, port, baudrate, duration=None, capture_path=None):
+    """Stream from a serial port until interrupted or duration seconds pass."""
+    if capture_path:
+        core.start_capture(capture_path)
+    core.connect(port, baudrate)
+    print(f"Connected to {port} at {baudrate} bps (Ctrl+C to stop)")
+    deadline = time.monotonic() + duration if duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            # Drain even when idle so the connection supervisor notices a silent port
+            core.frame_queue.wait(0.5)
+            core.drain()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Apply whatever arrived before the port closed
+        core.disconnect()
+        core.drain(core.frame_queue.maxsize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the GasHealth monitoring pipeline without the dashboard.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--port', help="serial port to read live, e.g. /dev/ttyUSB0 or COM3, "
+                                       "or 'auto' for the first cooker found (ports.py)")
+    source.add_argument('--replay', metavar='FILE',
+                        help="capture (or plain text log) of raw serial output to replay")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="replay speed: 1 = real time, N = N x, 0 = as fast as possible (default)")
+    parser.add_argument('--capture', metavar='FILE', help="record the raw live stream to a capture file")
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--duration', type=float, help="stop a live session after this many seconds")
+    parser.add_argument('--recordings', default=DEFAULT_RECORDINGS_DIR, help="store directory")
+    parser.add_argument('--no-record', action='store_true', help="don't write samples to the store")
+    parser.add_argument('--alerts', metavar='FILE', help="alert rules file (default: alerts.json if present)")
+    parser.add_argument('--filters', metavar='FILE', help="filter chains file (default: filters.json if present)")
+    parser.add_argument('--latency', metavar='FILE', help="export the per-stage latency histograms of a live run")
+    parser.add_argument('--api', metavar='HOST:PORT', nargs='?', const='127.0.0.1:8765',
+                        help="serve the HTTP/WebSocket API and /metrics during a live run (default 127.0.0.1:8765)")
+    args = parser.parse_args(argv)
+
+    core = MonitorCore(args.recordings, record=not args.no_record)
+    core.load_alert_rules(args.alerts)
+    core.load_filter_chains(args.filters)
+    core.subscribe('alert', lambda name, active, value: print(
+        f"ALERT {name} {'ON' if active else 'OFF'} ({value:.2f})"))
+
+    if args.port == 'auto':
+        from ports import PortCache, choose_port, scan_ports
+
+        args.port = choose_port(scan_ports(PortCache(), baudrate=args.baud))
+        if args.port is None:
+            print("No over.ino device found; pass --port explicitly")
+            core.close()
+            return 1
+
+    server = None
+    if args.api:
+        from api_server import ApiServer, parse_address
+
+        device_id = core.device_id or 'device'
+        server = ApiServer({device_id: core}, *parse_address(args.api))
+        server.start()
+        server.attach(device_id, core)
+        print(f"API at http://{server.host}:{server.port}/ (WebSocket /ws, metrics /metrics)")
+
+    try:
+        if args.replay:
+            stats = replay_capture(core, args.replay, args.speed)
+            print(f"Replayed {stats['lines']} lines in {stats['seconds']:.3f} s "
+                  f"({stats['lines_per_sec']:,.0f} lines/s)")
+        else:
+            run_live(core, args.port, args.baud, args.duration, args.capture)
+    finally:
+        if server:
+            server.stop()
+        core.close()
+
+    stats = core.get_stats()
+    print(f"Frames applied: {stats['frames_applied']}, parse errors: {stats['parse_errors']}, "
+          f"alerts raised: {stats['alerts_raised']}")
+    for sensor in SENSORS:
+        print(f"  {sensor}: {core.sensor_data[sensor]['value']:.2f}")
+    if 'store' in stats:
+        print(f"Recorded {stats['store']['written']} records to {core.recordings_dir}")
+    if core.tracer.histograms['read'].total:
+        print("Latency by stage:")
+        print(core.tracer.format_table())
+        if args.latency:
+            print(f"Latency histograms written to {export_latency({core.device_id or 'device': core.tracer}, args.latency)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
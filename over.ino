@@ -40,9 +40,29 @@ float filteredVoltage = 0;
 // Mode control
 bool manualMode = false;  // false = Auto, true = Manual
 
+// ===================== BINARY FRAMES =====================
+// Set to 1 to send sensor readings as fixed 12-byte frames instead of ASCII lines.
+// Command replies (MODE_CHANGED, LEDn) stay ASCII. Layout matches frame_parser.py:
+// sync(0xA5) kind(u8) aux(u16) millis(u32) value(f32), little-endian.
+#define BINARY_FRAMES 0
+#define FRAME_SYNC        0xA5
+#define FRAME_GAS         1
+#define FRAME_LDR         2
+#define FRAME_VOLT        3
+#define FRAME_LED_STATUS  4
+
+struct __attribute__((packed)) SensorFrame {
+  uint8_t sync;
+  uint8_t kind;
+  uint16_t aux;
+  uint32_t millis;
+  float value;
+};
+
 // Function declarations
 void checkCommands();
 void handleLEDCommand(String command);
+void sendFrame(uint8_t kind, uint16_t aux, float value);
 
 void setup() {
   Serial.begin(115200);
@@ -89,10 +109,14 @@ void loop() {
   filteredGas = filteredGas + gasAlpha * (avgGas - filteredGas);
 
   // Send gas data
+#if BINARY_FRAMES
+  sendFrame(FRAME_GAS, dangerLevel, filteredGas);
+#else
   Serial.print("GAS:");
   Serial.print(filteredGas);
   Serial.print(",");
   Serial.println(dangerLevel);
+#endif
 
   // Auto mode LED control for Gas
   if(!manualMode) {
@@ -118,11 +142,15 @@ void loop() {
     ldrLPF = ldrLPF + ldrAlpha * (averageLDR - ldrLPF);
 
     // Send LDR data
+#if BINARY_FRAMES
+    sendFrame(FRAME_LDR, 0, ldrLPF);
+#else
     float t = (currentMillis - startTime)/1000.0;
     Serial.print("LDR:");
     Serial.print(t);
     Serial.print(",");
     Serial.println(ldrLPF);
+#endif
 
     // Auto mode LED control for LDR
     if(!manualMode) {
@@ -140,12 +168,16 @@ void loop() {
   filteredVoltage = filteredVoltage + voltAlpha * (voltage - filteredVoltage);
 
   // Send voltage data
+#if BINARY_FRAMES
+  sendFrame(FRAME_VOLT, 0, filteredVoltage);
+#else
   Serial.print("VOLT:");
   Serial.print(0);
   Serial.print(",");
   Serial.print(filteredVoltage, 3);
   Serial.print(",");
   Serial.println(3.3);
+#endif
 
   // Auto mode LED control for Voltage
   if(!manualMode) {
@@ -157,16 +189,31 @@ void loop() {
   }
 
   // Send LED status
+#if BINARY_FRAMES
+  uint16_t ledBits = digitalRead(GAS_LED) | (digitalRead(LDR_LED) << 1) | (digitalRead(VOLT_LED) << 2);
+  sendFrame(FRAME_LED_STATUS, ledBits, 0.0);
+#else
   Serial.print("LED_STATUS:");
   Serial.print(digitalRead(GAS_LED));
   Serial.print(",");
   Serial.print(digitalRead(LDR_LED));
   Serial.print(",");
   Serial.println(digitalRead(VOLT_LED));
+#endif
 
   delay(50);
 }
 
+void sendFrame(uint8_t kind, uint16_t aux, float value) {
+  SensorFrame frame;
+  frame.sync = FRAME_SYNC;
+  frame.kind = kind;
+  frame.aux = aux;
+  frame.millis = millis();
+  frame.value = value;
+  Serial.write((const uint8_t*)&frame, sizeof(frame));
+}
+
 void checkCommands() {
   if (Serial.available() > 0) {
     String command = Serial.readStringUntil('\n');
@@ -180,7 +227,7 @@ void checkCommands() {
       manualMode = true;
       Serial.println("MODE_CHANGED:MANUAL");
     }
-    else if (command.startsWith("LED")) {
+    else if (command.startsWith("LED") || command.startsWith("ALL_")) {
       if (manualMode) {
         handleLEDCommand(command);
       } else {
@@ -0,0 +1,263 @@
+"""Serial port discovery: find which ports carry an over.ino cooker.
+
+Enumerating ports is cheap, but telling a cooker from the other USB-serial
+adapters on a machine needs a look at the traffic. scan_ports() ranks the
+ports comports() reports:
+
+- A port whose fingerprint (see port_fingerprint) is in the cache is
+  settled at once, so reruns need no probing.
+- Any other port is probed: opened for at most `timeout` seconds and read
+  until the firmware's SYSTEM_READY banner (printed in setup(), which the
+  DTR reset on open usually triggers) or a frame FrameParser understands
+  shows up. Ports are probed in parallel, so a machine full of adapters
+  costs one timeout, not one each.
+
+Results are kept in ports.json next to this file, which also remembers
+which dashboard device last used each cooker:
+
+    {"10C4:EA60:0001": {"cooker": true, "description": "CP2102 USB to UART",
+                        "port": "/dev/ttyUSB0", "device_id": "device1",
+                        "evidence": "SYSTEM_READY:Auto Mode", "checked": 1760000000.0}}
+
+``python ports.py`` lists the ranked ports; ``--probe PORT`` probes one port
+(e.g. the esp32_sim.py pty, which comports() doesn't list); ``--forget``
+clears the cache.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from frame_parser import FrameParser, BINARY_SYNC, BINARY_FRAME_SIZE, BINARY_KINDS
+from serial_ingest import SerialIngestEngine
+
+PORT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ports.json')
+READY_PREFIX = 'SYSTEM_READY'
+# Frames only over.ino sends; command replies alone could come from anything
+PROTOCOL_KINDS = frozenset(('gas', 'ldr', 'voltage', 'led_status'))
+# A silent port may be a cooker that was switched off, so "not a cooker" is re-checked after this
+NEGATIVE_TTL = 3600.0
+# Fingerprint prefix of ports that have nothing but their path to go by
+PATH_KEY = 'path:'
+
+
+def port_fingerprint(info):
+    """Identity of a port's hardware from a comports() entry (None for no entry); the key
+    of the port cache and what reconnect.py looks for after a re-plug.
+
+    USB VID:PID plus the serial number when the adapter has one. Many ESP32
+    boards' CH340/CP210x adapters have none, so identical boards would share a
+    key; those are told apart by their USB location (the hub port they are
+    plugged into) instead. Ports without USB identity are known by their path.
+    """
+    if info is None:
+        return None
+    if info.vid is not None:
+        if info.serial_number:
+            return f"{info.vid:04X}:{info.pid:04X}:{info.serial_number}"
+        return f"{info.vid:04X}:{info.pid:04X}@{info.location or info.device}"
+    return f"{PATH_KEY}{info.device}"
+
+
+class PortCache:
+    """Fingerprint -> what was learned about that port, persisted as JSON (any thread)."""
+
+    def __init__(self, path=PORT_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                # A damaged cache only costs a re-probe
+                print(f"Ignoring port cache {path}: {e}")
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+
+    def update(self, key, **fields):
+        with self.lock:
+            entry = self.entries.setdefault(key, {})
+            entry.update(fields)
+            self.dirty = True
+
+    def assign(self, key, device_id):
+        """Remember that a dashboard device connected to this port and got frames from it."""
+        self.update(key, cooker=True, device_id=device_id, checked=time.time())
+
+    def forget(self, key=None):
+        """Drop one entry (it will be probed again), or all of them."""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+            self.dirty = True
+
+    def save(self):
+        """Write the cache if it changed; a temporary file keeps a crash from truncating it."""
+        with self.lock:
+            if not self.dirty or not self.path:
+                return
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(temporary, self.path)
+            self.dirty = False
+
+
+def probe_port(port, baudrate=115200, timeout=1.0):
+    """Listen on a port for over.ino output; returns (is_cooker, evidence, seconds), with
+    is_cooker None when the port couldn't be opened (busy, gone, no permission).
+
+    Opening the port usually resets an ESP32, which then prints SYSTEM_READY;
+    a board that doesn't reset is recognised by its sensor frames instead. The
+    port is closed as soon as either shows up.
+    """
+    import serial
+
+    started = time.perf_counter()
+    parser = FrameParser()
+    found = []
+
+    def on_lines(lines):
+        for line in lines:
+            if line.startswith(READY_PREFIX):
+                found.append(line)
+                return
+        for kind, _, _ in parser.parse_lines(lines):
+            if kind in PROTOCOL_KINDS:
+                found.append(f"{kind} frame")
+                return
+
+    def on_binary(data):
+        if any(kind in PROTOCOL_KINDS for kind, _, _ in parser.parse_binary(data)):
+            found.append("binary frame")
+
+    # The engine only splits bytes into lines and binary frames here; it doesn't read
+    engine = SerialIngestEngine(None, on_lines, on_binary=on_binary,
+                                binary_sync=BINARY_SYNC, binary_frame_size=BINARY_FRAME_SIZE,
+                                binary_kinds=BINARY_KINDS)
+    try:
+        with serial.Serial(port, int(baudrate), timeout=0.05) as port_obj:
+            deadline = started + timeout
+            while not found and time.perf_counter() < deadline:
+                data = port_obj.read(port_obj.in_waiting or 1)
+                if data:
+                    engine.feed(data)
+    except (OSError, ValueError) as e:
+        return None, str(e), time.perf_counter() - started
+    if found:
+        return True, found[0], time.perf_counter() - started
+    return False, None, time.perf_counter() - started
+
+
+def scan_ports(cache, probe=True, skip=(), baudrate=115200, timeout=1.0):
+    """Enumerate ports and rank them best first; cooker verdicts come from the cache or a probe.
+
+    Each result is a dict with device, fingerprint, description, cooker
+    (True, False or None when unknown), source ('cache', 'probe' or None) and the
+    device_id last connected to it. Ports in skip (already open) aren't probed.
+    Runs in the caller's thread; the dashboard calls it from a worker.
+    """
+    import serial.tools.list_ports
+
+    results = []
+    probes = []
+    for info in serial.tools.list_ports.comports():
+        key = port_fingerprint(info)
+        entry = cache.get(key) or {}
+        if entry.get('cooker') is False and time.time() - entry.get('checked', 0) > NEGATIVE_TTL:
+            entry = {}
+        result = {'device': info.device, 'fingerprint': key, 'description': info.description,
+                  'cooker': entry.get('cooker'), 'source': 'cache' if entry else None,
+                  'device_id': entry.get('device_id')}
+        results.append(result)
+        if not result['source'] and probe and info.device not in skip:
+            probes.append(result)
+        elif entry and entry.get('port') != info.device:
+            # Same hardware, new path (another USB socket or enumeration order)
+            cache.update(key, port=info.device)
+
+    def run_probe(result):
+        cooker, evidence, _ = probe_port(result['device'], baudrate, timeout)
+        if cooker is None:
+            # Couldn't open it; stays unknown and is probed again on the next scan
+            return
+        result.update(cooker=cooker, source='probe')
+        cache.update(result['fingerprint'], cooker=cooker, description=result['description'],
+                     port=result['device'], evidence=evidence, checked=time.time())
+
+    threads = [threading.Thread(target=run_probe, args=(result,), daemon=True, name='port-probe')
+               for result in probes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"Could not save port cache: {e}")
+
+    # Cookers first, then ports not known either way, then other adapters
+    rank = {True: 0, None: 1, False: 2}
+    results.sort(key=lambda result: rank[result['cooker']])
+    return results
+
+
+def choose_port(results, device_id=None, taken=()):
+    """The port a device should use: the cooker it used last, else the first free cooker,
+    else the first port not known to be something else; None if nothing fits."""
+    free = [result for result in results if result['device'] not in taken]
+    for result in free:
+        if result['cooker'] and device_id is not None and result['device_id'] == device_id:
+            return result['device']
+    for result in free:
+        if result['cooker']:
+            return result['device']
+    for result in free:
+        if result['cooker'] is None:
+            return result['device']
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find serial ports carrying over.ino.")
+    parser.add_argument('--probe', metavar='PORT', help="probe one port instead of scanning")
+    parser.add_argument('--no-probe', action='store_true', help="use only the cache")
+    parser.add_argument('--forget', action='store_true', help="clear the cache first")
+    parser.add_argument('--timeout', type=float, default=1.0, help="probe time per port, seconds")
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--cache', default=PORT_CACHE_PATH, help="cache file")
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        cooker, evidence, seconds = probe_port(args.probe, args.baud, args.timeout)
+        verdict = {True: 'over.ino', False: 'not recognised', None: 'could not open'}[cooker]
+        print(f"{args.probe}: {verdict} "
+              f"({evidence or 'no output'}, {seconds * 1000:.0f} ms)")
+        return 0 if cooker else 1
+
+    cache = PortCache(args.cache)
+    if args.forget:
+        cache.forget()
+    started = time.perf_counter()
+    results = scan_ports(cache, probe=not args.no_probe, baudrate=args.baud, timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+    labels = {True: 'cooker', False: 'other', None: 'unknown'}
+    for result in results:
+        owner = f" [{result['device_id']}]" if result['device_id'] else ""
+        print(f"{result['device']:20s} {labels[result['cooker']]:8s} {result['source'] or '-':6s} "
+              f"{result['fingerprint']}  {result['description']}{owner}")
+    print(f"{len(results)} ports in {elapsed * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Keeps a device connected across USB glitches and re-plugs.
+
+A ConnectionSupervisor belongs to one MonitorCore. A port counts as dead when a
+read fails or nothing arrives for stall_timeout seconds (the firmware streams
+continuously). A background thread then retries with jittered exponential
+backoff, finding the board again through serial.tools.list_ports by its
+fingerprint (ports.port_fingerprint), so it is found even if it comes back as
+another port name. The owner thread (MonitorCore.drain) swaps in the new port and restores
+the last mode and LED state.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from serial_ingest import WRITE_TIMEOUT
+from ports import PATH_KEY, port_fingerprint
+
+
+def port_info(port):
+    """The list_ports entry for a port name, or None if it isn't enumerated."""
+    try:
+        from serial.tools import list_ports
+        for info in list_ports.comports():
+            if info.device == port:
+                return info
+    except Exception as e:
+        print(f"Port enumeration error: {e}")
+    return None
+
+
+def find_port(fingerprint, last_port):
+    """Where the device is now: a port with the same fingerprint (preferring the old
+    name), or for ports without USB identity (ptys, fixed adapters) the old name if present."""
+    try:
+        from serial.tools import list_ports
+        ports = list_ports.comports()
+    except Exception as e:
+        print(f"Port enumeration error: {e}")
+        ports = []
+    if fingerprint is not None and not fingerprint.startswith(PATH_KEY):
+        matches = [info.device for info in ports if port_fingerprint(info) == fingerprint]
+        if last_port in matches:
+            return last_port
+        return matches[0] if matches else None
+    if last_port in {info.device for info in ports} or os.path.exists(last_port):
+        return last_port
+    return None
+
+
+class ConnectionSupervisor:
+    """Detects a dead port, reconnects with backoff and records each outage.
+
+    state is 'connected', 'lost' (noticed by a reader thread, not yet handled),
+    'reconnecting', 'recovered' (new port open, waiting for the owner thread) or
+    'stopped'. Outages are kept as dicts with the gap (last byte before the
+    loss to the first moment the port was back) and time to recovery
+    (detection to reconnection), both in seconds.
+    """
+
+    def __init__(self, core, port, baudrate, fingerprint=None, base_delay=0.25, max_delay=10.0,
+                 stall_timeout=3.0, history=100):
+        self.core = core
+        self.port = port
+        self.baudrate = baudrate
+        # The port's identity, if the caller already knows it (e.g. from a port scan).
+        # Otherwise it is looked up on a thread of its own: enumerating ports can take
+        # seconds and connect() may run on the Tk thread. It must still be done now,
+        # while the device is present, not once it has gone.
+        self.fingerprint = fingerprint
+        self.identify_thread = None
+        if fingerprint is None:
+            self.identify_thread = threading.Thread(target=self.identify, daemon=True, name='port-identify')
+            self.identify_thread.start()
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stall_timeout = stall_timeout
+
+        self.lock = threading.Lock()
+        self.state = 'connected'
+        self.reason = None
+        self.lost_at = None       # when the loss was detected
+        self.last_data = None     # last byte received before it
+        self.recovered_port = None
+        self.recovered_at = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # --- Counters ---
+        self.attempts = 0
+        self.reconnects = 0
+        self.outages = deque(maxlen=history)
+
+    # --- Any thread ---
+
+    def port_lost(self, reason):
+        """A reader thread saw the port die; the owner thread takes it from here."""
+        with self.lock:
+            if self.state != 'connected':
+                return
+            self.state = 'lost'
+            self.reason = str(reason)
+            self.lost_at = time.time()
+            engine = self.core.ingest_engine
+            self.last_data = engine.last_receive if engine else self.lost_at
+        # Wake an owner thread blocked on the queue
+        self.core.frame_queue.ready.set()
+
+    def stop(self):
+        self.state = 'stopped'
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(1.0)
+        with self.lock:
+            port_obj, self.recovered_port = self.recovered_port, None
+        if port_obj:
+            port_obj.close()
+
+    # --- Owner thread ---
+
+    def check(self):
+        """Called from MonitorCore.drain(): notice stalls and act on losses and recoveries."""
+        state = self.state
+        if state == 'connected':
+            engine = self.core.ingest_engine
+            if engine and time.time() - engine.last_receive > self.stall_timeout:
+                self.port_lost(f"no data for {self.stall_timeout:g} s")
+                state = self.state
+        if state == 'lost':
+            self.state = 'reconnecting'
+            self.core.connection_lost(self.reason, self.last_data)
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        elif state == 'recovered':
+            with self.lock:
+                port_obj, self.recovered_port = self.recovered_port, None
+                self.state = 'connected'
+            outage = {
+                'start': self.last_data,
+                'end': self.recovered_at,
+                'gap': self.recovered_at - self.last_data,
+                'recovery': self.recovered_at - self.lost_at,
+                'attempts': self.attempts,
+                'reason': self.reason,
+            }
+            self.outages.append(outage)
+            self.reconnects += 1
+            self.core.connection_restored(port_obj, outage)
+
+    # --- Identify and reconnect threads ---
+
+    def identify(self):
+        self.fingerprint = port_fingerprint(port_info(self.port))
+
+    def run(self):
+        import serial
+
+        if self.identify_thread:
+            self.identify_thread.join()
+        self.attempts = 0
+        delay = self.base_delay
+        while not self.stop_event.is_set():
+            # Equal jitter: boards re-plugged together don't retry in lockstep
+            if self.stop_event.wait(delay * random.uniform(0.5, 1.0)):
+                return
+            self.attempts += 1
+            port = find_port(self.fingerprint, self.port)
+            if port is not None:
+                try:
+                    port_obj = serial.Serial(port, int(self.baudrate), timeout=0.1,
+                                             write_timeout=WRITE_TIMEOUT)
+                except (serial.SerialException, OSError) as e:
+                    print(f"Reconnect attempt {self.attempts} on {port} failed: {e}")
+                else:
+                    with self.lock:
+                        if self.state != 'reconnecting':
+                            port_obj.close()
+                            return
+                        self.port = port
+                        self.recovered_port = port_obj
+                        self.recovered_at = time.time()
+                        self.state = 'recovered'
+                    self.core.frame_queue.ready.set()
+                    return
+            delay = min(delay * 2, self.max_delay)
+
+    # --- Stats ---
+
+    def get_stats(self):
+        recoveries = sorted(outage['recovery'] for outage in self.outages)
+        return {
+            'state': self.state,
+            'port': self.port,
+            'fingerprint': self.fingerprint,
+            'reconnects': self.reconnects,
+            'attempts': self.attempts,
+            'last_gap_s': self.outages[-1]['gap'] if self.outages else None,
+            'recovery_p50_s': recoveries[len(recoveries) // 2] if recoveries else None,
+            'recovery_max_s': recoveries[-1] if recoveries else None,
+        }
@@ -0,0 +1,124 @@
+import time
+import numpy as np
+
+
+class SensorRingBuffer:
+    """Fixed-capacity history of (timestamp, raw, filtered) samples in float64 columns.
+
+    Every sample is written twice, at i and i + capacity, so the most recent
+    samples are always one contiguous slice and readers get views, not copies.
+    """
+
+    TIMESTAMP = 0
+    RAW = 1
+    FILTERED = 2
+
+    def __init__(self, capacity=80):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.data = np.zeros((3, 2 * capacity), dtype=np.float64)
+        # Row views used by the scalar append path
+        self._columns = (self.data[0], self.data[1], self.data[2])
+        self.head = 0          # next write position in [0, capacity)
+        self.count = 0         # valid samples, up to capacity
+        self.generation = 0    # total samples ever appended
+
+    def append(self, timestamp, raw, filtered):
+        """Add one sample, overwriting the oldest when full."""
+        head = self.head
+        ts_col, raw_col, filtered_col = self._columns
+        mirror = head + self.capacity
+        ts_col[head] = ts_col[mirror] = timestamp
+        raw_col[head] = raw_col[mirror] = raw
+        filtered_col[head] = filtered_col[mirror] = filtered
+        self.head = head + 1 if head + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+        self.generation += 1
+
+    def extend(self, timestamps, raws, filtereds):
+        """Add a batch of samples in one vectorized write."""
+        block = np.vstack((np.asarray(timestamps, dtype=np.float64),
+                           np.asarray(raws, dtype=np.float64),
+                           np.asarray(filtereds, dtype=np.float64)))
+        n = block.shape[1]
+        if n == 0:
+            return
+        capacity = self.capacity
+        self.generation += n
+        if n > capacity:
+            block = block[:, -capacity:]
+            self.head = (self.head + n - capacity) % capacity
+            n = capacity
+        positions = (self.head + np.arange(n)) % capacity
+        self.data[:, positions] = block
+        self.data[:, positions + capacity] = block
+        self.head = (self.head + n) % capacity
+        self.count = min(self.count + n, capacity)
+
+    def clear(self):
+        """Forget all samples (the generation counter keeps counting)."""
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _window(self, n):
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.capacity
+        return end - n, end
+
+    def columns(self, n=None):
+        """(timestamps, raw, filtered) views of the newest n samples, oldest first."""
+        start, end = self._window(n)
+        block = self.data[:, start:end]
+        return block[0], block[1], block[2]
+
+    def timestamps(self, n=None):
+        start, end = self._window(n)
+        return self.data[0, start:end]
+
+    def raw(self, n=None):
+        start, end = self._window(n)
+        return self.data[1, start:end]
+
+    def filtered(self, n=None):
+        start, end = self._window(n)
+        return self.data[2, start:end]
+
+    def last(self, column=FILTERED):
+        """Newest value of a column, or None when empty."""
+        if not self.count:
+            return None
+        return float(self.data[column, self.head + self.capacity - 1])
+
+    @property
+    def nbytes(self):
+        """Memory held by the sample storage."""
+        return self.data.nbytes
+
+
+def benchmark(capacity=20 * 60 * 60 * 3, samples=200000):
+    """Report memory use and per-sample append cost."""
+    buffer = SensorRingBuffer(capacity)
+    start = time.perf_counter()
+    for i in range(samples):
+        buffer.append(i * 0.05, 300.0, 299.5)
+    append_ns = (time.perf_counter() - start) / samples * 1e9
+
+    values = np.arange(samples, dtype=np.float64)
+    start = time.perf_counter()
+    buffer.extend(values, values, values)
+    extend_ns = (time.perf_counter() - start) / samples * 1e9
+
+    print(f"Capacity: {capacity} samples ({capacity / 20 / 3600:.1f} h at 20 Hz)")
+    print(f"Memory:   {buffer.nbytes / 1e6:.1f} MB")
+    print(f"append(): {append_ns:.0f} ns/sample")
+    print(f"extend(): {extend_ns:.0f} ns/sample")
+    return buffer.nbytes, append_ns, extend_ns
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,206 @@
+import threading
+import time
+
+# Seconds a write may block on a port that has stopped taking output
+# (pyserial raises SerialTimeoutException after it); set when ports are opened
+WRITE_TIMEOUT = 0.5
+
+
+class SerialIngestEngine:
+    """Reads a serial port on its own thread and hands complete lines on in batches."""
+
+    def __init__(self, port_obj, on_lines, read_size=4096, on_binary=None,
+                 binary_sync=0xA5, binary_frame_size=12, binary_kinds=None, tap=None, on_error=None):
+        self.port_obj = port_obj
+        self.on_lines = on_lines
+        self.read_size = read_size
+        # Optional callable that sees every raw read before it is split (capture recording)
+        self.tap = tap
+        # Called as on_error(engine, exception) when the port dies; the engine stops
+        # reading. Without it, read errors are counted and retried.
+        self.on_error = on_error
+        self.read_errors = 0
+        self.last_error = None
+
+        # Optional fixed-size binary frames interleaved with ASCII replies
+        self.on_binary = on_binary
+        self.binary_sync = bytes([binary_sync])
+        self.binary_frame_size = binary_frame_size
+        # Valid values of the byte after the sync; a sync byte followed by anything
+        # else is a stray byte, not the start of a frame
+        self.binary_kinds = binary_kinds
+        self.garbage_bytes = 0
+
+        # Reusable receive buffer; only the unfinished tail is kept between reads
+        self.buffer = bytearray()
+        self.thread = None
+        self.running = False
+
+        # --- Throughput counters ---
+        self.last_receive = time.time()
+        self.received_at = time.perf_counter()  # when the bytes being split arrived (latency tracing)
+        self.bytes_total = 0
+        self.frames_total = 0
+        self._rate_time = time.perf_counter()
+        self._rate_bytes = 0
+        self._rate_frames = 0
+        self.bytes_per_sec = 0.0
+        self.frames_per_sec = 0.0
+
+    def start(self):
+        """Start the reader thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Ask the reader thread to exit and wait for it."""
+        self.running = False
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def run(self):
+        """Block on the port until bytes arrive instead of polling and sleeping."""
+        port = self.port_obj
+        while self.running:
+            try:
+                # read() blocks until at least one byte or the port timeout,
+                # then we pick up whatever else is already waiting
+                data = port.read(1)
+                if not data:
+                    continue
+                waiting = port.in_waiting
+                if waiting:
+                    data += port.read(min(waiting, self.read_size))
+                self.receive(data)
+            except Exception as e:
+                if not self.running:
+                    break
+                self.record_error(e)
+                if self.on_error:
+                    self.running = False
+                    self.on_error(self, e)
+                    break
+                time.sleep(0.05)
+
+    def record_error(self, error):
+        """Count a failed read, or a failure handling one (also used by a SerialPoller)."""
+        self.read_errors += 1
+        self.last_error = str(error)
+
+    def receive(self, data):
+        """Handle one raw read from the port (called by run() or a shared SerialPoller)."""
+        received_at = time.perf_counter()
+        self.last_receive = time.time()
+        tap = self.tap
+        if tap is not None:
+            tap(data)
+        self.feed(data, received_at)
+
+    def feed(self, data, received_at=None):
+        """Append raw bytes and dispatch every complete line found."""
+        self.received_at = time.perf_counter() if received_at is None else received_at
+        self.bytes_total += len(data)
+        buffer = self.buffer
+        # Only the new bytes can contain a newline we have not seen yet
+        search_from = len(buffer)
+        buffer += data
+
+        if self.on_binary is not None and buffer.find(self.binary_sync) != -1:
+            return self._feed_mixed()
+
+        lines = []
+        start = 0
+        end = buffer.find(b'\n', search_from)
+        while end != -1:
+            line = bytes(buffer[start:end]).strip()
+            if line:
+                lines.append(line.decode('utf-8', errors='ignore'))
+            start = end + 1
+            end = buffer.find(b'\n', start)
+
+        if start:
+            del buffer[:start]
+
+        if lines:
+            self.frames_total += len(lines)
+            self.on_lines(lines)
+        return len(lines)
+
+    def _feed_mixed(self):
+        """Split the buffer into binary frames and ASCII lines when sync bytes are present."""
+        buffer = self.buffer
+        sync = self.binary_sync
+        sync_value = sync[0]
+        size = self.binary_frame_size
+        kinds = self.binary_kinds
+        end_of_data = len(buffer)
+
+        lines = []
+        binary = bytearray()
+        frame_count = 0
+        pos = 0
+        while pos < end_of_data:
+            if buffer[pos] == sync_value:
+                if kinds is not None and pos + 1 < end_of_data and buffer[pos + 1] not in kinds:
+                    # False sync: skip just this byte and rescan, so the frame or
+                    # line right behind it isn't lost with it
+                    self.garbage_bytes += 1
+                    pos += 1
+                    continue
+                if end_of_data - pos < size:
+                    break
+                binary += buffer[pos:pos + size]
+                frame_count += 1
+                pos += size
+                continue
+
+            newline = buffer.find(b'\n', pos)
+            sync_pos = buffer.find(sync, pos)
+            if sync_pos != -1 and (newline == -1 or sync_pos < newline):
+                # Bytes before a sync with no line ending are a torn line; drop them
+                self.garbage_bytes += sync_pos - pos
+                pos = sync_pos
+                continue
+            if newline == -1:
+                break
+            line = bytes(buffer[pos:newline]).strip()
+            if line:
+                lines.append(line.decode('utf-8', errors='ignore'))
+            pos = newline + 1
+
+        if pos:
+            del buffer[:pos]
+
+        if lines:
+            self.on_lines(lines)
+        if binary:
+            self.on_binary(bytes(binary))
+        frame_count += len(lines)
+        self.frames_total += frame_count
+        return frame_count
+
+    def update_rates(self):
+        """Recompute bytes/s and frames/s since the previous call and return them."""
+        now = time.perf_counter()
+        elapsed = now - self._rate_time
+        if elapsed > 0:
+            self.bytes_per_sec = (self.bytes_total - self._rate_bytes) / elapsed
+            self.frames_per_sec = (self.frames_total - self._rate_frames) / elapsed
+        self._rate_time = now
+        self._rate_bytes = self.bytes_total
+        self._rate_frames = self.frames_total
+        return self.bytes_per_sec, self.frames_per_sec
+
+    def get_stats(self):
+        """Snapshot of the ingestion counters."""
+        return {
+            'bytes_total': self.bytes_total,
+            'frames_total': self.frames_total,
+            'bytes_per_sec': self.bytes_per_sec,
+            'frames_per_sec': self.frames_per_sec,
+            'buffered': len(self.buffer),
+            'garbage_bytes': self.garbage_bytes,
+            'read_errors': self.read_errors,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,102 @@
+import pytest
+
+from alerts import AlertEngine, merge_rules
+
+
+def test_override_comparison_replaces_inherited_one():
+    base = [{'name': 'ldr', 'type': 'threshold', 'sensor': 'ldr', 'above': 1500}]
+    merged = merge_rules(base, [{'name': 'ldr', 'below': 100}])
+    assert merged == [{'name': 'ldr', 'type': 'threshold', 'sensor': 'ldr', 'below': 100}]
+    engine = AlertEngine(merged)
+    engine.update('ldr', 0.0, 50.0)
+    assert engine.rules['ldr'].active
+
+
+def test_override_without_comparison_keeps_it():
+    base = [{'name': 'gas', 'type': 'threshold', 'sensor': 'gas', 'above': 350}]
+    assert merge_rules(base, [{'name': 'gas', 'hysteresis': 5}])[0]['above'] == 350
+
+
+def test_combined_rules_settle_in_dependency_order():
+    specs = [
+        # Listed before the rule it depends on
+        {'name': 'outer', 'type': 'all', 'rules': ['inner', 'ldr']},
+        {'name': 'inner', 'type': 'any', 'rules': ['gas']},
+        {'name': 'gas', 'type': 'threshold', 'sensor': 'gas', 'above': 350},
+        {'name': 'ldr', 'type': 'threshold', 'sensor': 'ldr', 'above': 1500},
+    ]
+    engine = AlertEngine(specs)
+    engine.update('ldr', 0.0, 2000.0)
+    engine.update('gas', 0.1, 400.0)
+    assert engine.rules['inner'].active
+    assert engine.rules['outer'].active
+    # The panel comes from the first child that has one, resolved children first
+    assert engine.rules['outer'].panel == 'gas'
+
+
+def test_combined_rule_cycle_is_rejected():
+    specs = [
+        {'name': 'a', 'type': 'all', 'rules': ['b']},
+        {'name': 'b', 'type': 'any', 'rules': ['a']},
+    ]
+    with pytest.raises(ValueError, match='cycle'):
+        AlertEngine(specs)
+
+
+def changes(engine, sensor, samples):
+    """Names of the rules that changed state at each (t, value) sample."""
+    seen = []
+    engine.on_change = lambda rule, t: seen.append((t, rule.name, rule.active))
+    for t, value in samples:
+        engine.update(sensor, t, value)
+    return seen
+
+
+def test_threshold_hysteresis_stops_flicker():
+    engine = AlertEngine([{'name': 'gas', 'type': 'threshold', 'sensor': 'gas',
+                           'above': 350, 'hysteresis': 10}])
+    samples = [(0, 349), (1, 351), (2, 345), (3, 352), (4, 341), (5, 339), (6, 351)]
+    assert changes(engine, 'gas', samples) == [
+        (1, 'gas', True), (5, 'gas', False), (6, 'gas', True)]
+
+
+def test_min_duration_debounces_raise():
+    engine = AlertEngine([{'name': 'ldr', 'type': 'threshold', 'sensor': 'ldr',
+                           'above': 1500, 'min_duration': 0.5}])
+    samples = [(0.0, 1600), (0.3, 1400), (0.4, 1600), (0.8, 1600), (0.9, 1600)]
+    assert changes(engine, 'ldr', samples) == [(0.9, 'ldr', True)]
+
+
+def test_below_and_derived_sensor():
+    engine = AlertEngine([
+        {'name': 'low', 'type': 'threshold', 'sensor': 'voltage', 'below': 1.0},
+        {'name': 'hot', 'type': 'threshold', 'sensor': 'temperature', 'above': 200},
+    ])
+    engine.update('voltage', 0.0, 2.5)
+    assert [rule.name for rule in engine.active()] == ['hot']
+    assert engine.rules['hot'].value == 250
+    engine.update('voltage', 0.1, 0.5)
+    assert [rule.name for rule in engine.active()] == ['low']
+
+
+def test_combined_all_and_any():
+    engine = AlertEngine([
+        {'name': 'gas', 'type': 'threshold', 'sensor': 'gas', 'above': 350},
+        {'name': 'ldr', 'type': 'threshold', 'sensor': 'ldr', 'above': 1500},
+        {'name': 'both', 'type': 'all', 'rules': ['gas', 'ldr']},
+        {'name': 'either', 'type': 'any', 'rules': ['gas', 'ldr']},
+    ])
+    engine.update('gas', 0.0, 400)
+    assert {rule.name for rule in engine.active()} == {'gas', 'either'}
+    engine.update('ldr', 0.1, 1600)
+    assert {rule.name for rule in engine.active()} == {'gas', 'ldr', 'both', 'either'}
+    engine.update('gas', 0.2, 100)
+    assert {rule.name for rule in engine.active()} == {'ldr', 'either'}
+
+
+def test_rate_rule():
+    engine = AlertEngine([{'name': 'rise', 'type': 'rate', 'sensor': 'gas', 'above': 20, 'window': 1.0}])
+    slow = [(n * 0.1, 300 + n) for n in range(20)]
+    fast = [(2 + n * 0.1, 320 + 5 * n) for n in range(20)]
+    assert changes(engine, 'gas', slow) == []
+    assert changes(engine, 'gas', fast)[0][1:] == ('rise', True)
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import struct
+import subprocess
+import sys
+
+import pytest
+from api_server import OP_PING, OP_TEXT, ApiServer, Subscriber, read_ws_frame, ws_frame
+from monitor_core import MonitorCore
+
+
+def masked(payload, opcode=OP_TEXT, mask=b'\x37\xfa\x21\x3d'):
+    """A client frame: always masked, per RFC 6455."""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, 0x80 | length))
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 0x80 | 127, length)
+    return header + mask + bytes(byte ^ mask[n % 4] for n, byte in enumerate(payload))
+
+
+def read_frame(data, max_size=1 << 16):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_ws_frame(reader, max_size)
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize('length, header', [(5, 2), (125, 2), (126, 4), (200, 4), (70000, 10)])
+def test_server_frame_length_encodings(length, header):
+    payload = bytes(n % 251 for n in range(length))
+    frame = ws_frame(payload)
+    assert frame[0] == 0x80 | OP_TEXT
+    assert len(frame) == header + length and frame[header:] == payload
+    assert read_frame(frame, max_size=1 << 17) == (OP_TEXT, payload)
+
+
+@pytest.mark.parametrize('length', [0, 3, 125, 126, 200, 70000])
+def test_masked_client_frames_are_unmasked(length):
+    payload = bytes(n % 253 for n in range(length))
+    assert read_frame(masked(payload, OP_PING), max_size=1 << 17) == (OP_PING, payload)
+
+
+def test_oversize_client_frame_is_refused():
+    with pytest.raises(ValueError):
+        read_frame(masked(bytes(70000)))
+
+
+def test_full_queue_drops_the_oldest_sample_only():
+    async def fill():
+        subscriber = Subscriber(1, 'test', None, None, max_queue=3)
+        subscriber.offer(b'alert', 0.0, droppable=False)
+        for n in range(3):
+            subscriber.offer(b'sample%d' % n, n + 1.0)
+        subscriber.offer(b'close', 5.0, droppable=False)
+        return subscriber
+    subscriber = asyncio.run(fill())
+    assert [frame for _, frame, _ in subscriber.queue] == [b'alert', b'sample1', b'sample2', b'close']
+    assert subscriber.dropped == 1
+
+
+def test_routes():
+    core = MonitorCore(record=False)
+    for n in range(core.max_skip + 2):  # past the start-up readings the core skips
+        core.process_serial_lines(["GAS:250,0", "LDR:10,900", "VOLT:0,1.500,3.3"], n / 20)
+    core.drain()
+    server = ApiServer({'device1': core})
+
+    status, content_type, body = server.route('/api/devices', {})
+    assert (status, content_type) == (200, 'application/json')
+    assert [device['id'] for device in body] == ['device1'] and body[0]['connected'] is False
+
+    status, _, body = server.route('/api/devices/device1', {})
+    assert status == 200 and body['sensors']['gas']['raw'] == 250
+
+    status, _, body = server.route('/api/devices/device1/history', {'sensor': ['ldr']})
+    assert status == 200 and body['raw'] == [900, 900]
+    assert server.route('/api/devices/device1/history', {'sensor': ['bogus']})[0] == 400
+
+    status, content_type, body = server.route('/metrics', {})
+    assert status == 200 and content_type.startswith('text/plain') and b'gashealth_' in body
+    assert server.route('/', {})[1].startswith('text/html')
+    assert server.route('/api/devices/device2', {})[0] == 404
+    assert server.route('/nowhere', {})[0] == 404
+
+
+def test_stop_with_a_connected_client_is_clean():
+    code = """if True:
+        import socket, gc
+        from api_server import ApiServer
+        server = ApiServer({}, port=0)
+        server.start()
+        client = socket.create_connection(('127.0.0.1', server.port))
+        client.sendall(b"GET /ws HTTP/1.1\\r\\nUpgrade: websocket\\r\\nConnection: Upgrade\\r\\n"
+                       b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\\r\\nSec-WebSocket-Version: 13\\r\\n\\r\\n")
+        print(client.recv(1024).split(b"\\r\\n")[0].decode())
+        idle = socket.create_connection(('127.0.0.1', server.port))
+        server.stop()
+        print(server.thread is None, server.loop.is_closed(), len(server.tasks))
+        gc.collect()
+        client.close()
+        idle.close()
+    """
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code], cwd=repo, capture_output=True, text=True, timeout=30)
+    assert result.stdout.splitlines() == ['HTTP/1.1 101 Switching Protocols', 'True True 0']
+    assert result.stderr == ''
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+from capture import CAPTURE_MAGIC, CAPTURE_HEADER, CHUNK_HEADER, CaptureReplayer, read_capture
+from frame_parser import BINARY_FRAME, BINARY_KIND_GAS, BINARY_SYNC
+from monitor_core import MonitorCore, replay_capture
+from tsstore import RECORD_DTYPE
+
+START = 1_700_000_000.0
+
+
+def serial_stream(count=600):
+    """over.ino-like output, text and binary frames mixed, split at arbitrary points."""
+    data = bytearray(b"SYSTEM_READY:Auto Mode\n")
+    for n in range(count):
+        data += (f"GAS:{250 + n % 140},{int(n % 140 > 100)}\nLDR:{n},{1200 + n % 500}\n"
+                 f"VOLT:0,{1.4 + (n % 20) / 50:.3f},3.3\nLED_STATUS:0,{int(n % 500 > 300)},0\n").encode()
+        if n % 50 == 0:
+            data += BINARY_FRAME.pack(BINARY_SYNC, BINARY_KIND_GAS, 0, n, 300.0 + n)
+        if n == 300:
+            data += b"MODE_CHANGED:MANUAL\nLED1:ON\n"
+    return bytes(data)
+
+
+def write_capture(path, data, chunk=97, interval=0.01):
+    with open(path, 'wb') as f:
+        f.write(CAPTURE_MAGIC + CAPTURE_HEADER.pack(START))
+        for number, position in enumerate(range(0, len(data), chunk)):
+            piece = data[position:position + chunk]
+            f.write(CHUNK_HEADER.pack(number * interval, len(piece)) + piece)
+
+
+def replay(path, directory):
+    core = MonitorCore(directory)
+    stats = replay_capture(core, path)
+    core.close()
+    return core, stats
+
+
+def test_capture_round_trip(tmp_path):
+    path = str(tmp_path / 'session.ovrcap')
+    data = serial_stream()
+    write_capture(path, data)
+    start_epoch, chunks = read_capture(path)
+    assert start_epoch == START
+    assert b''.join(piece for _, piece in chunks) == data
+
+    lines, binary, times = [], [], []
+    replayer = CaptureReplayer(path, lambda batch, t: (lines.extend(batch), times.append(t)),
+                               on_binary=lambda piece, t: binary.append(piece), time_offset=5.0)
+    stats = replayer.run()
+    assert lines[0] == 'SYSTEM_READY:Auto Mode'
+    assert len([line for line in lines if line.startswith('GAS:')]) == 600
+    assert len(b''.join(binary)) == 12 * BINARY_FRAME.size
+    assert stats['garbage_bytes'] == 0
+    # Batches carry the chunk's capture offset plus time_offset
+    assert times[0] == 5.0 and times == sorted(times)
+
+
+def test_replaying_a_capture_twice_is_identical(tmp_path):
+    path = str(tmp_path / 'session.ovrcap')
+    write_capture(path, serial_stream())
+    first, first_stats = replay(path, str(tmp_path / 'a'))
+    second, second_stats = replay(path, str(tmp_path / 'b'))
+
+    assert first_stats['lines'] == second_stats['lines']
+    assert first.frame_parser.errors == 0
+    for sensor in ('gas', 'ldr', 'voltage'):
+        a, b = first.sensor_data[sensor]['series'], second.sensor_data[sensor]['series']
+        assert len(a) > 0
+        assert np.array_equal(np.vstack(a.columns()), np.vstack(b.columns()))
+    assert first.alert_count == second.alert_count > 0
+    assert first.mode == second.mode
+
+    segments_a, segments_b = first.store.segments(), second.store.segments()
+    assert [os.path.basename(p) for p in segments_a] == [os.path.basename(p) for p in segments_b]
+    for a, b in zip(segments_a, segments_b):
+        with open(a, 'rb') as fa, open(b, 'rb') as fb:
+            assert fa.read() == fb.read()
+    # Recorded times come from the capture, not the wall clock at replay
+    times = np.fromfile(segments_a[0], dtype=RECORD_DTYPE)['t']
+    assert START <= times[0] and times[-1] < START + 60
@@ -0,0 +1,145 @@
+import threading
+import time
+
+from command_transport import CommandTransport
+
+
+class FakePort:
+    """Records written commands; acknowledges each one through the transport, like the firmware."""
+
+    def __init__(self, block=None):
+        self.transport = None
+        self.written = []
+        self.block = block
+
+    def write(self, data):
+        if self.block is not None:
+            self.block.wait(2.0)
+        text = data.decode('utf-8').strip()
+        self.written.append(text)
+        if self.transport and text.startswith('MODE_'):
+            self.transport.on_reply(('mode', 0.0, text[5:]))
+
+
+def connect(port, **kwargs):
+    transport = CommandTransport(port, **kwargs)
+    port.transport = transport
+    return transport
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_stuck_write_does_not_stall_other_devices():
+    block = threading.Event()
+    stuck = connect(FakePort(block))
+    healthy = connect(FakePort())
+    try:
+        stuck.send('MODE_MANUAL')
+        time.sleep(0.05)
+        healthy.send('MODE_AUTO')
+        assert wait_for(lambda: healthy.completed, timeout=0.5)
+        assert healthy.completed[0][:3] == ('MODE_AUTO', True, 'MODE_CHANGED:AUTO')
+        assert not stuck.completed
+    finally:
+        block.set()
+        stuck.close()
+        healthy.close()
+
+
+class AckingPort(FakePort):
+    """Acknowledges LED commands like over.ino; ignores ALL_ when `legacy` (older firmware)."""
+
+    def __init__(self, legacy=False, auto_mode=False):
+        super().__init__()
+        self.legacy = legacy
+        self.auto_mode = auto_mode
+
+    def write(self, data):
+        text = data.decode('utf-8').strip()
+        self.written.append(text)
+        target, _, state = text.partition('_')
+        if target == 'ALL':
+            if not self.legacy:
+                self.transport.on_reply(('led_ack', 0.0, ('ALL_LEDS', state)))
+        elif self.auto_mode:
+            self.transport.on_reply(('error', 0.0, 'Switch to manual mode first'))
+        else:
+            self.transport.on_reply(('led_ack', 0.0, (target, state)))
+
+
+def test_replies_are_matched_to_commands():
+    port = AckingPort()
+    transport = connect(port)
+    try:
+        transport.send('LED2_ON')
+        assert wait_for(lambda: transport.completed)
+        command, ok, reply, latency = transport.completed.popleft()
+        assert (command, ok, reply) == ('LED2_ON', True, 'LED2:ON')
+        assert latency >= 0
+        assert transport.get_stats()['acked'] == 1
+    finally:
+        transport.close()
+
+
+def test_unrelated_reply_does_not_ack_and_error_rejects():
+    port = FakePort()
+    transport = connect(port, timeout=0.1)
+    rejecting = connect(AckingPort(auto_mode=True))
+    try:
+        transport.send('LED1_ON')
+        transport.on_reply(('led_ack', 0.0, ('LED3', 'ON')))
+        assert wait_for(lambda: transport.completed)
+        assert transport.completed[0][:3] == ('LED1_ON', False, 'timeout')
+        rejecting.send('LED1_ON')
+        assert wait_for(lambda: rejecting.completed)
+        assert rejecting.completed[0][:3] == ('LED1_ON', False, 'Switch to manual mode first')
+    finally:
+        transport.close()
+        rejecting.close()
+
+
+def test_led_burst_goes_out_as_one_all_command():
+    port = AckingPort()
+    transport = connect(port)
+    try:
+        transport.send_many(['LED1_OFF', 'LED2_OFF', 'LED3_OFF'])
+        assert wait_for(lambda: len(transport.completed) == 4)
+        assert port.written == ['ALL_OFF']
+        # Each original command is reported, the ALL_ command last
+        assert [item[:2] for item in transport.completed] == [
+            ('LED1_OFF', True), ('LED2_OFF', True), ('LED3_OFF', True), ('ALL_OFF', True)]
+        assert transport.coalesced == 2
+    finally:
+        transport.close()
+
+
+def test_newer_command_replaces_unsent_one_for_the_same_led():
+    block = threading.Event()
+    port = FakePort(block)
+    transport = connect(port, timeout=0.05)
+    try:
+        transport.send('MODE_MANUAL')
+        transport.send_many(['LED1_ON', 'LED2_ON', 'LED1_OFF'])
+        block.set()
+        assert wait_for(lambda: len(transport.completed) == 4)
+        assert port.written == ['MODE_MANUAL', 'LED2_ON', 'LED1_OFF']
+    finally:
+        block.set()
+        transport.close()
+
+
+def test_all_command_falls_back_on_older_firmware():
+    port = AckingPort(legacy=True)
+    transport = connect(port, timeout=0.05)
+    try:
+        transport.send_many(['LED1_ON', 'LED2_ON', 'LED3_ON'])
+        assert wait_for(lambda: len(transport.completed) == 3)
+        assert port.written == ['ALL_ON', 'LED1_ON', 'LED2_ON', 'LED3_ON']
+        assert all(ok for _, ok, _, _ in transport.completed)
+    finally:
+        transport.close()
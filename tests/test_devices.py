@@ -0,0 +1,53 @@
+import os
+import time
+
+from devices import SerialPoller
+from serial_ingest import SerialIngestEngine
+
+
+class PipePort:
+    """The read end of a pipe, standing in for a non-blocking pyserial port."""
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+
+    def fileno(self):
+        return self.read_fd
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_poller_counts_errors_on_the_engine(capsys):
+    def on_lines(lines):
+        if 'BAD' in lines:
+            raise ValueError("handler failed")
+        received.extend(lines)
+
+    received, failed = [], []
+    poller = SerialPoller(on_error=lambda engine, error: failed.append(engine))
+    port = PipePort()
+    engine = SerialIngestEngine(port, on_lines)
+    try:
+        assert poller.add(engine)
+        os.write(port.write_fd, b"BAD\n")
+        assert wait_for(lambda: engine.read_errors == 1)
+        assert engine.last_error == "handler failed"
+        # A failing batch doesn't stop the port from being read
+        os.write(port.write_fd, b"GAS:300,0\n")
+        assert wait_for(lambda: received == ['GAS:300,0'])
+
+        os.close(port.write_fd)
+        assert wait_for(lambda: failed == [engine])
+        stats = engine.get_stats()
+        assert stats['read_errors'] == 2 and 'no data' in stats['last_error']
+        assert not engine.running
+        assert capsys.readouterr().out == ''
+    finally:
+        poller.close()
+        os.close(port.read_fd)
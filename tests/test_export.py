@@ -0,0 +1,74 @@
+import csv
+import gzip
+import io
+
+import numpy as np
+import pytest
+
+from export import export_session
+from tsstore import TimeSeriesStore, RECORD_DTYPE
+
+START = 1_700_000_000.0
+SENSORS = ('gas', 'ldr', 'voltage')
+
+
+@pytest.fixture
+def session(tmp_path):
+    directory = str(tmp_path / 'device1')
+    store = TimeSeriesStore(directory, segment_records=700)
+    store.start()
+    for n in range(2000):
+        t = START + n * 0.05
+        store.append_sample(SENSORS[n % 3], t, n * 1.5, n / 3)
+        if n % 500 == 0:
+            store.append_frame(('led_status', 0.0, (1, 0, 1)), t)
+    store.append_link(START + 100, restored=True, gap=2.5, recovery=0.25)
+    store.close()
+    records = np.concatenate([np.fromfile(path, dtype=RECORD_DTYPE) for path in store.segments()])
+    return directory, records
+
+
+def read_table(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(io.StringIO(f.read())))
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'csv.gz'])
+def test_csv_round_trip(session, tmp_path, fmt):
+    directory, records = session
+    stats = export_session(directory, str(tmp_path / 'out' / 'session'), fmt=fmt, chunk_records=333)
+    samples_path, events_path = stats['paths']
+    samples, events = read_table(samples_path), read_table(events_path)
+
+    expected = records[records['kind'] <= 3]
+    assert stats['samples'] == len(samples) == len(expected) == 2000
+    assert [row['sensor'] for row in samples[:3]] == list(SENSORS)
+    assert np.allclose([float(row['t']) for row in samples], expected['t'], atol=1e-6)
+    assert np.allclose([float(row['raw']) for row in samples], expected['raw'], rtol=1e-6)
+    assert np.allclose([float(row['filtered']) for row in samples], expected['filtered'], rtol=1e-6)
+
+    assert stats['events'] == len(events) == 5
+    assert events[0]['event'] == 'led_status' and events[0]['detail'] == 'gas=1 ldr=0 voltage=1'
+    assert events[-1]['detail'] == 'restored gap=2.500s recovery=0.250s'
+
+
+def test_time_range_export(session, tmp_path):
+    directory, records = session
+    t0, t1 = START + 10, START + 20
+    stats = export_session(directory, str(tmp_path / 'part'), fmt='csv', t0=t0, t1=t1)
+    samples = read_table(stats['paths'][0])
+    inside = records[(records['t'] >= t0) & (records['t'] < t1) & (records['kind'] <= 3)]
+    assert len(samples) == len(inside) == 200
+    # The sparse index keeps the scan close to the range instead of the whole session
+    assert stats['scanned'] < len(records) / 2
+
+
+def test_parquet_round_trip(session, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    directory, records = session
+    stats = export_session(directory, str(tmp_path / 'session'), fmt='parquet')
+    table = pq.read_table(stats['paths'][0])
+    assert table.num_rows == 2000
+    assert np.allclose(table.column('t').to_numpy(), records[records['kind'] <= 3]['t'])
+    assert pq.read_table(stats['paths'][1]).num_rows == int((records['kind'] > 3).sum())
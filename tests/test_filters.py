@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from filters import STAGE_TYPES, DEFAULT_CHAINS, FilterChain
+
+
+def noisy_signal(count, seed=1):
+    rng = np.random.default_rng(seed)
+    values = 300 + np.cumsum(rng.normal(0, 3, count))
+    spikes = rng.random(count) < 0.02
+    values[spikes] += rng.normal(0, 200, spikes.sum())
+    return np.arange(count) * 0.05, values
+
+
+def chunked(times, values, sizes):
+    start = 0
+    for size in sizes:
+        yield times[start:start + size], values[start:start + size]
+        start += size
+
+
+@pytest.mark.parametrize('kind', sorted(STAGE_TYPES))
+def test_batch_and_step_filtering_agree(kind):
+    times, values = noisy_signal(600)
+    stepped, batched = FilterChain.from_specs([{'type': kind}]), FilterChain.from_specs([{'type': kind}])
+    expected = [stepped.update(t, x) for t, x in zip(times, values)]
+    # Uneven batches, including ones that end inside the adaptive stage's calibration
+    sizes = (1, 4, 13, 2, 64, 0, 100, 416)
+    result = np.concatenate([batched.update_many(t, x) for t, x in chunked(times, values, sizes)])
+    assert np.array_equal(result, np.array(expected))
+
+
+def test_adaptive_calibration_outputs_raw_then_median_baseline():
+    times, values = noisy_signal(30, seed=7)
+    chain = FilterChain.from_specs(DEFAULT_CHAINS['gas'])
+    result = chain.update_many(times, values)
+    assert np.array_equal(result[:14], values[:14])
+    assert result[14] == np.median(values[:15])
@@ -0,0 +1,75 @@
+from frame_parser import (FrameParser, BINARY_FRAME, BINARY_KIND_GAS, BINARY_KIND_LDR,
+                          BINARY_KIND_LED_STATUS, BINARY_KINDS, BINARY_SYNC)
+from serial_ingest import SerialIngestEngine
+
+
+def binary(kind, value, aux=0):
+    return BINARY_FRAME.pack(BINARY_SYNC, kind, aux, 0, value)
+
+
+def test_text_lines_dispatch_by_prefix():
+    parser = FrameParser()
+    frames = parser.parse_lines(['GAS:300,0', 'LDR:5,1200', 'VOLT:1.2,1.5,1.8',
+                                 'LED_STATUS:1,0,1', 'MODE_CHANGED:Manual', 'LED2:ON'],
+                                timestamp=1.0)
+    kinds = [kind for kind, _, _ in frames]
+    assert kinds[:4] == ['gas', 'ldr', 'voltage', 'led_status']
+    assert frames[0] == ('gas', 1.0, 300.0)
+    assert frames[3][2] == (1, 0, 1)
+    assert parser.errors == 0
+
+
+def test_bad_line_is_counted_not_printed(capsys):
+    parser = FrameParser()
+    frames = parser.parse_lines(['GAS:abc,0', 'GAS:250,0'], timestamp=0.0)
+    assert frames == [('gas', 0.0, 250.0)]
+    stats = parser.get_stats()
+    assert stats['errors'] == 1 and 'GAS:abc,0' in stats['last_error']
+    assert capsys.readouterr().out == ''
+
+
+def test_binary_frames_dispatch_by_kind():
+    parser = FrameParser()
+    data = binary(BINARY_KIND_GAS, 310.0) + binary(BINARY_KIND_LED_STATUS, 0.0, aux=0b101)
+    assert parser.parse_binary(data, timestamp=2.0) == [
+        ('gas', 2.0, 310.0), ('led_status', 2.0, (1, 0, 1))]
+
+
+def test_corrupt_binary_frame_costs_one_byte():
+    parser = FrameParser()
+    # A stray sync byte shifts the stream; the frames behind it must survive
+    data = bytes([BINARY_SYNC]) + binary(BINARY_KIND_GAS, 1.0) + binary(BINARY_KIND_LDR, 2.0)
+    frames = parser.parse_binary(data, timestamp=0.0)
+    assert [(kind, value) for kind, _, value in frames] == [('gas', 1.0), ('ldr', 2.0)]
+    assert parser.errors == 1
+
+
+def test_ingest_resyncs_after_false_sync_byte():
+    lines, chunks = [], []
+    engine = SerialIngestEngine(None, lines.extend, on_binary=chunks.append,
+                                binary_kinds=BINARY_KINDS)
+    engine.feed(bytes([BINARY_SYNC]) + binary(BINARY_KIND_GAS, 5.0) + b'LDR:1,900\n'
+                + binary(BINARY_KIND_LDR, 6.0))
+    parser = FrameParser()
+    frames = [frame for chunk in chunks for frame in parser.parse_binary(chunk, 0.0)]
+    assert [(kind, value) for kind, _, value in frames] == [('gas', 5.0), ('ldr', 6.0)]
+    assert lines == ['LDR:1,900']
+    assert engine.get_stats()['garbage_bytes'] == 1
+    assert parser.errors == 0
+
+
+def test_read_errors_are_counted():
+    class FailingPort:
+        in_waiting = 0
+
+        def read(self, size):
+            engine.running = calls.append(size) or len(calls) < 3
+            raise OSError("device reports readiness to read but returned no data")
+
+    calls = []
+    engine = SerialIngestEngine(FailingPort(), lambda lines: None)
+    engine.running = True
+    engine.run()
+    stats = engine.get_stats()
+    assert stats['read_errors'] == 2
+    assert 'no data' in stats['last_error']
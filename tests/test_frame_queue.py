@@ -0,0 +1,49 @@
+from frame_queue import FrameQueue
+
+
+def frames(kind, count, first=0):
+    return [(kind, float(n), n) for n in range(first, first + count)]
+
+
+def test_drop_oldest_keeps_newest_frames():
+    queue = FrameQueue(maxsize=4, policy=FrameQueue.DROP_OLDEST)
+    queue.put_many(frames('gas', 6))
+    assert [frame[2] for frame in queue.drain()] == [2, 3, 4, 5]
+    stats = queue.get_stats()
+    assert stats['dropped'] == 2 and stats['enqueued'] == 6 and stats['drained'] == 4
+    assert not queue.ready.is_set()
+
+
+def test_coalesce_keeps_latest_overflow_per_kind():
+    queue = FrameQueue(maxsize=2, policy=FrameQueue.COALESCE)
+    queue.put_many(frames('gas', 2))
+    for frame in frames('ldr', 3) + frames('gas', 2, first=10):
+        queue.put(frame)
+    # The backlog first, then the newest overflowing frame of each kind
+    assert queue.drain() == [('gas', 0.0, 0), ('gas', 1.0, 1), ('ldr', 2.0, 2), ('gas', 11.0, 11)]
+    assert queue.dropped == 3
+    assert len(queue) == 0
+
+
+def test_partial_drain_keeps_order():
+    queue = FrameQueue(maxsize=10)
+    queue.put_many(frames('gas', 5))
+    assert [frame[2] for frame in queue.drain(2)] == [0, 1]
+    assert queue.ready.is_set()
+    assert [frame[2] for frame in queue.drain()] == [2, 3, 4]
+
+
+def test_coalesced_frames_keep_their_place_after_a_partial_drain():
+    queue = FrameQueue(maxsize=2, policy=FrameQueue.COALESCE)
+    for value in (1, 2, 3):
+        queue.put(('gas', float(value), value))
+    assert queue.drain(1) == [('gas', 1.0, 1)]
+    queue.put(('gas', 4.0, 4))
+    # The newest value is applied last and stays on screen
+    assert [frame[2] for frame in queue.drain()] == [2, 3, 4]
+
+
+def test_coalesced_kinds_come_out_in_arrival_order():
+    queue = FrameQueue(maxsize=1, policy=FrameQueue.COALESCE)
+    queue.put_many([('gas', 0.0, 0), ('gas', 1.0, 1), ('ldr', 2.0, 2), ('gas', 3.0, 3)])
+    assert [frame[1] for frame in queue.drain()] == [0.0, 2.0, 3.0]
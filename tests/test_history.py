@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from history import HistoryReader, compute_rollup, map_segment
+from tsstore import RECORD_DTYPE, KIND_GAS, KIND_LDR, KIND_MODE
+
+START = 1_700_000_000.0
+
+
+def records(first, count):
+    """Gas and LDR samples 0.05 s apart, with a mode event now and then."""
+    block = np.zeros(count, dtype=RECORD_DTYPE)
+    numbers = np.arange(first, first + count)
+    block['t'] = START + numbers * 0.05
+    block['kind'] = np.where(numbers % 2, KIND_LDR, KIND_GAS)
+    block['kind'][numbers % 50 == 0] = KIND_MODE
+    block['filtered'] = (numbers * 7919 % 1000).astype(np.float32)
+    return block
+
+
+def test_live_rollups_follow_a_growing_segment(tmp_path):
+    path = os.path.join(tmp_path, f"seg-{int(START * 1000)}.dat")
+    reader = HistoryReader(str(tmp_path))
+    written = 0
+    for count in (1000, 7, 333, 1, 2000):
+        with open(path, 'ab') as f:
+            records(written, count).tofile(f)
+        written += count
+        for resolution in (1, 60):
+            expected = compute_rollup(map_segment(path), resolution)
+            rollup = reader.rollup_for(path, resolution, newest=True)
+            for field in ('t', 'kind', 'min', 'max', 'count'):
+                assert np.array_equal(rollup[field], expected[field])
+            assert np.allclose(rollup['mean'], expected['mean'], rtol=1e-6)
+    # Only the appended records were rolled up on the last call
+    assert reader.live_rollups[path][1][0] == written
+
+
+def test_query_picks_raw_or_rollup_resolution(tmp_path):
+    path = os.path.join(tmp_path, f"seg-{int(START * 1000)}.dat")
+    records(0, 20000).tofile(path)
+    reader = HistoryReader(str(tmp_path))
+    times, low, high, mean, resolution = reader.query('gas', START, START + 10)
+    assert resolution == 0 and np.array_equal(low, high)
+    assert times[0] >= START and times[-1] < START + 10
+    times, low, high, mean, resolution = reader.query('gas', START, START + 1000)
+    assert resolution == 1
+    assert (low <= mean + 1e-3).all() and (mean <= high + 1e-3).all()
@@ -0,0 +1,48 @@
+import pytest
+
+from latency import LatencyHistogram, LatencyTracer
+
+
+def test_percentiles_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for us in range(1, 10001):
+        histogram.record(us / 1e6)
+    p50, p90, p99, top = histogram.percentiles(0.5, 0.9, 0.99, 1.0)
+    # Buckets are exact below 128 us and within 1/64 above
+    assert p50 == pytest.approx(5.0, rel=1 / 64)
+    assert p90 == pytest.approx(9.0, rel=1 / 64)
+    assert p99 == pytest.approx(9.9, rel=1 / 64)
+    assert top <= 10.0
+    summary = histogram.summary()
+    assert summary['count'] == 10000 and summary['max_ms'] == 10.0
+    assert summary['mean_ms'] == pytest.approx(5.0005, rel=1e-3)
+
+
+def test_small_values_are_exact_and_order_is_kept():
+    histogram = LatencyHistogram()
+    for us in (3, 3, 3, 100):
+        histogram.record(us / 1e6)
+    # Results come back in the order asked for, not sorted
+    assert histogram.percentiles(0.99, 0.5) == [0.1, 0.003]
+    assert LatencyHistogram().percentiles(0.5) == [None]
+
+
+def test_merge_and_cumulative():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for us in (50, 500, 5000):
+        a.record(us / 1e6)
+    b.record(50000 / 1e6)
+    a.merge(b)
+    assert a.total == 4 and a.max_us == 50000
+    assert a.cumulative([100, 1000, 10000]) == [1, 2, 3, 4]
+
+
+def test_tracer_stages():
+    tracer = LatencyTracer()
+    tracer.enqueued(0.0, 0.001, 0.002, 0.003, position=10)
+    tracer.applied(10, drained=0.013, applied=0.015)
+    tracer.painted(now=0.020)
+    summary = tracer.summary()
+    assert summary['drain']['p50_ms'] == pytest.approx(10.0, rel=1 / 64)
+    assert summary['paint']['p50_ms'] == pytest.approx(5.0, rel=1 / 64)
+    assert summary['total']['p50_ms'] == pytest.approx(20.0, rel=1 / 64)
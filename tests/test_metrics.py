@@ -0,0 +1,96 @@
+import re
+from collections import defaultdict
+
+import pytest
+from latency import LatencyHistogram
+from metrics import render_metrics
+from monitor_core import MonitorCore
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def fed_core():
+    """A core fed the way a live port feeds it: parsed, queued, then drained."""
+    core = MonitorCore(record=False)
+    for n in range(40):
+        core.process_serial_lines([f"GAS:{300 + n * 10},0", "LDR:10,900", "VOLT:0,1.500,3.3"], n / 20)
+        core.drain()
+    return core
+
+
+def parse(body):
+    """({family: type}, [(name, labels, value)]) from an exposition."""
+    types, samples = {}, []
+    for line in body.decode('utf-8').splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            types[name] = kind
+        elif line and not line.startswith('#'):
+            name, labels, value = SAMPLE.match(line).groups()
+            labels = dict(re.findall(r'(\w+)="([^"]*)"', labels or ''))
+            samples.append((name, labels, float(value)))
+    return types, samples
+
+
+def value(samples, name, **labels):
+    matches = [v for n, l, v in samples if n == name and l == labels]
+    assert len(matches) == 1, (name, labels)
+    return matches[0]
+
+
+@pytest.mark.parametrize('accept', [None, 'application/openmetrics-text; version=1.0.0'])
+def test_gauges_for_a_drained_core(accept):
+    core = fed_core()
+    _, samples = parse(render_metrics({'device1': core}, accept)[1])
+    assert value(samples, 'gashealth_sensor_value', device='device1', sensor='gas') == \
+        pytest.approx(core.sensor_data['gas']['value'])
+    assert value(samples, 'gashealth_sensor_raw_value', device='device1', sensor='gas') == 690
+    assert value(samples, 'gashealth_sensor_value', device='device1', sensor='temperature') == 150
+    assert value(samples, 'gashealth_alert_active', device='device1', rule='gas') == 1
+    assert value(samples, 'gashealth_alert_active', device='device1', rule='ldr') == 0
+    assert value(samples, 'gashealth_connected', device='device1') == 0
+    assert value(samples, 'gashealth_frames_applied_total', device='device1') == 120
+
+
+def test_counter_naming_in_both_formats():
+    core = fed_core()
+    content_type, body = render_metrics({'device1': core})
+    types, samples = parse(body)
+    assert content_type.startswith('text/plain; version=0.0.4')
+    assert types['gashealth_alerts_raised_total'] == 'counter'
+    assert value(samples, 'gashealth_alerts_raised_total', device='device1') == 1
+
+    content_type, body = render_metrics({'device1': core}, 'application/openmetrics-text')
+    types, samples = parse(body)
+    assert content_type.startswith('application/openmetrics-text')
+    assert body.endswith(b'# EOF\n')
+    # OpenMetrics names the family without the suffix; its samples keep it
+    assert types['gashealth_alerts_raised'] == 'counter' and 'gashealth_alerts_raised_total' not in types
+    assert value(samples, 'gashealth_alerts_raised_total', device='device1') == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    core = fed_core()
+    paints = LatencyHistogram()
+    for seconds in (0.00005, 0.0003, 0.0003, 0.004, 0.02, 0.3, 20.0):
+        paints.record(seconds)
+    types, samples = parse(render_metrics({'device1': core}, render_histogram=paints)[1])
+    assert types['gashealth_pipeline_stage_seconds'] == 'histogram'
+
+    buckets = defaultdict(list)
+    for name, labels, count in samples:
+        if name.endswith('_bucket'):
+            le = labels.pop('le')
+            buckets[name[:-len('_bucket')], tuple(sorted(labels.items()))].append((le, count))
+    stages = {dict(labels)['stage'] for family, labels in buckets if family.endswith('stage_seconds')}
+    assert {'parse', 'enqueue', 'drain'} <= stages
+
+    for (family, labels), series in buckets.items():
+        counts = [count for _, count in series]
+        assert counts == sorted(counts), family
+        assert series[-1][0] == '+Inf'
+        assert counts[-1] == value(samples, family + '_count', **dict(labels))
+
+    render = dict(buckets['gashealth_render_seconds', ()])
+    assert render['0.0001'] == 1 and render['0.001'] == 3 and render['10.0'] == 6 and render['+Inf'] == 7
+    assert value(samples, 'gashealth_render_seconds_count') == 7
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from ports import PortCache, choose_port, port_fingerprint
+
+
+def port(device, vid=None, serial_number=None, location=None):
+    return SimpleNamespace(device=device, vid=vid, pid=0xEA60 if vid else None,
+                           serial_number=serial_number, location=location, description='n/a')
+
+
+def test_fingerprints():
+    assert port_fingerprint(port('/dev/ttyUSB0', 0x10C4, '0001', '1-1:1.0')) == '10C4:EA60:0001'
+    # Identical adapters without serial numbers are told apart by where they are plugged in
+    first = port_fingerprint(port('/dev/ttyUSB0', 0x10C4, location='1-1.1:1.0'))
+    second = port_fingerprint(port('/dev/ttyUSB1', 0x10C4, location='1-1.2:1.0'))
+    assert first != second
+    assert port_fingerprint(port('/dev/ttyUSB1', 0x10C4)) == '10C4:EA60@/dev/ttyUSB1'
+    assert port_fingerprint(port('/dev/pts/3')) == 'path:/dev/pts/3'
+    assert port_fingerprint(None) is None
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / 'ports.json')
+    cache = PortCache(path)
+    cache.update('10C4:EA60:0001', cooker=False, checked=1.0)
+    cache.assign('10C4:EA60:0001', 'device2')
+    cache.save()
+    entry = PortCache(path).get('10C4:EA60:0001')
+    assert entry['cooker'] is True and entry['device_id'] == 'device2'
+
+
+def test_choose_port_prefers_the_devices_own_cooker():
+    results = [
+        {'device': 'a', 'cooker': True, 'device_id': 'device1'},
+        {'device': 'b', 'cooker': True, 'device_id': 'device2'},
+        {'device': 'c', 'cooker': None, 'device_id': None},
+    ]
+    assert choose_port(results, 'device2') == 'b'
+    assert choose_port(results, 'device3') == 'a'
+    assert choose_port(results, 'device1', taken={'a': 'x', 'b': 'y'}) == 'c'
@@ -0,0 +1,45 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import reconnect
+from reconnect import ConnectionSupervisor
+
+
+def test_port_is_identified_off_the_connecting_thread(monkeypatch):
+    release = threading.Event()
+    looked_up = []
+
+    def slow_port_info(port):
+        looked_up.append(threading.current_thread())
+        release.wait(2.0)
+        return SimpleNamespace(device=port, vid=0x10C4, pid=0xEA60, serial_number='0001')
+
+    monkeypatch.setattr(reconnect, 'port_info', slow_port_info)
+    started = time.perf_counter()
+    supervisor = ConnectionSupervisor(None, '/dev/ttyUSB0', 115200)
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    supervisor.identify_thread.join(2.0)
+    assert looked_up and looked_up[0] is not threading.current_thread()
+    assert supervisor.fingerprint == '10C4:EA60:0001'
+
+
+def test_known_fingerprint_skips_the_lookup(monkeypatch):
+    monkeypatch.setattr(reconnect, 'port_info', lambda port: 1 / 0)
+    supervisor = ConnectionSupervisor(None, '/dev/ttyUSB0', 115200, fingerprint='10C4:EA60:0001')
+    assert supervisor.identify_thread is None
+    assert supervisor.fingerprint == '10C4:EA60:0001'
+
+
+def usb_port(device, serial_number=None, location=None):
+    return SimpleNamespace(device=device, vid=0x1A86, pid=0x7523, serial_number=serial_number,
+                           location=location, description='USB Serial')
+
+
+def test_find_port_follows_the_fingerprint(monkeypatch):
+    ports = [usb_port('/dev/ttyUSB0', location='1-1.1:1.0'), usb_port('/dev/ttyUSB1', location='1-1.2:1.0')]
+    monkeypatch.setattr('serial.tools.list_ports.comports', lambda: ports)
+    # The board on hub port 1.2 came back under another name
+    assert reconnect.find_port('1A86:7523@1-1.2:1.0', '/dev/ttyUSB3') == '/dev/ttyUSB1'
+    assert reconnect.find_port('1A86:7523@1-1.3:1.0', '/dev/ttyUSB3') is None
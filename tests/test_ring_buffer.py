@@ -0,0 +1,38 @@
+import numpy as np
+
+from ring_buffer import SensorRingBuffer
+
+
+def test_mirror_keeps_newest_samples_contiguous():
+    buffer = SensorRingBuffer(capacity=8)
+    reference = []
+    for n in range(21):
+        buffer.append(n, n * 10, n * 100)
+        reference.append((n, n * 10, n * 100))
+        times, raws, filtereds = buffer.columns()
+        expected = np.array(reference[-8:], dtype=np.float64).T
+        assert np.array_equal(np.vstack((times, raws, filtereds)), expected)
+        # Both copies of every slot agree
+        assert np.array_equal(buffer.data[:, :8], buffer.data[:, 8:])
+    assert buffer.generation == 21 and len(buffer) == 8
+
+
+def test_extend_matches_append():
+    appended, extended = SensorRingBuffer(capacity=8), SensorRingBuffer(capacity=8)
+    total = 0
+    for size in (3, 1, 0, 7, 20, 5):
+        samples = np.arange(total, total + size, dtype=np.float64)
+        for value in samples:
+            appended.append(value, value + 1, value + 2)
+        extended.extend(samples, samples + 1, samples + 2)
+        total += size
+        assert np.array_equal(np.vstack(appended.columns()), np.vstack(extended.columns()))
+        assert appended.head == extended.head and appended.generation == extended.generation
+
+
+def test_columns_are_views_of_the_newest_n():
+    buffer = SensorRingBuffer(capacity=4)
+    buffer.extend([1, 2, 3, 4, 5], [0] * 5, [0] * 5)
+    times, _, _ = buffer.columns(2)
+    assert times.tolist() == [4.0, 5.0]
+    assert times.base is not None
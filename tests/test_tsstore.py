@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+from tsstore import TimeSeriesStore, KIND_GAS, KIND_MODE, RECORD_DTYPE, RECORD_SIZE, index_bounds
+
+START = 1_700_000_000.0
+
+
+def recorded_store(directory, count=5000, segment_records=2000):
+    store = TimeSeriesStore(directory, segment_records=segment_records, index_every=16)
+    store.start()
+    for n in range(count):
+        t = START + n * 0.05
+        store.append_sample(('gas', 'ldr', 'voltage')[n % 3], t, float(n), float(n) / 2)
+        if n % 100 == 0:
+            store.append_frame(('mode', 0.0, 'MANUAL'), t)
+    store.close()
+    return store
+
+
+def all_records(store):
+    return np.concatenate([np.fromfile(path, dtype=RECORD_DTYPE) for path in store.segments()])
+
+
+def test_segments_rotate_with_an_index(tmp_path):
+    store = recorded_store(str(tmp_path))
+    segments = store.segments()
+    assert len(segments) == 3
+    assert store.get_stats()['written'] == 5050
+    for path in segments:
+        assert os.path.exists(path[:-len('.dat')] + '.idx')
+
+
+def test_index_bounds_cover_the_requested_range(tmp_path):
+    store = recorded_store(str(tmp_path))
+    path = store.segments()[1]
+    records = np.fromfile(path, dtype=RECORD_DTYPE)
+    t0, t1 = float(records['t'][300]), float(records['t'][900])
+    first, last = index_bounds(path, t0, t1, os.path.getsize(path) // RECORD_SIZE)
+    inside = np.flatnonzero((records['t'] >= t0) & (records['t'] < t1))
+    assert first <= inside[0] and inside[-1] < last
+    # Sparse, but not the whole segment
+    assert last - first < len(inside) + 2 * 16 + 1
+
+
+def test_read_range_matches_a_full_scan(tmp_path):
+    store = recorded_store(str(tmp_path))
+    records = all_records(store)
+    for t0, t1 in ((START, START + 1), (START + 90.01, START + 130.3), (START - 5, START + 1e6),
+                   (START + 1e5, START + 2e5)):
+        expected = records[(records['t'] >= t0) & (records['t'] < t1)]
+        assert np.array_equal(store.read_range(t0, t1), expected)
+    modes = store.read_range(START, START + 1e6, kinds=[KIND_MODE])
+    assert len(modes) == 50 and set(modes['kind']) == {KIND_MODE}
+    gas = store.read_range(START, START + 1e6, kinds=[KIND_GAS])
+    assert np.array_equal(gas['raw'], np.arange(0, 5000, 3, dtype=np.float32))
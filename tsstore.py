@@ -0,0 +1,292 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+# --- Record layout ---
+# One fixed-width little-endian record per sample or event, 24 bytes:
+# t (epoch seconds), raw, filtered, kind, code, reserved, aux
+RECORD_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('raw', '<f4'),
+    ('filtered', '<f4'),
+    ('kind', 'u1'),
+    ('code', 'u1'),
+    ('reserved', '<u2'),
+    ('aux', '<u4'),
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+
+# Sparse per-segment index: (t, record number) every index_every records
+INDEX_DTYPE = np.dtype([('t', '<f8'), ('record', '<u8')])
+
+KIND_GAS = 1
+KIND_LDR = 2
+KIND_VOLTAGE = 3
+KIND_LED_STATUS = 4
+KIND_MODE = 5
+KIND_LED_ACK = 6
+KIND_LINK = 7
+
+SAMPLE_KINDS = {'gas': KIND_GAS, 'ldr': KIND_LDR, 'voltage': KIND_VOLTAGE}
+KIND_NAMES = {
+    KIND_GAS: 'gas',
+    KIND_LDR: 'ldr',
+    KIND_VOLTAGE: 'voltage',
+    KIND_LED_STATUS: 'led_status',
+    KIND_MODE: 'mode',
+    KIND_LED_ACK: 'led_ack',
+    KIND_LINK: 'link',
+}
+MODE_CODES = {'AUTO': 0, 'MANUAL': 1}
+LINK_LOST = 0
+LINK_RESTORED = 1
+
+SEGMENT_PREFIX = 'seg-'
+SEGMENT_SUFFIX = '.dat'
+INDEX_SUFFIX = '.idx'
+
+
+def segment_start_time(path):
+    """Start time encoded in a segment file name (milliseconds since the epoch)."""
+    name = os.path.basename(path)
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) / 1000.0
+
+
+class TimeSeriesStore:
+    """Append-only on-disk store for sensor samples and LED/mode events.
+
+    Records are queued without blocking and written in batches by a background
+    thread into rotating segment files, each with a small sparse time index.
+    """
+
+    def __init__(self, directory, segment_records=1 << 20, index_every=256,
+                 flush_interval=1.0, max_pending=100000, on_segment_closed=None):
+        self.directory = directory
+        # Called from the writer thread with the path of each finished segment
+        self.on_segment_closed = on_segment_closed
+        self.segment_records = segment_records
+        self.index_every = index_every
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.pending = queue.SimpleQueue()
+        self.thread = None
+        self.running = False
+
+        # Current segment, only touched by the writer thread
+        self.segment_path = None
+        self.segment_file = None
+        self.index_file = None
+        self.segment_count = 0
+
+        # --- Counters ---
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.bytes_written = 0
+
+    # --- Producer side (any thread) ---
+
+    def start(self):
+        """Create the directory and start the writer thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def close(self, timeout=5.0):
+        """Flush everything queued and stop the writer thread."""
+        if not self.running:
+            return
+        self.running = False
+        self.pending.put(None)
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _enqueue(self, record):
+        # Bounded in spirit: if the disk stalls we drop instead of growing without limit
+        if self.queued - self.written - self.dropped >= self.max_pending:
+            self.dropped += 1
+            return
+        self.queued += 1
+        self.pending.put(record)
+
+    def append_sample(self, sensor, t, raw, filtered):
+        """Queue one gas/ldr/voltage sample (t in epoch seconds)."""
+        self._enqueue((t, raw, filtered, SAMPLE_KINDS[sensor], 0, 0, 0))
+
+    def append_event(self, kind, t, code=0, aux=0, raw=0.0, filtered=0.0):
+        """Queue one event record of the given KIND_* type."""
+        self._enqueue((t, raw, filtered, kind, code, 0, aux))
+
+    def append_link(self, t, restored, gap=0.0, recovery=0.0):
+        """Queue a connection lost/restored event; a restore carries the gap and
+        time to recovery in seconds (in the raw and filtered columns)."""
+        self.append_event(KIND_LINK, t, code=LINK_RESTORED if restored else LINK_LOST,
+                          raw=gap, filtered=recovery)
+
+    def append_frame(self, frame, t):
+        """Queue a parsed non-sample frame (LED status, mode change, LED ack)."""
+        kind, _frame_time, payload = frame
+        if kind == 'led_status':
+            gas, ldr, volt = payload
+            self.append_event(KIND_LED_STATUS, t, aux=(gas & 1) | (ldr & 1) << 1 | (volt & 1) << 2)
+        elif kind == 'mode':
+            self.append_event(KIND_MODE, t, code=MODE_CODES.get(payload, 255))
+        elif kind == 'led_ack':
+            led, state = payload
+            number = int(led[3:]) if led[3:].isdigit() else 0
+            self.append_event(KIND_LED_ACK, t, code=number, aux=1 if state == 'ON' else 0)
+
+    # --- Writer thread ---
+
+    def run(self):
+        batch = []
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                record = self.pending.get(timeout=self.flush_interval)
+                # Pick up everything else already queued without waiting
+                while True:
+                    if record is None:
+                        stopping = True
+                        break
+                    batch.append(record)
+                    if len(batch) >= 4096:
+                        break
+                    record = self.pending.get_nowait()
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            if batch and (stopping or len(batch) >= 4096 or now - last_flush >= self.flush_interval):
+                self._write_batch(batch)
+                batch = []
+                last_flush = now
+        self._close_segment()
+
+    def _open_segment(self, first_time):
+        name = f"{SEGMENT_PREFIX}{int(first_time * 1000):015d}"
+        path = os.path.join(self.directory, name + SEGMENT_SUFFIX)
+        # Two segments can't share a start millisecond; nudge forward if needed
+        while os.path.exists(path):
+            first_time += 0.001
+            name = f"{SEGMENT_PREFIX}{int(first_time * 1000):015d}"
+            path = os.path.join(self.directory, name + SEGMENT_SUFFIX)
+        self.segment_path = path
+        self.segment_file = open(path, 'ab')
+        self.index_file = open(os.path.join(self.directory, name + INDEX_SUFFIX), 'ab')
+        self.segment_count = 0
+
+    def _close_segment(self):
+        if self.segment_file:
+            self.segment_file.close()
+            self.index_file.close()
+            self.segment_file = None
+            self.index_file = None
+            if self.on_segment_closed and self.segment_count:
+                try:
+                    self.on_segment_closed(self.segment_path)
+                except Exception as e:
+                    print(f"Segment close hook error: {e}")
+
+    def _write_batch(self, batch):
+        try:
+            records = np.array(batch, dtype=RECORD_DTYPE)
+            start = 0
+            while start < len(records):
+                if self.segment_file is None or self.segment_count >= self.segment_records:
+                    self._close_segment()
+                    self._open_segment(float(records['t'][start]))
+                room = self.segment_records - self.segment_count
+                chunk = records[start:start + room]
+
+                # Index entries for record numbers that are multiples of index_every
+                numbers = self.segment_count + np.arange(len(chunk))
+                marks = numbers % self.index_every == 0
+                if marks.any():
+                    index = np.empty(int(marks.sum()), dtype=INDEX_DTYPE)
+                    index['t'] = chunk['t'][marks]
+                    index['record'] = numbers[marks]
+                    self.index_file.write(index.tobytes())
+
+                self.segment_file.write(chunk.tobytes())
+                self.segment_count += len(chunk)
+                self.bytes_written += chunk.nbytes
+                start += len(chunk)
+
+            self.segment_file.flush()
+            self.index_file.flush()
+            self.written += len(records)
+            self.flushes += 1
+        except Exception as e:
+            print(f"Store write error: {e}")
+            self.dropped += len(batch)
+
+    # --- Reading ---
+
+    def segments(self):
+        """Sorted segment paths in the store directory."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def read_range(self, t0, t1, kinds=None):
+        """Records with t0 <= t < t1, reading only the needed part of each segment."""
+        chunks = []
+        paths = self.segments()
+        for position, path in enumerate(paths):
+            if segment_start_time(path) >= t1:
+                break
+            if position + 1 < len(paths) and segment_start_time(paths[position + 1]) <= t0:
+                continue
+            records = read_segment_range(path, t0, t1)
+            if kinds is not None:
+                records = records[np.isin(records['kind'], list(kinds))]
+            if len(records):
+                chunks.append(records)
+        if not chunks:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.concatenate(chunks)
+
+    def get_stats(self):
+        return {
+            'queued': self.queued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'pending': self.queued - self.written - self.dropped,
+            'flushes': self.flushes,
+            'bytes_written': self.bytes_written,
+        }
+
+
+def index_bounds(path, t0, t1, total):
+    """Record range [first, last) of a segment that can contain times in [t0, t1)."""
+    first, last = 0, total
+    index_path = path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+    if os.path.exists(index_path):
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        if len(index):
+            lo = np.searchsorted(index['t'], t0, side='right') - 1
+            hi = np.searchsorted(index['t'], t1, side='left')
+            first = int(index['record'][lo]) if lo >= 0 else 0
+            last = min(int(index['record'][hi]), total) if hi < len(index) else total
+    return first, last
+
+
+def read_segment_range(path, t0, t1):
+    """Use the segment's sparse index to read only records near [t0, t1)."""
+    total = os.path.getsize(path) // RECORD_SIZE
+    first, last = index_bounds(path, t0, t1, total)
+    if last <= first:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    with open(path, 'rb') as f:
+        f.seek(first * RECORD_SIZE)
+        data = f.read((last - first) * RECORD_SIZE)
+    records = np.frombuffer(data[:len(data) - len(data) % RECORD_SIZE], dtype=RECORD_DTYPE)
+    return records[(records['t'] >= t0) & (records['t'] < t1)]
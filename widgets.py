@@ -0,0 +1,336 @@
+import math
+import time
+import tkinter as tk
+import numpy as np
+from downsample import DownsampleCache
+
+
+class TimeGraph:
+    """Retained-mode time graph.
+
+    Axes, tick labels and the threshold line are created once per canvas size;
+    each update only moves the data polyline and rewrites the current-value text.
+    """
+
+    LEFT = 60
+    TOP = 40
+
+    def __init__(self, parent, color, max_val, y_label, threshold=None, threshold_color='#f1c40f',
+                 y_ticks=(), current_text=None, min_val=0):
+        self.color = color
+        self.min_val = min_val
+        self.max_val = max_val
+        self.y_label = y_label
+        self.threshold = threshold
+        self.threshold_color = threshold_color
+        self.y_ticks = y_ticks
+        # Callback value -> (text, color) for the "Current: ..." label
+        self.current_text = current_text or (lambda value: (f"Current: {value:.0f}", '#ecf0f1'))
+
+        self.canvas = tk.Canvas(parent, bg='#2c3e50', highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind('<Configure>', self.on_resize)
+
+        self.width = 0
+        self.height = 0
+        self.line_item = None
+        self.point_item = None
+        self.value_item = None
+        self.empty_item = None
+        self.values = None
+        self.generation = None
+        self.caption = None
+        self.times = None
+        self.span = None
+        self.gaps = ()
+        self.shown_gaps = None
+        self.shown_text = None
+        self.showing_empty = None
+        self.downsample_cache = DownsampleCache()
+
+        # --- Redraw timing ---
+        self.redraw_ms = 0.0
+        self.redraw_count = 0
+
+    def exists(self):
+        return self.canvas.winfo_exists()
+
+    def on_resize(self, event):
+        self.build_static(event.width, event.height)
+        if self.values is not None:
+            self.update(self.values, self.generation, self.caption, self.times, self.span, self.gaps)
+
+    def y_for(self, value):
+        graph_height = self.height - 100
+        val_range = self.max_val - self.min_val if self.max_val != self.min_val else 1
+        return self.TOP + graph_height - ((value - self.min_val) / val_range) * graph_height
+
+    def build_static(self, width, height):
+        """Recreate everything that only depends on the canvas size."""
+        canvas = self.canvas
+        canvas.delete("all")
+        self.width = width
+        self.height = height
+        self.line_item = None
+        self.shown_text = None
+        self.shown_gaps = None
+        self.showing_empty = None
+        if width < 50 or height < 50:
+            return
+
+        left, top = self.LEFT, self.TOP
+        graph_width = width - 80
+        graph_height = height - 100
+
+        # Axes
+        canvas.create_line(left, top, left, top + graph_height, fill='#7f8c8d', width=2, tags='static')
+        canvas.create_line(left, top + graph_height, left + graph_width, top + graph_height,
+                           fill='#7f8c8d', width=2, tags='static')
+
+        # Data items start hidden and are moved in place by update()
+        self.line_item = canvas.create_line(0, 0, 0, 0, fill=self.color, width=2, state='hidden')
+        self.point_item = canvas.create_oval(0, 0, 0, 0, fill=self.color, outline=self.color, state='hidden')
+
+        # Threshold line
+        if self.threshold is not None:
+            threshold_y = self.y_for(self.threshold)
+            if top <= threshold_y <= top + graph_height:
+                canvas.create_line(left, threshold_y, left + graph_width, threshold_y,
+                                   fill=self.threshold_color, width=2, dash=(5, 2), tags='static')
+                canvas.create_text(left - 5, threshold_y, text=f"{self.threshold}", anchor='e',
+                                   font=('Arial', 8), fill=self.threshold_color, tags='static')
+
+        # Labels
+        canvas.create_text(width/2, height-20, text="Time →",
+                           font=('Arial', 10), fill='#bdc3c7', tags='static')
+        canvas.create_text(20, height/2, text=self.y_label, angle=90,
+                           font=('Arial', 10), fill='#bdc3c7', tags='static')
+
+        for tick in self.y_ticks:
+            y_pos = self.y_for(tick)
+            if top <= y_pos <= top + graph_height:
+                canvas.create_text(left - 10, y_pos, text=str(tick), anchor='e',
+                                   font=('Arial', 8), fill='#bdc3c7', tags='static')
+
+        self.value_item = canvas.create_text(width/2, 20, text="", font=('Arial', 12, 'bold'),
+                                             fill='#ecf0f1', state='hidden')
+        self.empty_item = canvas.create_text(width/2, height/2,
+                                             text="No data available\nConnect to device",
+                                             font=('Arial', 12), fill='#bdc3c7', state='hidden')
+
+    def update(self, values, generation=None, caption=None, times=None, span=None, gaps=()):
+        """Move the polyline and current value to match values (already in display units).
+
+        generation identifies the data version so decimation can be reused across repaints;
+        caption replaces the "Current: ..." text (used by the history browser). With times
+        and span=(t0, t1) points are placed by time instead of evenly, and gaps lists
+        (start, end) times drawn as shaded "offline" bands over the line.
+        """
+        self.values = values
+        self.generation = generation
+        self.caption = caption
+        self.times = times
+        self.span = span
+        self.gaps = gaps
+        if self.line_item is None or not self.exists():
+            return
+        start = time.perf_counter()
+        canvas = self.canvas
+
+        empty = len(values) == 0
+        if empty != self.showing_empty:
+            # Only the "No data" message is shown while there is nothing to plot
+            canvas.itemconfigure('static', state='hidden' if empty else 'normal')
+            canvas.itemconfigure(self.empty_item, state='normal' if empty else 'hidden')
+            if empty:
+                canvas.delete('gap')
+                self.shown_gaps = None
+                canvas.itemconfigure(self.line_item, state='hidden')
+                canvas.itemconfigure(self.point_item, state='hidden')
+                canvas.itemconfigure(self.value_item, state='hidden')
+                self.shown_text = None
+            self.showing_empty = empty
+
+        if not empty:
+            graph_width = self.width - 80
+            graph_height = self.height - 100
+            val_range = self.max_val - self.min_val if self.max_val != self.min_val else 1
+
+            # Min/max-preserving decimation to about two points per pixel column
+            count = len(values)
+            indices = self.downsample_cache.indices_for(values, generation, graph_width)
+            display = np.minimum(np.asarray(values)[indices], self.max_val)
+            if times is not None:
+                t0, t1 = span
+                xs = self.LEFT + (np.asarray(times)[indices] - t0) / max(t1 - t0, 1e-9) * graph_width
+            else:
+                xs = self.LEFT + indices / max(1, count - 1) * graph_width
+            ys = self.TOP + graph_height - ((display - self.min_val) / val_range) * graph_height
+
+            if len(indices) > 1:
+                canvas.coords(self.line_item, np.column_stack((xs, ys)).ravel().tolist())
+                canvas.itemconfigure(self.line_item, state='normal')
+                canvas.itemconfigure(self.point_item, state='hidden')
+            else:
+                x, y = float(xs[0]), float(ys[0])
+                canvas.coords(self.point_item, x-2, y-2, x+2, y+2)
+                canvas.itemconfigure(self.point_item, state='normal')
+                canvas.itemconfigure(self.line_item, state='hidden')
+
+            if (gaps, span) != self.shown_gaps:
+                self.draw_gaps(gaps, span)
+
+            if caption is not None:
+                text, color = caption, '#bdc3c7'
+            else:
+                text, color = self.current_text(min(float(values[-1]), self.max_val))
+            if (text, color) != self.shown_text:
+                canvas.itemconfigure(self.value_item, text=text, fill=color, state='normal')
+                self.shown_text = (text, color)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.redraw_ms = elapsed_ms if not self.redraw_count else 0.9 * self.redraw_ms + 0.1 * elapsed_ms
+        self.redraw_count += 1
+
+    def draw_gaps(self, gaps, span):
+        """Replace the outage bands; each covers the line drawn across the missing stretch."""
+        canvas = self.canvas
+        canvas.delete('gap')
+        self.shown_gaps = (gaps, span)
+        if not gaps or span is None:
+            return
+        t0, t1 = span
+        graph_width = self.width - 80
+        bottom = self.TOP + self.height - 100
+        for gap_start, gap_end in gaps:
+            x0 = self.LEFT + min(max((gap_start - t0) / (t1 - t0), 0.0), 1.0) * graph_width
+            x1 = self.LEFT + min(max((gap_end - t0) / (t1 - t0), 0.0), 1.0) * graph_width
+            x1 = max(x1, x0 + 2)
+            canvas.create_rectangle(x0, self.TOP, x1, bottom, fill='#34495e', outline='#e67e22',
+                                    dash=(3, 3), tags='gap')
+            if x1 - x0 > 50:
+                seconds = gap_end - gap_start
+                length = f"{seconds:.0f} s" if seconds < 120 else (
+                    f"{seconds / 60:.0f} min" if seconds < 7200 else f"{seconds / 3600:.1f} h")
+                canvas.create_text((x0 + x1) / 2, self.TOP + 12, text=f"offline {length}",
+                                   font=('Arial', 8), fill='#e67e22', tags='gap')
+
+
+class Gauge:
+    """Retained-mode speed meter.
+
+    Zone arcs, tick marks and labels are laid out once per canvas size;
+    each update only moves the needle and rewrites the value text.
+    """
+
+    START_ANGLE = 135
+    EXTENT = 270
+
+    def __init__(self, parent, max_val, zones, ticks, label, value_text=None, min_val=0):
+        self.min_val = min_val
+        self.max_val = max_val
+        # zones: [(end_value, color), ...] in ascending order, covering min_val..max_val
+        self.zones = zones
+        self.ticks = ticks
+        self.label = label
+        self.value_text = value_text or (lambda value: f"{value:.0f}")
+
+        self.canvas = tk.Canvas(parent, bg='#2c3e50', highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind('<Configure>', self.on_resize)
+
+        self.center = None
+        self.needle_radius = 0
+        self.needle_item = None
+        self.value_item = None
+        self.value = None
+        self.shown_value = None
+        self.shown_text = None
+
+        # --- Redraw timing ---
+        self.redraw_ms = 0.0
+        self.redraw_count = 0
+
+    def exists(self):
+        return self.canvas.winfo_exists()
+
+    def on_resize(self, event):
+        self.build_static(event.width, event.height)
+        if self.value is not None:
+            self.update(self.value)
+
+    def angle_for(self, value):
+        span = self.max_val - self.min_val if self.max_val != self.min_val else 1
+        clamped = min(max(value, self.min_val), self.max_val)
+        return self.START_ANGLE + ((clamped - self.min_val) / span) * self.EXTENT
+
+    def point_at(self, angle, radius):
+        center_x, center_y = self.center
+        rad = math.radians(angle)
+        return center_x + radius * math.cos(rad), center_y - radius * math.sin(rad)
+
+    def build_static(self, width, height):
+        """Lay out arcs, ticks and labels for the current canvas size."""
+        canvas = self.canvas
+        canvas.delete("all")
+        self.needle_item = None
+        self.shown_value = None
+        self.shown_text = None
+        if width < 10 or height < 10:
+            return
+
+        center_x, center_y = width/2, height/2 + 20
+        radius = min(width, height) / 3
+        self.center = (center_x, center_y)
+        self.needle_radius = radius - 10
+        bbox = (center_x-radius, center_y-radius, center_x+radius, center_y+radius)
+
+        # Color zones
+        zone_start = self.min_val
+        for zone_end, color in self.zones:
+            start = self.angle_for(zone_start)
+            canvas.create_arc(*bbox, start=start, extent=self.angle_for(zone_end) - start,
+                              outline=color, width=15, style=tk.ARC)
+            zone_start = zone_end
+
+        # Needle and center circle
+        self.needle_item = canvas.create_line(center_x, center_y, center_x, center_y,
+                                              fill='#ffffff', width=4)
+        canvas.create_oval(center_x-10, center_y-10, center_x+10, center_y+10,
+                           fill='#34495e', outline='#ffffff', width=2)
+
+        # Value and label
+        self.value_item = canvas.create_text(width/2, 40, text="", font=('Arial', 16, 'bold'), fill='#ecf0f1')
+        canvas.create_text(width/2, 70, text=self.label, font=('Arial', 12), fill='#bdc3c7')
+
+        # Scale marks
+        for tick in self.ticks:
+            angle = self.angle_for(tick)
+            inner_x, inner_y = self.point_at(angle, radius - 20)
+            outer_x, outer_y = self.point_at(angle, radius)
+            canvas.create_line(inner_x, inner_y, outer_x, outer_y, fill='#ecf0f1', width=2)
+            label_x, label_y = self.point_at(angle, radius - 35)
+            canvas.create_text(label_x, label_y, text=str(tick), font=('Arial', 8), fill='#bdc3c7')
+
+    def update(self, value):
+        """Move the needle and update the value text."""
+        self.value = value
+        if self.needle_item is None or not self.exists():
+            return
+        start = time.perf_counter()
+        canvas = self.canvas
+
+        if value != self.shown_value:
+            center_x, center_y = self.center
+            needle_x, needle_y = self.point_at(self.angle_for(value), self.needle_radius)
+            canvas.coords(self.needle_item, center_x, center_y, needle_x, needle_y)
+            self.shown_value = value
+
+        text = self.value_text(value)
+        if text != self.shown_text:
+            canvas.itemconfigure(self.value_item, text=text)
+            self.shown_text = text
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.redraw_ms = elapsed_ms if not self.redraw_count else 0.9 * self.redraw_ms + 0.1 * elapsed_ms
+        self.redraw_count += 1